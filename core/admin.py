@@ -95,6 +95,25 @@ class RatingAdmin(admin.ModelAdmin):
         return obj.user.username if obj.user else obj.group.name
     get_entity.short_description = 'Ҷониб'
 
+@admin.register(QuizStats)
+class QuizStatsAdmin(admin.ModelAdmin):
+    list_display = ['quiz', 'participants', 'min_score', 'max_score', 'pass_count', 'updated_at']
+    search_fields = ['quiz__title']
+    readonly_fields = ['participants', 'score_sum', 'score_sq_sum', 'min_score', 'max_score', 'pass_count', 'histogram']
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'completed_sessions', 'result_count', 'best_percentage', 'pass_count', 'stale', 'updated_at']
+    list_filter = ['stale']
+    search_fields = ['user__username']
+    readonly_fields = ['total_sessions', 'completed_sessions', 'result_count', 'percentage_sum', 'best_percentage',
+                       'pass_count', 'last_result_id', 'last_completed_at', 'subjects']
+
+@admin.register(SiteCounter)
+class SiteCounterAdmin(admin.ModelAdmin):
+    list_display = ['name', 'value', 'updated_at']
+    readonly_fields = ['name', 'value']
+
 @admin.register(Permission)
 class PermissionAdmin(admin.ModelAdmin):
     list_display = ['name', 'codename']
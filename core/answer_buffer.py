@@ -0,0 +1,358 @@
+# core/answer_buffer.py
+"""
+Write-behind storage of student answers.
+
+With ``ANSWER_WRITE_BEHIND = True`` an answer is not written to ``UserAnswer``
+in the request. It is appended to this process' journal file under
+``ANSWER_JOURNAL_DIR`` and acknowledged immediately:
+
+* the line is flushed to the OS on append, so it survives a crash of the
+  process
+* it is fsynced by the flusher thread every ``ANSWER_JOURNAL_FSYNC_INTERVAL``
+  seconds, so a power loss can lose at most that window
+
+The flusher drains buffered answers into ``UserAnswer`` with one upsert per
+batch, every ``ANSWER_FLUSH_INTERVAL`` seconds or when ``ANSWER_FLUSH_BATCH``
+answers are waiting. It then records the flushed journal offset in a
+``.ckpt`` file and truncates the journal once everything is written.
+
+Every process holds an exclusive ``flock`` on its own journal, named by pid
+and a random suffix. The buffer starts in each process on its first
+buffered answer: never at import time, so a server that loads the app
+before forking (``gunicorn --preload``) does not hand one journal and lock
+to every worker. A forked child drops whatever it inherited. On start, a
+process replays the journals nobody holds, i.e. those of dead processes.
+
+``flush_session`` (called by ``quiz_finish_view`` before grading) merges
+this process' buffer with the unflushed entries for that session found in
+other processes' journals, so a result is exact even when a student's
+requests were spread over several workers.
+
+Every entry carries the time the answer was given, stored in
+``UserAnswer.answered_at``. An upsert never replaces a newer answer with an
+older one, whatever order the workers flush in. Journal entries for
+finished sessions are skipped when flushed, so a late flush never rewrites
+a graded attempt.
+
+With ``ANSWER_WRITE_BEHIND = False`` (the default) ``store_answers`` writes
+straight to the database.
+"""
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .models import QuizSession, UserAnswer
+
+logger = logging.getLogger(__name__)
+
+ANSWER_WRITE_BEHIND = getattr(settings, 'ANSWER_WRITE_BEHIND', False)
+ANSWER_JOURNAL_DIR = Path(getattr(settings, 'ANSWER_JOURNAL_DIR', settings.BASE_DIR / 'var' / 'answer_journal'))
+ANSWER_JOURNAL_FSYNC_INTERVAL = getattr(settings, 'ANSWER_JOURNAL_FSYNC_INTERVAL', 0.05)
+ANSWER_FLUSH_INTERVAL = getattr(settings, 'ANSWER_FLUSH_INTERVAL', 1.0)
+ANSWER_FLUSH_BATCH = getattr(settings, 'ANSWER_FLUSH_BATCH', 2000)
+
+
+def _answered_at(ts):
+    return datetime.fromtimestamp(ts / 1e9, tz=dt_timezone.utc)
+
+
+def upsert_answers(entries):
+    """
+    Write ``{(session_id, question_id): (answer_id, timestamp)}`` to UserAnswer,
+    skipping sessions that are already finished.
+
+    An entry only replaces a stored answer that is older than it, so whichever
+    worker flushes last, the answer given last wins. The sessions are locked
+    first, so two flushes of the same session cannot interleave between the
+    read of the stored times and the write. Call it inside a transaction.
+    """
+    if not entries:
+        return 0
+    session_ids = {session_id for session_id, _ in entries}
+    sessions = dict(
+        QuizSession.objects.select_for_update()
+        .filter(id__in=session_ids)
+        .values_list('id', 'finished_at')
+    )
+    open_sessions = {session_id for session_id, finished_at in sessions.items() if finished_at is None}
+    stored = {
+        (session_id, question_id): answered_at
+        for session_id, question_id, answered_at in UserAnswer.objects.filter(
+            session_id__in=open_sessions,
+            question_id__in={question_id for _, question_id in entries},
+        ).values_list('session_id', 'question_id', 'answered_at')
+    }
+    rows = []
+    for (session_id, question_id), (answer_id, ts) in entries.items():
+        if session_id not in open_sessions:
+            continue
+        answered_at = _answered_at(ts)
+        if (session_id, question_id) in stored and stored[(session_id, question_id)] >= answered_at:
+            continue  # a newer answer is already stored
+        rows.append(UserAnswer(
+            session_id=session_id, question_id=question_id, answer_id=answer_id, answered_at=answered_at,
+        ))
+    if rows:
+        UserAnswer.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['session', 'question'],
+            update_fields=['answer', 'answered_at'],
+            batch_size=500,
+        )
+    return len(rows)
+
+
+def _merge(entries, other):
+    """Add ``other`` to ``entries``, keeping the newest answer per key."""
+    for key, value in other.items():
+        if key not in entries or entries[key][1] <= value[1]:
+            entries[key] = value
+    return entries
+
+
+def _read_entries(path, offset=0, session_id=None):
+    """Complete journal lines after ``offset`` as ``{(session, question): (answer, ts)}``."""
+    entries = {}
+    try:
+        with open(path, 'rb') as fh:
+            fh.seek(offset)
+            for line in fh:
+                if not line.endswith(b'\n'):
+                    break  # being written right now
+                s, q, a, t = json.loads(line)
+                if session_id is not None and s != session_id:
+                    continue
+                _merge(entries, {(s, q): (a, t)})
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _read_checkpoint(path):
+    try:
+        return int(Path(f'{path}.ckpt').read_text() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _write_checkpoint(path, offset):
+    tmp = Path(f'{path}.ckpt.tmp')
+    tmp.write_text(str(offset))
+    os.replace(tmp, f'{path}.ckpt')
+
+
+class AnswerBuffer:
+    """This process' journal, in-memory buffer and flusher thread."""
+
+    def __init__(self, journal_dir=ANSWER_JOURNAL_DIR):
+        self.journal_dir = Path(journal_dir)
+        self.path = None
+        self._file = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._dirty = False
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start(self):
+        """Open this process' journal, replay dead processes' journals and start the flusher."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.open_journal()
+            self.replay_orphans()
+            self._thread = threading.Thread(target=self._run, name='answer-flusher', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def open_journal(self):
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        # The uuid keeps a reused pid from reopening a dead process' journal
+        self.path = self.journal_dir / f'answers-{os.getpid()}-{uuid.uuid4().hex}.jsonl'
+        self._file = open(self.path, 'ab')
+        fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _after_fork(self):
+        """
+        Forget the parent's journal in a forked child.
+
+        The child has no flusher thread, and its copy of the journal shares
+        the parent's lock. The parent keeps flushing what it buffered; the
+        child starts its own journal on its first answer.
+        """
+        if self._file is not None:
+            self._file.close()
+        self.path = None
+        self._file = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._dirty = False
+
+    def close(self):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=ANSWER_FLUSH_INTERVAL * 2 + 5)
+        self.flush()
+
+    def replay_orphans(self):
+        """Apply and remove journals whose process is gone."""
+        for path in self.journal_dir.glob('answers-*.jsonl'):
+            if path == self.path:
+                continue
+            with open(path, 'ab') as fh:
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # a live process owns it
+                entries = _read_entries(path, _read_checkpoint(path))
+                with transaction.atomic():
+                    written = upsert_answers(entries)
+                logger.info('Replayed %d answers from %s', written, path.name)
+                path.unlink()
+                Path(f'{path}.ckpt').unlink(missing_ok=True)
+
+    # -- writing -------------------------------------------------------------
+
+    def submit(self, session_id, pairs):
+        """Journal ``(question_id, answer_id)`` pairs of a session and buffer them."""
+        self.start()
+        now = time.time_ns()
+        lines = b''.join(
+            json.dumps([session_id, q, a, now]).encode() + b'\n' for q, a in pairs
+        )
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+            self._dirty = True
+            for question_id, answer_id in pairs:
+                self._pending[(session_id, question_id)] = (answer_id, now)
+            pending = len(self._pending)
+        if pending >= ANSWER_FLUSH_BATCH:
+            self._wakeup.set()
+
+    def pending_answer(self, session_id, question_id):
+        entry = self._pending.get((session_id, question_id))
+        return entry[0] if entry else None
+
+    # -- flushing ------------------------------------------------------------
+
+    def flush(self, extra=None):
+        """
+        Write everything buffered so far to the database.
+
+        ``extra`` entries (from other journals) are merged with the buffer by
+        timestamp first, so the newest answer per question is what is written.
+        """
+        if self._file is None:
+            if extra:
+                with transaction.atomic():
+                    return upsert_answers(extra)
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                entries, self._pending = self._pending, {}
+                offset = self._file.tell()
+            if not entries and not extra:
+                return 0
+            try:
+                with transaction.atomic():
+                    written = upsert_answers(_merge(dict(extra or {}), entries))
+            except Exception:
+                # Put them back unless a newer answer arrived meanwhile.
+                with self._lock:
+                    for key, value in entries.items():
+                        self._pending.setdefault(key, value)
+                raise
+            _write_checkpoint(self.path, offset)
+            with self._lock:
+                if not self._pending and self._file.tell() == offset:
+                    self._file.truncate(0)
+                    self._file.seek(0)
+                    _write_checkpoint(self.path, 0)
+            return written
+
+    def flush_session(self, session_id):
+        """Make every journaled answer of ``session_id`` visible in UserAnswer."""
+        others = {}
+        if self.journal_dir.exists():
+            for path in self.journal_dir.glob('answers-*.jsonl'):
+                if path == self.path:
+                    continue
+                _merge(others, _read_entries(path, _read_checkpoint(path), session_id))
+        self.flush(extra=others)
+
+    def _fsync(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            fileno = self._file.fileno()
+        os.fsync(fileno)
+
+    def _run(self):
+        next_flush = time.monotonic() + ANSWER_FLUSH_INTERVAL
+        try:
+            while not self._stopping.is_set():
+                self._wakeup.wait(ANSWER_JOURNAL_FSYNC_INTERVAL)
+                self._fsync()
+                if self._wakeup.is_set() or time.monotonic() >= next_flush:
+                    self._wakeup.clear()
+                    try:
+                        self.flush()
+                    except Exception:
+                        logger.exception('Could not flush buffered answers')
+                    next_flush = time.monotonic() + ANSWER_FLUSH_INTERVAL
+        finally:
+            self._fsync()
+            connections.close_all()
+
+
+answer_buffer = AnswerBuffer()
+os.register_at_fork(after_in_child=answer_buffer._after_fork)
+
+
+def store_answers(session_id, pairs):
+    """Save ``(question_id, answer_id)`` pairs of a session, buffered or directly."""
+    if ANSWER_WRITE_BEHIND:
+        answer_buffer.submit(session_id, pairs)
+        return
+    UserAnswer.objects.bulk_create(
+        [UserAnswer(session_id=session_id, question_id=q, answer_id=a) for q, a in pairs],
+        update_conflicts=True,
+        unique_fields=['session', 'question'],
+        update_fields=['answer', 'answered_at'],
+    )
+
+
+def flush_session_answers(session_id):
+    if ANSWER_WRITE_BEHIND:
+        answer_buffer.flush_session(session_id)
+
+
+def pending_answer(session_id, question_id):
+    """Answer id still waiting in this process' buffer, if any."""
+    if ANSWER_WRITE_BEHIND:
+        return answer_buffer.pending_answer(session_id, question_id)
+    return None
@@ -0,0 +1,206 @@
+# core/answer_key.py
+"""
+Compiled answer keys.
+
+An answer key is everything grading and answer validation need to know about
+a quiz: points and correct answer ids per question, and which question every
+valid answer id belongs to. Keys are compiled from the database once, kept in
+a process-local LRU and in the shared Django cache, and invalidated by the
+Question/Answer signals in ``core/signals.py``.
+
+Because a process cannot see another process' LRU, every quiz has a version
+token in the shared cache. A local entry is only used while its token matches,
+so invalidating a quiz anywhere makes every process recompile (or re-read the
+shared tier) on the next lookup.
+
+That only works when the Django cache is shared by all processes (see
+``CACHES`` in settings). With a process-local backend such as LocMemCache the
+token never reaches other workers, so both tiers are bypassed and the key is
+compiled from the database on every lookup.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .models import Answer, Question
+
+CACHE_TIMEOUT = getattr(settings, 'ANSWER_KEY_CACHE_TIMEOUT', 60 * 60)
+LOCAL_CACHE_SIZE = getattr(settings, 'ANSWER_KEY_LOCAL_CACHE_SIZE', 256)
+
+
+def cache_is_shared():
+    """False when the default cache lives in this process only."""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+class AnswerKey:
+    """Immutable answer key of one quiz."""
+
+    __slots__ = ('quiz_id', 'questions', 'answer_questions')
+
+    def __init__(self, quiz_id, questions, answer_questions):
+        self.quiz_id = quiz_id
+        # {question_id: (frozenset(correct_answer_ids), points)}
+        self.questions = questions
+        # {answer_id: question_id} for every answer of the quiz
+        self.answer_questions = answer_questions
+
+    def __getstate__(self):
+        return (self.quiz_id, self.questions, self.answer_questions)
+
+    def __setstate__(self, state):
+        self.quiz_id, self.questions, self.answer_questions = state
+
+    @property
+    def total_questions(self):
+        return len(self.questions)
+
+    @property
+    def total_points(self):
+        return sum(points for _, points in self.questions.values())
+
+    def has_question(self, question_id):
+        return question_id in self.questions
+
+    def is_valid(self, question_id, answer_id):
+        """True if ``answer_id`` is one of the answers of ``question_id``."""
+        return self.answer_questions.get(answer_id) == question_id
+
+    def is_correct(self, question_id, answer_id):
+        entry = self.questions.get(question_id)
+        return entry is not None and answer_id in entry[0]
+
+    def points(self, question_id):
+        entry = self.questions.get(question_id)
+        return entry[1] if entry else 0
+
+    def score(self, pairs):
+        """
+        Score ``(question_id, answer_id)`` pairs.
+
+        Returns ``(score, correct_answers)``.
+        """
+        score = 0
+        correct = 0
+        for question_id, answer_id in pairs:
+            entry = self.questions.get(question_id)
+            if entry is not None and answer_id in entry[0]:
+                score += entry[1]
+                correct += 1
+        return score, correct
+
+
+def compile_answer_key(quiz_id):
+    """Build the answer key of a quiz from the database (two queries)."""
+    correct = {}
+    points = {}
+    for question_id, question_points in Question.objects.filter(quiz_id=quiz_id).values_list('id', 'points'):
+        points[question_id] = question_points
+        correct[question_id] = set()
+
+    answer_questions = {}
+    answers = Answer.objects.filter(question__quiz_id=quiz_id).values_list('id', 'question_id', 'is_correct')
+    for answer_id, question_id, is_correct in answers:
+        answer_questions[answer_id] = question_id
+        if is_correct:
+            correct[question_id].add(answer_id)
+
+    questions = {
+        question_id: (frozenset(correct[question_id]), question_points)
+        for question_id, question_points in points.items()
+    }
+    return AnswerKey(quiz_id, questions, answer_questions)
+
+
+class _LocalLRU:
+    """Small thread-safe LRU of ``quiz_id -> (version, AnswerKey)``."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id):
+        with self._lock:
+            entry = self._data.get(quiz_id)
+            if entry is not None:
+                self._data.move_to_end(quiz_id)
+            return entry
+
+    def set(self, quiz_id, entry):
+        with self._lock:
+            self._data[quiz_id] = entry
+            self._data.move_to_end(quiz_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, quiz_id):
+        with self._lock:
+            self._data.pop(quiz_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local = _LocalLRU(LOCAL_CACHE_SIZE)
+
+
+def _version_key(quiz_id):
+    return f'answer_key:version:{quiz_id}'
+
+
+def _data_key(quiz_id, version):
+    return f'answer_key:{quiz_id}:{version}'
+
+
+def _current_version(quiz_id):
+    version = cache.get(_version_key(quiz_id))
+    if version is None:
+        cache.add(_version_key(quiz_id), uuid.uuid4().hex, CACHE_TIMEOUT)
+        version = cache.get(_version_key(quiz_id))
+    return version
+
+
+def answer_key_version(quiz_id):
+    """Token that changes whenever the quiz's questions or answers change."""
+    return _current_version(quiz_id)
+
+
+def get_answer_key(quiz_id):
+    """
+    Return the compiled answer key of a quiz.
+
+    Lookup order: process-local LRU, shared cache, database.
+    """
+    if not cache_is_shared():
+        return compile_answer_key(quiz_id)
+
+    version = _current_version(quiz_id)
+
+    entry = _local.get(quiz_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    key = cache.get(_data_key(quiz_id, version))
+    if key is None:
+        key = compile_answer_key(quiz_id)
+        cache.set(_data_key(quiz_id, version), key, CACHE_TIMEOUT)
+
+    _local.set(quiz_id, (version, key))
+    return key
+
+
+def get_answer_keys(quiz_ids):
+    return {quiz_id: get_answer_key(quiz_id) for quiz_id in set(quiz_ids)}
+
+
+def invalidate_answer_key(quiz_id):
+    """Drop the key of a quiz in this process and, via the version token, in all others."""
+    _local.discard(quiz_id)
+    cache.set(_version_key(quiz_id), uuid.uuid4().hex, CACHE_TIMEOUT)
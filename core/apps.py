@@ -7,4 +7,4 @@ class CoreConfig(AppConfig):
     
     def ready(self):
         
-        from . import signals
\ No newline at end of file
+        from . import signals, sqlite
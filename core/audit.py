@@ -0,0 +1,213 @@
+# core/audit.py
+"""
+Buffered audit log.
+
+``record_audit`` queues an ``AuditLog`` row instead of inserting it inside the
+request. The row is queued only when the surrounding transaction commits, so
+rolled back changes are never logged. A background thread drains the queue
+with ``bulk_create``. It flushes when ``AUDIT_BATCH_SIZE`` rows are waiting or
+``AUDIT_FLUSH_INTERVAL`` seconds have passed, whichever comes first.
+
+When the queue is full, ``AUDIT_QUEUE_POLICY`` decides what happens:
+
+* ``'sync'``  - write the row in the calling thread (default, loses nothing)
+* ``'block'`` - wait up to ``AUDIT_BLOCK_TIMEOUT`` seconds for room, then write
+  synchronously
+* ``'drop'``  - discard the row and count it in ``AuditSink.dropped``
+
+A batch that fails with ``OperationalError`` (e.g. ``database is locked``) is
+retried ``AUDIT_WRITE_RETRIES`` times with exponential backoff. If it still
+fails, the rows are written one by one, so a bad row cannot take the rest of
+its batch with it. Rows that cannot be written at all are appended to
+``AUDIT_SPILL_FILE`` and replayed when the next worker thread starts.
+
+Pending rows are flushed at interpreter exit. ``created_at`` is set when the
+event is recorded, so it is the time of the event, not of the flush. A user
+deleted before the flush is written as NULL, as ``on_delete=SET_NULL`` would
+have done. Set ``AUDIT_ASYNC = False`` to write every row synchronously
+inside the request, as before.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core import serializers
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+
+from .models import AuditLog, User
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ASYNC = getattr(settings, 'AUDIT_ASYNC', True)
+AUDIT_QUEUE_SIZE = getattr(settings, 'AUDIT_QUEUE_SIZE', 10000)
+AUDIT_BATCH_SIZE = getattr(settings, 'AUDIT_BATCH_SIZE', 500)
+AUDIT_FLUSH_INTERVAL = getattr(settings, 'AUDIT_FLUSH_INTERVAL', 1.0)
+AUDIT_QUEUE_POLICY = getattr(settings, 'AUDIT_QUEUE_POLICY', 'sync')
+AUDIT_BLOCK_TIMEOUT = getattr(settings, 'AUDIT_BLOCK_TIMEOUT', 0.5)
+AUDIT_WRITE_RETRIES = getattr(settings, 'AUDIT_WRITE_RETRIES', 3)
+AUDIT_RETRY_BACKOFF = getattr(settings, 'AUDIT_RETRY_BACKOFF', 0.1)
+AUDIT_SPILL_FILE = Path(getattr(settings, 'AUDIT_SPILL_FILE', settings.BASE_DIR / 'var' / 'audit_spill.jsonl'))
+
+
+class AuditSink:
+    """Bounded in-process queue of AuditLog rows with a flushing worker thread."""
+
+    def __init__(self, maxsize=AUDIT_QUEUE_SIZE, batch_size=AUDIT_BATCH_SIZE,
+                 flush_interval=AUDIT_FLUSH_INTERVAL, policy=AUDIT_QUEUE_POLICY, spill_file=AUDIT_SPILL_FILE):
+        if policy not in ('sync', 'block', 'drop'):
+            raise ValueError(f'Unknown audit queue policy: {policy}')
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.spill_file = Path(spill_file)
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def put(self, entry):
+        self._ensure_worker()
+        try:
+            if self.policy == 'block':
+                self._queue.put(entry, timeout=AUDIT_BLOCK_TIMEOUT)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            if self.policy == 'drop':
+                self.dropped += 1
+            else:
+                self._write([entry])
+
+    def flush(self):
+        """Write everything queued so far. Safe to call from any thread."""
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                self._write(batch)
+
+    def close(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 2 + 5)
+        self.flush()
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-sink', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def replay_spilled(self):
+        """Write the rows an earlier flush had to spill; rows that fail again stay spilled."""
+        replaying = self.spill_file.with_name(f'{self.spill_file.name}.{os.getpid()}.replay')
+        try:
+            # Only one process gets to move the file
+            os.replace(self.spill_file, replaying)
+        except FileNotFoundError:
+            return
+        entries = []
+        with open(replaying, encoding='utf-8') as fh:
+            for line in fh:
+                entries.extend(obj.object for obj in serializers.deserialize('json', line))
+        for start in range(0, len(entries), self.batch_size):
+            self._write(entries[start:start + self.batch_size])
+        replaying.unlink()
+        logger.info('Replayed %d spilled audit log rows', len(entries))
+
+    def _run(self):
+        try:
+            try:
+                self.replay_spilled()
+            except Exception:
+                logger.exception('Could not replay spilled audit log rows')
+            while not self._stopping.is_set():
+                try:
+                    first = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                # Give the batch up to one interval to fill before writing it.
+                batch = [first]
+                self._stopping.wait(self.flush_interval if self._queue.qsize() < self.batch_size else 0)
+                with self._flush_lock:
+                    batch.extend(self._drain(self.batch_size - 1))
+                    self._write(batch)
+        finally:
+            connections.close_all()
+
+    def _write(self, batch):
+        for attempt in range(AUDIT_WRITE_RETRIES + 1):
+            try:
+                self._clear_deleted_users(batch)
+                AuditLog.objects.bulk_create(batch, batch_size=self.batch_size)
+                return
+            except OperationalError:
+                if attempt == AUDIT_WRITE_RETRIES:
+                    logger.warning('Audit batch of %d rows still fails; writing row by row', len(batch), exc_info=True)
+                    break
+                time.sleep(AUDIT_RETRY_BACKOFF * 2 ** attempt)
+            except Exception:
+                logger.warning('Audit batch of %d rows failed; writing row by row', len(batch), exc_info=True)
+                break
+
+        failed = []
+        for entry in batch:
+            try:
+                entry.pk = None
+                entry.save(force_insert=True)
+            except Exception:
+                logger.exception('Could not write audit log row %s/%s', entry.model, entry.object_id)
+                failed.append(entry)
+        if failed:
+            self._spill(failed)
+
+    @staticmethod
+    def _clear_deleted_users(batch):
+        user_ids = {entry.user_id for entry in batch if entry.user_id is not None}
+        if user_ids:
+            existing = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+            for entry in batch:
+                if entry.user_id is not None and entry.user_id not in existing:
+                    entry.user = None
+
+    def _spill(self, entries):
+        try:
+            self.spill_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_file, 'a', encoding='utf-8') as fh:
+                fh.write(serializers.serialize('json', entries) + '\n')
+        except Exception:
+            logger.exception('Could not spill %d audit log rows', len(entries))
+
+
+audit_sink = AuditSink()
+
+
+def record_audit(**fields):
+    """Log an audit event once the current transaction commits."""
+    fields.setdefault('created_at', timezone.now())
+    entry = AuditLog(**fields)
+    if not AUDIT_ASYNC:
+        entry.save()
+        return
+    transaction.on_commit(lambda: audit_sink.put(entry))
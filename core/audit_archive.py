@@ -0,0 +1,143 @@
+# core/audit_archive.py
+"""
+Retention and archival of ``AuditLog``.
+
+Rows older than the retention window are streamed out of the database in
+id-ordered chunks. Each chunk is appended to one gzip-compressed JSONL file per
+month (``auditlog-YYYY-MM.jsonl.gz``), then deleted. A chunk is written and
+synced to disk before its rows are deleted. If a run is interrupted between
+the two steps, the next run writes that chunk again; the reader skips the
+duplicate ids.
+
+``iter_archived_logs`` reads archived months directly from the files, opening
+only the months that overlap the requested range.
+"""
+import datetime
+import gzip
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog
+
+AUDIT_ARCHIVE_DIR = Path(getattr(settings, 'AUDIT_ARCHIVE_DIR', settings.BASE_DIR / 'archive' / 'auditlog'))
+AUDIT_RETENTION_DAYS = getattr(settings, 'AUDIT_RETENTION_DAYS', 90)
+
+FIELDS = ('id', 'user_id', 'action', 'model', 'object_id', 'details', 'ip_address', 'user_agent', 'created_at')
+
+
+def archive_path(archive_dir, year, month):
+    return Path(archive_dir) / f'auditlog-{year:04d}-{month:02d}.jsonl.gz'
+
+
+def _serialize(row):
+    row = dict(row)
+    row['created_at'] = row['created_at'].isoformat()
+    return json.dumps(row, ensure_ascii=False)
+
+
+def _append(archive_dir, rows):
+    """Append rows to their month files and sync them to disk."""
+    by_month = {}
+    for row in rows:
+        created = row['created_at']
+        by_month.setdefault((created.year, created.month), []).append(row)
+
+    for (year, month), month_rows in by_month.items():
+        path = archive_path(archive_dir, year, month)
+        # Appending to a gzip file adds a new member; gzip.open reads them all.
+        with gzip.open(path, 'at', encoding='utf-8') as fh:
+            for row in month_rows:
+                fh.write(_serialize(row))
+                fh.write('\n')
+        with open(path, 'rb') as fh:
+            os.fsync(fh.fileno())
+
+
+def archive_audit_logs(before=None, archive_dir=None, chunk_size=5000, dry_run=False):
+    """
+    Move AuditLog rows created before ``before`` into monthly archive files.
+
+    Defaults to ``AUDIT_RETENTION_DAYS`` ago. Returns the number of rows
+    archived (or that would be archived, with ``dry_run``).
+    """
+    if before is None:
+        before = timezone.now() - datetime.timedelta(days=AUDIT_RETENTION_DAYS)
+    archive_dir = Path(archive_dir or AUDIT_ARCHIVE_DIR)
+
+    old = AuditLog.objects.filter(created_at__lt=before).order_by('id')
+    if dry_run:
+        return old.count()
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    archived = 0
+    last_id = 0
+    while True:
+        rows = list(old.filter(id__gt=last_id).values(*FIELDS)[:chunk_size])
+        if not rows:
+            break
+        # UTC keeps month boundaries stable regardless of TIME_ZONE.
+        for row in rows:
+            row['created_at'] = row['created_at'].astimezone(datetime.timezone.utc)
+        _append(archive_dir, rows)
+
+        ids = [row['id'] for row in rows]
+        with transaction.atomic():
+            AuditLog.objects.filter(id__in=ids).delete()
+
+        archived += len(rows)
+        last_id = ids[-1]
+    return archived
+
+
+def archived_months(archive_dir=None):
+    """Sorted (year, month) pairs that have an archive file."""
+    months = []
+    for path in Path(archive_dir or AUDIT_ARCHIVE_DIR).glob('auditlog-*.jsonl.gz'):
+        year, month = path.name[len('auditlog-'):-len('.jsonl.gz')].split('-')
+        months.append((int(year), int(month)))
+    return sorted(months)
+
+
+def iter_archived_logs(start=None, end=None, archive_dir=None, **filters):
+    """
+    Yield archived rows (dicts, ``created_at`` as aware datetime) with
+    ``start <= created_at < end``.
+
+    Extra keyword arguments filter on equality, e.g.
+    ``iter_archived_logs(start, end, user_id=5, action='update')``.
+    """
+    archive_dir = Path(archive_dir or AUDIT_ARCHIVE_DIR)
+    available = archived_months(archive_dir)
+    if not available:
+        return
+    if start is not None:
+        start = start.astimezone(datetime.timezone.utc)
+    if end is not None:
+        end = end.astimezone(datetime.timezone.utc)
+    first = (start.year, start.month) if start else available[0]
+    last = (end.year, end.month) if end else available[-1]
+
+    for year, month in available:
+        if not first <= (year, month) <= last:
+            continue
+        seen = set()
+        with gzip.open(archive_path(archive_dir, year, month), 'rt', encoding='utf-8') as fh:
+            for line in fh:
+                row = json.loads(line)
+                if row['id'] in seen:
+                    continue
+                seen.add(row['id'])
+                row['created_at'] = parse_datetime(row['created_at'])
+                if start is not None and row['created_at'] < start:
+                    continue
+                if end is not None and row['created_at'] >= end:
+                    continue
+                if any(row.get(key) != value for key, value in filters.items()):
+                    continue
+                yield row
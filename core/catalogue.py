@@ -0,0 +1,98 @@
+# core/catalogue.py
+"""
+Quiz catalogue query layer for ``quiz_list_view``.
+
+Filtering happens in SQL and pages are cut with keyset (seek) pagination on
+``(created_at, id)``, newest first. The page query asks for "the next N rows
+after this (created_at, id)" using the ``quiz_catalogue_idx`` index. Its cost
+does not depend on how deep the page is, and no COUNT is run. A cursor is the
+opaque encoding of the last row shown; a malformed cursor starts over from the
+first page.
+"""
+import base64
+from typing import List, NamedTuple, Optional
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Profile, Quiz
+
+CATALOGUE_PAGE_SIZE = getattr(settings, 'QUIZ_CATALOGUE_PAGE_SIZE', 12)
+
+
+class CataloguePage(NamedTuple):
+    quizzes: List[Quiz]
+    next_cursor: Optional[str]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(quiz):
+    raw = f'{quiz.created_at.isoformat()}|{quiz.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """``(created_at, id)`` from a cursor, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if created_at is None:
+        return None
+    return created_at, pk
+
+
+def visible_quizzes(user):
+    """Quizzes ``user`` may see in the catalogue: all for staff, open ones of their level for students."""
+    quizzes = Quiz.objects.select_related('subject', 'created_by')
+    if user.role in ['admin', 'teacher']:
+        return quizzes
+
+    try:
+        profile = Profile.objects.get(user=user)
+    except Profile.DoesNotExist:
+        profile = Profile.objects.create(user=user, level_type='school', current_level=1)
+
+    return quizzes.filter(
+        status='active',
+        level_type=profile.level_type,
+        start_level__lte=profile.current_level,
+        end_level__gte=profile.current_level,
+    )
+
+
+def filter_quizzes(quizzes, search='', subject=None, status='', quiz_mode=''):
+    """Apply the ``QuizFilterForm`` fields."""
+    if search:
+        quizzes = quizzes.filter(Q(title__icontains=search) | Q(description__icontains=search))
+    if subject:
+        quizzes = quizzes.filter(subject=subject)
+    if status:
+        quizzes = quizzes.filter(status=status)
+    if quiz_mode:
+        quizzes = quizzes.filter(quiz_mode=quiz_mode)
+    return quizzes
+
+
+def catalogue_page(quizzes, cursor=None, per_page=CATALOGUE_PAGE_SIZE):
+    """The ``per_page`` quizzes after ``cursor``, newest first."""
+    quizzes = quizzes.order_by('-created_at', '-id')
+    position = decode_cursor(cursor)
+    if position is not None:
+        created_at, pk = position
+        quizzes = quizzes.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    rows = list(quizzes[:per_page + 1])
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        return CataloguePage(rows, encode_cursor(rows[-1]))
+    return CataloguePage(rows, None)
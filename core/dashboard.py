@@ -0,0 +1,195 @@
+# core/dashboard.py
+"""
+Cached data for ``dashboard_view``.
+
+The dashboard has two kinds of sections:
+
+* role sections: site-wide numbers every admin (or every teacher) sees.
+  Cached per role for ``DASHBOARD_CACHE_TIMEOUT`` seconds and dropped by the
+  signals in ``core/signals.py`` when users, quizzes or groups change. The
+  admin's recent audit log is only refreshed by the timeout, because audit
+  rows are bulk-inserted without signals.
+* user sections: the teacher's own quizzes and results, or the student's
+  profile, available quizzes, finished sessions and groups (the finished
+  session count comes from ``UserStats``). Cached per user for
+  ``DASHBOARD_USER_CACHE_TIMEOUT`` seconds and dropped when that user's
+  sessions, results, group memberships or profile change.
+
+Available quizzes and quiz counts depend on every quiz, so user sections also
+store the quiz version they were built with. Any quiz change (a save, a
+delete, or a scheduled status transition) bumps the version, and every user
+section built before it is rebuilt on the next hit.
+
+``dashboard_view`` reads from the replica, but sections are always built from
+the primary. Otherwise a replica that has not caught up with the change that
+dropped a section would put the old data back into the cache.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import AuditLog, Group, Profile, Quiz, QuizSession, Result, User
+from .replicas import read_from_primary
+from .user_stats import get_user_stats
+
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 30)
+DASHBOARD_USER_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_USER_CACHE_TIMEOUT', 5 * 60)
+
+QUIZ_VERSION_KEY = 'dashboard:quiz_version'
+
+
+def _role_key(role):
+    return f'dashboard:role:{role}'
+
+
+def _user_key(user_id):
+    return f'dashboard:user:{user_id}'
+
+
+# -- role sections -------------------------------------------------------------
+
+def _admin_section():
+    return {
+        'total_users': User.objects.count(),
+        'total_quizzes': Quiz.objects.count(),
+        'total_groups': Group.objects.count(),
+        'active_quizzes': Quiz.objects.filter(status='active').count(),
+        'recent_logs': list(AuditLog.objects.select_related('user')[:10]),
+    }
+
+
+def _teacher_section():
+    return {
+        'total_students': User.objects.filter(role='student').count(),
+    }
+
+
+ROLE_SECTIONS = {
+    'admin': _admin_section,
+    'teacher': _teacher_section,
+}
+
+
+def get_role_section(role):
+    build = ROLE_SECTIONS.get(role)
+    if build is None:
+        return {}
+    data = cache.get(_role_key(role))
+    if data is None:
+        with read_from_primary():
+            data = build()
+        cache.set(_role_key(role), data, DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+# -- user sections -------------------------------------------------------------
+
+def _teacher_user_section(user):
+    my_quizzes = Quiz.objects.filter(created_by=user)
+    return {
+        'my_quizzes_count': my_quizzes.count(),
+        'active_quizzes_count': my_quizzes.filter(status='active').count(),
+        'recent_results': list(
+            Result.objects.filter(quiz__created_by=user)
+            .select_related('user', 'quiz')
+            .order_by('-completed_at')[:10]
+        ),
+    }
+
+
+def _student_user_section(user):
+    try:
+        profile = Profile.objects.get(user=user)
+    except Profile.DoesNotExist:
+        profile = Profile.objects.create(user=user, level_type='school', current_level=1)
+
+    available_quizzes = Quiz.objects.filter(
+        status='active',
+        level_type=profile.level_type,
+        start_level__lte=profile.current_level,
+        end_level__gte=profile.current_level,
+    ).select_related('subject')
+
+    completed_sessions = QuizSession.objects.filter(
+        user=user,
+        finished_at__isnull=False,
+    ).select_related('quiz')
+
+    my_groups = Group.objects.filter(
+        Q(leader=user) | Q(members__user=user)
+    ).distinct()
+
+    return {
+        'profile': profile,
+        'available_quizzes': list(available_quizzes[:5]),
+        'available_quizzes_count': available_quizzes.count(),
+        'completed_sessions': list(completed_sessions[:3]),
+        'total_completed': get_user_stats(user).completed_sessions,
+        'my_groups': list(my_groups[:3]),
+        'my_groups_count': my_groups.count(),
+        'my_results': list(Result.objects.filter(user=user).select_related('quiz').order_by('-completed_at')[:5]),
+    }
+
+
+USER_SECTIONS = {
+    'teacher': _teacher_user_section,
+    'student': _student_user_section,
+}
+
+
+def _quiz_version():
+    version = cache.get(QUIZ_VERSION_KEY)
+    if version is None:
+        cache.add(QUIZ_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(QUIZ_VERSION_KEY)
+    return version
+
+
+def get_user_section(user):
+    build = USER_SECTIONS.get(user.role)
+    if build is None:
+        return {}
+    version = _quiz_version()
+    entry = cache.get(_user_key(user.pk))
+    if entry is not None and entry[0] == version and entry[1] == user.role:
+        return entry[2]
+    with read_from_primary():
+        data = build(user)
+    cache.set(_user_key(user.pk), (version, user.role, data), DASHBOARD_USER_CACHE_TIMEOUT)
+    return data
+
+
+def get_dashboard_data(user):
+    """Template context of the dashboard for ``user``."""
+    context = {}
+    context.update(get_role_section(user.role))
+    context.update(get_user_section(user))
+    return context
+
+
+# -- invalidation --------------------------------------------------------------
+
+def _now_and_on_commit(func):
+    # Drop now for this request and again after commit, so no other request
+    # can cache data read before the change was committed.
+    func()
+    transaction.on_commit(func)
+
+
+def invalidate_role_sections(*roles):
+    keys = [_role_key(role) for role in (roles or ROLE_SECTIONS)]
+    _now_and_on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_user_sections(*user_ids):
+    keys = [_user_key(user_id) for user_id in user_ids if user_id is not None]
+    if keys:
+        _now_and_on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_quiz_sections():
+    """Outdate every user section after a quiz changed."""
+    _now_and_on_commit(lambda: cache.set(QUIZ_VERSION_KEY, uuid.uuid4().hex, None))
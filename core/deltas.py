@@ -0,0 +1,124 @@
+# core/deltas.py
+"""
+Small JSON payloads for pages that poll for changes.
+
+The quiz list, my results and group list pages used to re-fetch their whole
+HTML every 30-120 seconds and scrape numbers out of it. With ``?refresh=1``
+those views (and the ``ajax/refresh/...`` endpoints) answer with one of the
+payloads below instead. Each payload costs one or two small queries.
+
+``json_delta`` sends a payload with an ``ETag`` (a hash of the payload) and,
+when known, ``Last-Modified``. It answers ``304 Not Modified`` when the
+client's ``If-None-Match`` / ``If-Modified-Since`` still match, so an
+unchanged poll sends no body. The templates poll with jQuery's
+``ifModified``, which sends those headers for them.
+"""
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Q
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .dashboard import get_dashboard_data
+from .models import Group, Quiz, QuizSession, Result
+from .stats import get_site_counters
+from .user_results import result_percentage_expression
+from .user_stats import get_user_stats, result_summary
+
+# How many new results one poll returns at most
+MAX_NEW_RESULTS = 50
+
+
+def json_delta(request, payload, last_modified=None):
+    """JSON response with validators, or 304 if the client already has this payload."""
+    body = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True, ensure_ascii=False)
+    etag = quote_etag(hashlib.md5(body.encode()).hexdigest())
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    # Ҳамеша аз сервер тафтиш кунед; ҷавоби 304 арзон аст
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def parse_ids(value, limit=200):
+    """``"1,2,3"`` -> ``[1, 2, 3]``, ignoring junk."""
+    ids = []
+    for part in (value or '').split(','):
+        if part.strip().isdigit():
+            ids.append(int(part))
+    return ids[:limit]
+
+
+def quiz_list_delta(user, quiz_ids=()):
+    """Catalogue counters and the current status of the quizzes on screen."""
+    if user.role in ['admin', 'teacher']:
+        counts = {
+            'available_quizzes': get_site_counters()['total_quizzes'],
+            'completed_quizzes': 0,
+        }
+    else:
+        dashboard = get_dashboard_data(user)
+        counts = {
+            'available_quizzes': dashboard.get('available_quizzes_count', 0),
+            'completed_quizzes': dashboard.get('total_completed', 0),
+        }
+    counts['active_attempts'] = QuizSession.objects.filter(user=user, finished_at__isnull=True).count()
+
+    statuses = {}
+    if quiz_ids:
+        statuses = {
+            str(quiz_id): status
+            for quiz_id, status in Quiz.objects.filter(id__in=quiz_ids).values_list('id', 'status')
+        }
+    return {'counts': counts, 'statuses': statuses}, None
+
+
+def results_delta(user, since_id=0):
+    """Result summary of ``user`` and the results newer than ``since_id``."""
+    summary = result_summary(get_user_stats(user))
+    last_completed = summary.pop('last_completed')
+    last_id = summary.pop('last_id')
+
+    new_results = []
+    if since_id < last_id:
+        rows = (
+            Result.objects.filter(user=user, id__gt=since_id)
+            .annotate(percentage=result_percentage_expression())
+            .order_by('-id')
+            .values('id', 'quiz_id', 'quiz__title', 'score', 'total_questions', 'percentage', 'completed_at')
+        )[:MAX_NEW_RESULTS]
+        new_results = [
+            {
+                'id': row['id'],
+                'quiz_id': row['quiz_id'],
+                'quiz_title': row['quiz__title'],
+                'score': row['score'],
+                'total_questions': row['total_questions'],
+                'percentage': round(row['percentage'], 1),
+                'completed_at': row['completed_at'],
+            }
+            for row in rows
+        ]
+    payload = {'stats': summary, 'new_results': new_results, 'cursor': last_id}
+    return payload, last_completed
+
+
+def groups_delta(user):
+    """The groups a user sees, with their member counts."""
+    if user.role in ['admin', 'teacher']:
+        groups = Group.objects.all()
+    else:
+        groups = Group.objects.filter(
+            Q(leader=user) | Q(members__user=user)
+        ).distinct()
+    rows = groups.annotate(member_count=Count('members', distinct=True)).order_by('id').values('id', 'name', 'member_count')
+    return {'count': len(rows), 'groups': list(rows)}, None
@@ -0,0 +1,226 @@
+# core/exports.py
+"""
+Streaming export of a quiz's results for ``export_quiz_results_view``.
+
+A quiz can have 100k results, so nothing here builds the whole file. Results
+are read with ``.iterator()`` in chunks of ``RESULTS_EXPORT_CHUNK_SIZE``. For
+each chunk, the answers of the matching sessions are fetched in keyset
+batches and turned into one correct/wrong column per question. Rows are then
+encoded and handed to a ``StreamingHttpResponse``. Memory stays at one chunk
+whatever the size of the quiz.
+
+Each Result points at the QuizSession it graded (``Result.session``); a
+result whose session is gone, or that predates the link and could not be
+matched by migration 0017, exports without per-question columns.
+
+XLSX is written without a spreadsheet library: the file is a zip of a few
+fixed XML parts plus the sheet. ``zipfile`` writes it into a sink that does
+not seek, and the sink is drained after every few hundred rows.
+"""
+import csv
+import zipfile
+from itertools import islice
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import UserAnswer
+
+RESULTS_EXPORT_CHUNK_SIZE = getattr(settings, 'RESULTS_EXPORT_CHUNK_SIZE', 2000)
+# UserAnswer rows per keyset batch
+ANSWER_BATCH_SIZE = 5000
+# Rows written between two drains of the XLSX sink
+XLSX_FLUSH_ROWS = 200
+
+RESULT_COLUMNS = [
+    'Корбар', 'Ном', 'Почтаи электронӣ', 'Хол', 'Саволҳо', 'Ҷавобҳои дуруст',
+    'Фоиз', 'Гузашт', 'Анҷом ёфт',
+]
+
+
+def filter_results(results, quiz, search='', status=''):
+    """Apply the search and passed/failed filters of ``quiz_results_view`` to Results or Ratings."""
+    if search:
+        results = results.filter(
+            Q(user__username__icontains=search) |
+            Q(user__first_name__icontains=search) |
+            Q(user__last_name__icontains=search) |
+            Q(user__email__icontains=search)
+        )
+    pass_score = quiz.pass_percentage * quiz.question_count / 100
+    if status == 'passed':
+        results = results.filter(score__gte=pass_score)
+    elif status == 'failed':
+        results = results.filter(score__lt=pass_score)
+    return results
+
+
+def _correctness(session_ids):
+    """``{session_id: {question_id: is_correct}}``, read in keyset batches by id."""
+    answers = {}
+    if not session_ids:
+        return answers
+    last_id = 0
+    while True:
+        batch = list(
+            UserAnswer.objects.filter(session_id__in=session_ids, id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'session_id', 'question_id', 'answer__is_correct')[:ANSWER_BATCH_SIZE]
+        )
+        for answer_id, session_id, question_id, is_correct in batch:
+            answers.setdefault(session_id, {})[question_id] = is_correct
+        if len(batch) < ANSWER_BATCH_SIZE:
+            return answers
+        last_id = batch[-1][0]
+
+
+def result_rows(quiz, results, chunk_size=RESULTS_EXPORT_CHUNK_SIZE):
+    """
+    Yield the header and then one list of cells per result.
+
+    Each question gets a column: 1 for a correct answer, 0 for a wrong one,
+    empty when it was not answered or the session is unknown.
+    """
+    question_ids = list(quiz.questions.order_by('order', 'id').values_list('id', flat=True))
+    yield RESULT_COLUMNS + [f'С{number}' for number in range(1, len(question_ids) + 1)]
+
+    rows = results.select_related('user').order_by('pk').iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        session_ids = {result.session_id for result in chunk if result.session_id is not None}
+        answers = _correctness(session_ids)
+        for result in chunk:
+            user = result.user
+            percentage = round(result.percentage(), 1)
+            correct = answers.get(result.session_id, {})
+            yield [
+                user.username if user else '',
+                user.get_full_name() if user else '',
+                user.email if user else '',
+                result.score,
+                result.total_questions,
+                result.correct_answers,
+                percentage,
+                'Ҳа' if percentage >= quiz.pass_percentage else 'Не',
+                timezone.localtime(result.completed_at).strftime('%Y-%m-%d %H:%M'),
+            ] + [
+                '' if question_id not in correct else int(bool(correct[question_id]))
+                for question_id in question_ids
+            ]
+
+
+# -- CSV -----------------------------------------------------------------------
+
+class _Echo:
+    """File-like object whose ``write`` returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows):
+    writer = csv.writer(_Echo())
+    # BOM, so Excel opens the Cyrillic text as UTF-8
+    yield '\ufeff'
+    for row in rows:
+        yield writer.writerow(row)
+
+
+# -- XLSX ----------------------------------------------------------------------
+
+_XLSX_PARTS = [
+    ('[Content_Types].xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+     '<Default Extension="xml" ContentType="application/xml"/>'
+     '<Override PartName="/xl/workbook.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+     '<Override PartName="/xl/worksheets/sheet1.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+     '</Types>'),
+    ('_rels/.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" '
+     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+     'Target="xl/workbook.xml"/>'
+     '</Relationships>'),
+    ('xl/workbook.xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+     'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+     '<sheets><sheet name="Results" sheetId="1" r:id="rId1"/></sheets>'
+     '</workbook>'),
+    ('xl/_rels/workbook.xml.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" '
+     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+     'Target="worksheets/sheet1.xml"/>'
+     '</Relationships>'),
+]
+
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+# Control characters are not allowed in XML 1.0
+_XML_ILLEGAL = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+
+class _Sink:
+    """Write-only, non-seekable target for ``zipfile``; ``drain`` returns what was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _cell(value):
+    if value == '' or value is None:
+        return '<c/>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = escape(str(value).translate(_XML_ILLEGAL))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def xlsx_stream(rows):
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS:
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(_SHEET_HEAD.encode())
+            for number, row in enumerate(rows, 1):
+                sheet.write(f'<row r="{number}">{"".join(_cell(value) for value in row)}</row>'.encode())
+                if number % XLSX_FLUSH_ROWS == 0:
+                    yield sink.drain()
+            sheet.write(_SHEET_TAIL.encode())
+    yield sink.drain()
+
+
+EXPORT_FORMATS = {
+    # format: (stream, content type, file extension)
+    'csv': (csv_stream, 'text/csv; charset=utf-8', 'csv'),
+    'excel': (xlsx_stream, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'xlsx': (xlsx_stream, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
@@ -185,6 +185,15 @@ class QuizForm(forms.ModelForm):
         return cleaned_data
 
 
+class QuizCloneForm(QuizForm):
+    """What may differ in a copy of a quiz: title, subject, schedule and level range"""
+    class Meta(QuizForm.Meta):
+        fields = [
+            'title', 'subject', 'level_type', 'start_level', 'end_level',
+            'start_time', 'end_time',
+        ]
+
+
 class QuestionForm(forms.ModelForm):
     class Meta:
         model = Question
@@ -312,18 +321,36 @@ class QuizFilterForm(forms.Form):
     subject = forms.ModelChoiceField(
         required=False,
         queryset=Subject.objects.all(),
-        widget=forms.Select(attrs={'class': 'form-control'}),
+        empty_label='Ҳама фанҳо',
+        widget=forms.Select(attrs={'class': 'form-select'}),
         label='Фан'
     )
     status = forms.ChoiceField(
         required=False,
-        choices=Quiz.STATUS_CHOICES,
-        widget=forms.Select(attrs={'class': 'form-control'}),
+        choices=[('', 'Ҳама статусҳо')] + list(Quiz.STATUS_CHOICES),
+        widget=forms.Select(attrs={'class': 'form-select'}),
         label='Статус'
     )
     quiz_mode = forms.ChoiceField(
         required=False,
-        choices=Quiz.MODE_CHOICES,
-        widget=forms.Select(attrs={'class': 'form-control'}),
+        choices=[('', 'Ҳама реҷаҳо')] + list(Quiz.MODE_CHOICES),
+        widget=forms.Select(attrs={'class': 'form-select'}),
         label='Реҷа'
-    )
\ No newline at end of file
+    )
+
+class QuestionImportForm(forms.Form):
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.json,.jsonl,.gift,.txt'}),
+        label='Файл'
+    )
+    format = forms.ChoiceField(
+        required=False,
+        choices=[('', 'Аз рӯи васеъшавии файл'), ('csv', 'CSV'), ('json', 'JSON'), ('gift', 'GIFT')],
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label='Формат'
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        label='Танҳо санҷидан, ворид накардан'
+    )
@@ -0,0 +1,75 @@
+# core/grading.py
+"""
+Set-based grading of quiz sessions.
+
+A session is graded from its ``(question_id, answer_id)`` pairs, read in one
+query, against the compiled answer key of its quiz (see ``core/answer_key.py``),
+so grading never reads ``Answer`` or ``Question`` rows once the key is warm.
+
+With a warm key, grading any number of sessions is one query. A cold key adds
+the two queries that compile it, plus whatever the cache backend costs: with
+the database cache (``QUIZ_CACHE_BACKEND=db``) each cache lookup is a query
+too. ``manage.py bench_grading`` reports all three cases.
+"""
+from collections import defaultdict
+from typing import NamedTuple
+
+from .answer_key import get_answer_keys
+from .models import QuizSession, UserAnswer
+
+
+class Grade(NamedTuple):
+    score: int
+    correct_answers: int
+    total_questions: int
+
+
+def _answer_pairs(session_ids):
+    """``{session_id: [(question_id, answer_id), ...]}`` in one query."""
+    pairs = defaultdict(list)
+    rows = (
+        UserAnswer.objects.filter(session_id__in=session_ids)
+        .order_by()
+        .values_list('session_id', 'question_id', 'answer_id')
+    )
+    for session_id, question_id, answer_id in rows:
+        pairs[session_id].append((question_id, answer_id))
+    return pairs
+
+
+def grade_sessions(sessions):
+    """
+    Grade many sessions at once.
+
+    ``sessions`` is an iterable of ``QuizSession`` objects (or a queryset).
+    Returns ``{session_id: Grade}`` using a single query for the answers
+    regardless of how many sessions or questions there are.
+    """
+    sessions = list(sessions)
+    if not sessions:
+        return {}
+
+    keys = get_answer_keys(s.quiz_id for s in sessions)
+    pairs = _answer_pairs([s.pk for s in sessions])
+
+    grades = {}
+    for session in sessions:
+        key = keys[session.quiz_id]
+        score, correct = key.score(pairs.get(session.pk, ()))
+        grades[session.pk] = Grade(
+            score=score,
+            correct_answers=correct,
+            total_questions=key.total_questions,
+        )
+    return grades
+
+
+def grade_session(session):
+    """Grade a single session."""
+    return grade_sessions([session])[session.pk]
+
+
+def grade_session_ids(session_ids):
+    """Grade sessions by primary key; loads only the columns grading needs."""
+    sessions = QuizSession.objects.filter(pk__in=session_ids).only('id', 'quiz_id')
+    return grade_sessions(sessions)
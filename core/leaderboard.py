@@ -0,0 +1,196 @@
+# core/leaderboard.py
+"""
+Precomputed leaderboards stored in ``Rating``.
+
+Every user (and group, for group results) has one Rating row per quiz holding
+its best score and its rank among entities of the same type. Ranks use
+standard competition ranking ("1224"): rank = 1 + number of entities with a
+strictly higher score.
+
+``update_ratings`` keeps the board current as results arrive: it upserts the
+entity's row and shifts the ranks of the entities it overtook with a single
+UPDATE. ``rerank`` renumbers whole boards in one pass with a window function,
+and ``rebuild_ratings`` recreates the rows from the Result table; it also runs
+after a Result is deleted (see ``core/signals.py``), since a best score can
+only go down by recomputing it.
+``best_results`` maps a page of a user board back to the Result rows behind
+it, for pages such as ``quiz_results_view`` that link to each result.
+"""
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Exists, F, Max, OuterRef, Window
+from django.db.models.functions import Rank
+
+from .models import Rating, Result
+
+BATCH_SIZE = 1000
+
+
+def _entities(result):
+    if result.user_id:
+        yield 'user', result.user_id
+    if result.group_id:
+        yield 'group', result.group_id
+
+
+def _rating(quiz_id, entity_type, entity_id, score, rank=0):
+    return Rating(
+        quiz_id=quiz_id,
+        entity_type=entity_type,
+        user_id=entity_id if entity_type == 'user' else None,
+        group_id=entity_id if entity_type == 'group' else None,
+        entity_key=Rating.make_entity_key(entity_type, entity_id),
+        rank=rank,
+        score=score,
+    )
+
+
+def _promote(quiz_id, entity_type, entity_id, score):
+    board = Rating.objects.filter(quiz_id=quiz_id, entity_type=entity_type)
+    entity_key = Rating.make_entity_key(entity_type, entity_id)
+
+    current = board.select_for_update().filter(entity_key=entity_key).only('score').first()
+    old_score = current.score if current else None
+    if old_score is not None and score <= old_score:
+        return
+
+    # Entities this one just overtook move down one place.
+    overtaken = board.filter(score__lt=score)
+    if old_score is not None:
+        overtaken = overtaken.filter(score__gte=old_score).exclude(entity_key=entity_key)
+    overtaken.update(rank=F('rank') + 1)
+
+    rank = board.filter(score__gt=score).count() + 1
+    Rating.objects.bulk_create(
+        [_rating(quiz_id, entity_type, entity_id, score, rank)],
+        update_conflicts=True,
+        unique_fields=['quiz', 'entity_key'],
+        update_fields=['rank', 'score'],
+    )
+
+
+def update_ratings(result):
+    """Fold a new Result into the user and group boards of its quiz."""
+    with transaction.atomic():
+        for entity_type, entity_id in _entities(result):
+            _promote(result.quiz_id, entity_type, entity_id, result.score)
+
+
+def rerank(quiz_ids=None):
+    """
+    Renumber ranks of every board (or of ``quiz_ids``) in one pass.
+
+    Returns the number of rows whose rank changed.
+    """
+    ratings = Rating.objects.all()
+    if quiz_ids is not None:
+        ratings = ratings.filter(quiz_id__in=quiz_ids)
+    ratings = ratings.annotate(
+        new_rank=Window(
+            expression=Rank(),
+            partition_by=[F('quiz_id'), F('entity_type')],
+            order_by=F('score').desc(),
+        )
+    ).only('id', 'rank')
+
+    changed = []
+    updated = 0
+    with transaction.atomic():
+        for rating in ratings.iterator(chunk_size=BATCH_SIZE):
+            if rating.rank != rating.new_rank:
+                rating.rank = rating.new_rank
+                changed.append(rating)
+            if len(changed) >= BATCH_SIZE:
+                Rating.objects.bulk_update(changed, ['rank'])
+                updated += len(changed)
+                changed = []
+        Rating.objects.bulk_update(changed, ['rank'])
+        updated += len(changed)
+    return updated
+
+
+def rebuild_ratings(quiz_ids=None):
+    """
+    Upsert every entity's best score from Result, drop the rows of entities
+    that no longer have a result, then rerank.
+    """
+    results = Result.objects.order_by()
+    ratings = Rating.objects.all()
+    if quiz_ids is not None:
+        results = results.filter(quiz_id__in=quiz_ids)
+        ratings = ratings.filter(quiz_id__in=quiz_ids)
+
+    with transaction.atomic():
+        for entity_type, field in (('user', 'user_id'), ('group', 'group_id')):
+            ratings.filter(entity_type=entity_type).exclude(
+                Exists(Result.objects.filter(quiz_id=OuterRef('quiz_id'), **{field: OuterRef(field)}))
+            ).delete()
+        for entity_type, field in (('user', 'user_id'), ('group', 'group_id')):
+            best = (
+                results.filter(**{f'{field}__isnull': False})
+                .values('quiz_id', field)
+                .annotate(best=Max('score'))
+            )
+            batch = []
+            for row in best.iterator(chunk_size=BATCH_SIZE):
+                batch.append(_rating(row['quiz_id'], entity_type, row[field], row['best']))
+                if len(batch) >= BATCH_SIZE:
+                    _upsert_scores(batch)
+                    batch = []
+            _upsert_scores(batch)
+        return rerank(quiz_ids)
+
+
+def _upsert_scores(ratings):
+    if ratings:
+        Rating.objects.bulk_create(
+            ratings,
+            update_conflicts=True,
+            unique_fields=['quiz', 'entity_key'],
+            update_fields=['score'],
+        )
+
+
+def leaderboard_page(quiz, entity_type='user', page=1, per_page=20):
+    """One page of a quiz's precomputed board."""
+    board = (
+        Rating.objects.filter(quiz=quiz, entity_type=entity_type)
+        .select_related('user', 'group')
+        .order_by('rank', 'id')
+    )
+    return Paginator(board, per_page).get_page(page)
+
+
+def entity_rank(quiz, entity_type, entity_id):
+    """Precomputed rank of one entity, or None if it has no result yet."""
+    return (
+        Rating.objects.filter(quiz=quiz, entity_key=Rating.make_entity_key(entity_type, entity_id))
+        .values_list('rank', flat=True)
+        .first()
+    )
+
+
+def best_results(quiz, ratings):
+    """
+    The best Result of every user rating in ``ratings``, in board order, with
+    ``rank`` and ``score_percentage`` set. Costs one query; ratings whose
+    results have since been deleted are left out.
+    """
+    ratings = list(ratings)
+    best = {}
+    results = (
+        Result.objects.filter(quiz=quiz, user_id__in=[rating.user_id for rating in ratings])
+        .select_related('user')
+        .order_by('user_id', '-score', 'completed_at', 'id')
+    )
+    for result in results:
+        best.setdefault(result.user_id, result)
+
+    rows = []
+    for rating in ratings:
+        result = best.get(rating.user_id)
+        if result is not None:
+            result.rank = rating.rank
+            result.score_percentage = result.percentage()
+            rows.append(result)
+    return rows
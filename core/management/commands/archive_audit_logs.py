@@ -0,0 +1,30 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.audit_archive import AUDIT_ARCHIVE_DIR, AUDIT_RETENTION_DAYS, archive_audit_logs
+
+
+class Command(BaseCommand):
+    help = 'Move AuditLog rows older than the retention window into monthly .jsonl.gz archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=AUDIT_RETENTION_DAYS,
+                            help='Keep this many days of logs in the database')
+        parser.add_argument('--dir', default=str(AUDIT_ARCHIVE_DIR),
+                            help='Archive directory')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the rows that would be archived')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - datetime.timedelta(days=options['days'])
+        count = archive_audit_logs(
+            before=before,
+            archive_dir=options['dir'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {count} audit log rows older than {before:%Y-%m-%d}'))
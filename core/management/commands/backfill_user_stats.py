@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.user_stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Build or rebuild the UserStats rows from the QuizSession and Result tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only rebuild this user (may be repeated)')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Users rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        written = rebuild_user_stats(options['user_ids'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {written} users'))
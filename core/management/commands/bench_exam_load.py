@@ -0,0 +1,184 @@
+import datetime
+import json
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core.answer_key import invalidate_answer_key
+from core.models import Answer, Question, Quiz, QuizSession, User
+from core.quiz_paper import pin_session_paper
+
+PROFILES = ('default', 'sqlite-production')
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate parallel test-takers posting answers to quiz_take_view and '
+        'save_answer_ajax_view on a scratch SQLite database; report p50/p99 '
+        'latency and lock errors with and without the sqlite-production profile'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50, help='Parallel test-takers')
+        parser.add_argument('--questions', type=int, default=20, help='Questions per quiz')
+        parser.add_argument('--profile', choices=PROFILES + ('both',), default='both')
+        parser.add_argument('--keep', action='store_true', help='Keep the scratch databases')
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('bench_exam_load measures SQLite only.')
+
+        profiles = PROFILES if options['profile'] == 'both' else (options['profile'],)
+        db = connections.settings['default']
+        original = {key: db.get(key) for key in ('NAME', 'OPTIONS', 'PRAGMAS')}
+        scratch = Path(tempfile.mkdtemp(prefix='bench_exam_load_'))
+        try:
+            for profile in profiles:
+                self._use_database(db, scratch / f'{profile}.sqlite3', profile)
+                self._run(profile, options['students'], options['questions'])
+        finally:
+            self._restore(db, original)
+            if not options['keep']:
+                for path in scratch.iterdir():
+                    path.unlink()
+                scratch.rmdir()
+            else:
+                self.stdout.write(f'Scratch databases kept in {scratch}')
+
+    # -- database switching --------------------------------------------------
+
+    def _use_database(self, db, path, profile):
+        """Point the default alias at a fresh file with the given profile."""
+        connections.close_all()
+        db['NAME'] = str(path)
+        if profile == 'sqlite-production':
+            db['OPTIONS'] = dict(settings.SQLITE_PRODUCTION_OPTIONS)
+            db['PRAGMAS'] = dict(settings.SQLITE_PRODUCTION_PRAGMAS)
+        else:
+            db['OPTIONS'] = {}
+            db.pop('PRAGMAS', None)
+        call_command('migrate', verbosity=0, interactive=False)
+
+    def _restore(self, db, original):
+        connections.close_all()
+        for key, value in original.items():
+            if value is None:
+                db.pop(key, None)
+            else:
+                db[key] = value
+
+    # -- scenario ------------------------------------------------------------
+
+    def _seed(self, students, question_count):
+        now = timezone.now()
+        teacher = User.objects.create(username='bench-teacher', email='bench-teacher@example.invalid', role='teacher')
+        quiz = Quiz.objects.create(
+            title='bench exam', quiz_mode='individual', level_type='school',
+            start_level=1, end_level=11, start_time=now - datetime.timedelta(minutes=1),
+            end_time=now + datetime.timedelta(hours=2), status='active', time_limit=120,
+            created_by=teacher,
+        )
+        questions = Question.objects.bulk_create(
+            Question(quiz=quiz, text=f'Q{i}', points=1, order=i + 1) for i in range(question_count)
+        )
+        Answer.objects.bulk_create(
+            Answer(question=q, text=f'A{j}', is_correct=(j == 0)) for q in questions for j in range(4)
+        )
+        # bulk_create sends no signals; drop whatever an earlier run cached for this quiz id.
+        invalidate_answer_key(quiz.pk)
+
+        users = User.objects.bulk_create(
+            User(username=f'bench-student-{i}', email=f'bench-student-{i}@example.invalid')
+            for i in range(students)
+        )
+        sessions = QuizSession.objects.bulk_create(QuizSession(quiz=quiz, user=u) for u in users)
+        for session in sessions:
+            pin_session_paper(session, quiz.time_limit)
+        return quiz, list(zip(users, sessions))
+
+    def _run(self, profile, students, question_count):
+        quiz, takers = self._seed(students, question_count)
+        paper = pin_session_paper(takers[0][1], quiz.time_limit)
+        connections.close_all()
+
+        latencies = {'take': [], 'ajax': []}
+        errors = {'take': 0, 'ajax': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(takers))
+
+        def take_quiz(user, session):
+            client = Client(SERVER_NAME='localhost')
+            client.force_login(user)
+            take_url = reverse('quiz_take', kwargs={'session_pk': session.pk})
+            ajax_url = reverse('save_answer_ajax')
+            local = {'take': [], 'ajax': []}
+            failed = {'take': 0, 'ajax': 0}
+            try:
+                barrier.wait()
+                for index, question in enumerate(paper):
+                    answer_id = question['answers'][index % len(question['answers'])]['id']
+
+                    started = time.perf_counter()
+                    try:
+                        response = client.post(f'{take_url}?question={index}', {'answer': answer_id})
+                        # The view redirects to the next question or the finish page;
+                        # any other target means it caught an error.
+                        ok = response.status_code == 302 and (
+                            take_url in response.url or 'finish' in response.url
+                        )
+                    except OperationalError:
+                        ok = False
+                    local['take'].append(time.perf_counter() - started)
+                    failed['take'] += not ok
+
+                    started = time.perf_counter()
+                    try:
+                        response = client.post(ajax_url, json.dumps({
+                            'session_id': session.pk, 'question_id': question['id'], 'answer_id': answer_id,
+                        }), content_type='application/json')
+                        ok = response.status_code == 200 and json.loads(response.content)['success']
+                    except OperationalError:
+                        ok = False
+                    local['ajax'].append(time.perf_counter() - started)
+                    failed['ajax'] += not ok
+            finally:
+                connections.close_all()
+                with lock:
+                    for endpoint in latencies:
+                        latencies[endpoint].extend(local[endpoint])
+                        errors[endpoint] += failed[endpoint]
+
+        threads = [threading.Thread(target=take_quiz, args=taker) for taker in takers]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f'{profile}: {students} students x {question_count} questions in {elapsed:.1f} s')
+        for endpoint, values in latencies.items():
+            self.stdout.write(
+                f'  {endpoint:<5} {len(values):>6} requests | '
+                f'p50 {_percentile(values, 50) * 1000:8.1f} ms | '
+                f'p99 {_percentile(values, 99) * 1000:8.1f} ms | '
+                f'errors {errors[endpoint]}'
+            )
@@ -0,0 +1,81 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.answer_key import invalidate_answer_key
+from core.grading import grade_session, grade_sessions
+from core.models import Answer, Question, Quiz, QuizSession, User, UserAnswer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark session grading: query count and time per quiz size (data is rolled back). '
+        'A cold key costs 2 extra queries to compile; with the database cache backend every '
+        'cache lookup is a query as well'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,50,200,500',
+                            help='Comma separated question counts')
+        parser.add_argument('--sessions', type=int, default=20,
+                            help='Sessions graded in the batch run')
+
+    def handle(self, *args, **options):
+        sizes = [int(n) for n in options['sizes'].split(',') if n]
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username='__bench_grading__', email='bench-grading@example.invalid')
+                for size in sizes:
+                    self._run(user, size, options['sessions'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, user, size, session_count):
+        now = timezone.now()
+        quiz = Quiz.objects.create(
+            title=f'bench {size}', quiz_mode='individual', level_type='school',
+            start_level=1, end_level=11, start_time=now,
+            end_time=now + datetime.timedelta(hours=1), created_by=user,
+        )
+        questions = Question.objects.bulk_create(
+            Question(quiz=quiz, text=f'Q{i}', points=1 + i % 3, order=i + 1)
+            for i in range(size)
+        )
+        answers = Answer.objects.bulk_create(
+            Answer(question=q, text=f'A{j}', is_correct=(j == 0))
+            for q in questions for j in range(4)
+        )
+        sessions = QuizSession.objects.bulk_create(
+            QuizSession(quiz=quiz, user=user) for _ in range(session_count)
+        )
+        UserAnswer.objects.bulk_create(
+            UserAnswer(session=s, question=answers[i].question, answer=answers[i + (k + i) % 2])
+            for k, s in enumerate(sessions) for i in range(0, len(answers), 4)
+        )
+
+        invalidate_answer_key(quiz.pk)
+        cold, cold_ms = self._measure(grade_session, sessions[0])
+        warm, warm_ms = self._measure(grade_session, sessions[0])
+        batch, batch_ms = self._measure(grade_sessions, sessions)
+
+        self.stdout.write(
+            f'{size:>5} questions: cold single {cold} queries {cold_ms:.1f} ms | '
+            f'warm single {warm} queries {warm_ms:.1f} ms | '
+            f'warm batch of {session_count} {batch} queries {batch_ms:.1f} ms'
+        )
+
+    def _measure(self, grade, arg):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            grade(arg)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        return len(queries), elapsed_ms
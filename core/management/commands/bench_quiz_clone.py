@@ -0,0 +1,81 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Answer, Question, Quiz, User
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark copying a quiz row by row vs Quiz.clone(): queries and time (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=500,
+                            help='Questions in the source quiz')
+        parser.add_argument('--answers', type=int, default=4,
+                            help='Answers per question')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username='__bench_clone__', email='bench-clone@example.invalid')
+                quiz = self._source(user, options['questions'], options['answers'])
+                self._report('row by row', lambda: self._copy_rows(quiz))
+                self._report('Quiz.clone()', lambda: quiz.clone(
+                    start_time=quiz.start_time + datetime.timedelta(days=120),
+                ))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _source(self, user, size, answers_per_question):
+        now = timezone.now()
+        quiz = Quiz.objects.create(
+            title=f'bench clone {size}', quiz_mode='individual', level_type='school',
+            start_level=1, end_level=11, start_time=now,
+            end_time=now + datetime.timedelta(hours=2), created_by=user,
+            question_count=size, total_points=sum(1 + i % 3 for i in range(size)),
+        )
+        questions = Question.objects.bulk_create(
+            Question(quiz=quiz, text=f'Q{i}', points=1 + i % 3, order=i + 1, answer_count=answers_per_question)
+            for i in range(size)
+        )
+        Answer.objects.bulk_create(
+            Answer(question=q, text=f'A{j}', is_correct=(j == 0))
+            for q in questions for j in range(answers_per_question)
+        )
+        return quiz
+
+    def _copy_rows(self, quiz):
+        # What copying through the admin or the forms amounts to
+        copy = Quiz.objects.create(
+            title=f'{quiz.title} (copy)', quiz_mode=quiz.quiz_mode, level_type=quiz.level_type,
+            start_level=quiz.start_level, end_level=quiz.end_level,
+            start_time=quiz.start_time, end_time=quiz.end_time, created_by=quiz.created_by,
+        )
+        for question in quiz.questions.prefetch_related('answers'):
+            new_question = Question.objects.create(
+                quiz=copy, text=question.text, question_type=question.question_type,
+                points=question.points, hint=question.hint, explanation=question.explanation,
+            )
+            for answer in question.answers.all():
+                Answer.objects.create(question=new_question, text=answer.text, is_correct=answer.is_correct)
+        return copy
+
+    def _report(self, label, copy):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            quiz = copy()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        quiz.refresh_from_db()
+        self.stdout.write(
+            f'{label:>14}: {len(queries)} queries {elapsed_ms:.1f} ms '
+            f'({quiz.question_count} questions, {quiz.total_points} points)'
+        )
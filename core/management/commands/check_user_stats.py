@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from core.user_stats import find_inconsistent_user_stats, rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Compare the UserStats rows with the QuizSession and Result tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only check this user (may be repeated)')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Users compared per batch')
+        parser.add_argument('--fix', action='store_true',
+                            help='Rebuild the rows that differ')
+
+    def handle(self, *args, **options):
+        bad = []
+        for user_id, fields in find_inconsistent_user_stats(options['user_ids'], chunk_size=options['chunk_size']):
+            bad.append(user_id)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  user {user_id}: {", ".join(fields)}')
+
+        if not bad:
+            self.stdout.write(self.style.SUCCESS('All user stats are consistent'))
+            return
+        if options['fix']:
+            rebuild_user_stats(bad, chunk_size=options['chunk_size'])
+            self.stdout.write(f'Rebuilt: {len(bad)} users')
+        else:
+            self.stdout.write(self.style.WARNING(f'Inconsistent: {len(bad)} users'))
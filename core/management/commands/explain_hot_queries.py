@@ -0,0 +1,76 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import AuditLog, Quiz, QuizSession, Result
+
+
+def hot_queries():
+    """The hottest filters of core/views.py and the index meant to serve each."""
+    return [
+        ('open session of a user in a quiz',
+         QuizSession.objects.filter(quiz_id=1, user_id=1, finished_at__isnull=True),
+         'qsession_open_idx'),
+        ('finished sessions of a user',
+         QuizSession.objects.filter(user_id=1, finished_at__isnull=False),
+         'qsession_user_finished_idx'),
+        ('quiz results by rank',
+         Result.objects.filter(quiz_id=1).order_by('-score', 'completed_at')[:10],
+         'result_quiz_rank_idx'),
+        ('recent results of a user',
+         Result.objects.filter(user_id=1).order_by('-completed_at')[:5],
+         'result_user_recent_idx'),
+        ('available quizzes for a level',
+         Quiz.objects.filter(
+             status='active', level_type='school',
+             start_level__lte=5, end_level__gte=5,
+         ),
+         'quiz_available_idx'),
+        ('recent audit log',
+         AuditLog.objects.all()[:10],
+         'auditlog_recent_idx'),
+    ]
+
+
+def find_table_scans(vendor, plan):
+    """Return the plan lines that read a whole table instead of an index."""
+    lines = plan.splitlines()
+    if vendor == 'sqlite':
+        return [line for line in lines if re.search(r'\bSCAN \w+', line) and 'USING' not in line]
+    if vendor == 'postgresql':
+        return [line for line in lines if 'Seq Scan' in line]
+    raise CommandError(f'EXPLAIN checks are not implemented for {vendor}')
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot queries and fail if any of them falls back to a table scan'
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        failures = []
+
+        with transaction.atomic():
+            if vendor == 'postgresql':
+                # Tiny development tables make a seq scan look cheapest; we
+                # want to know whether an index *can* serve the query.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for label, queryset, index_name in hot_queries():
+                plan = queryset.explain()
+                scans = find_table_scans(vendor, plan)
+                if scans:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(f'SCAN   {label}'))
+                    for line in scans:
+                        self.stdout.write(f'         {line.strip()}')
+                elif index_name not in plan:
+                    self.stdout.write(self.style.WARNING(f'INDEX  {label} (planner chose another index)'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'INDEX  {label} ({index_name})'))
+                if options['verbosity'] > 1:
+                    self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries use a table scan: {", ".join(failures)}')
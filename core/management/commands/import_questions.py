@@ -0,0 +1,51 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Quiz
+from core.question_import import (
+    IMPORT_FORMATS,
+    QUESTION_IMPORT_CHUNK_SIZE,
+    detect_format,
+    import_question_file,
+)
+
+
+class Command(BaseCommand):
+    help = 'Import questions and answers into a quiz from a CSV, JSON or GIFT file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help='File format (default: from the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=QUESTION_IMPORT_CHUNK_SIZE,
+                            help='Questions inserted per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only validate the file')
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.get(pk=options['quiz_id'])
+        except Quiz.DoesNotExist:
+            raise CommandError(f'Quiz {options["quiz_id"]} does not exist')
+
+        import_format = options['format'] or detect_format(options['path'])
+        if import_format is None:
+            raise CommandError('Cannot tell the format from the file name, pass --format')
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = import_question_file(
+                    quiz, stream, import_format,
+                    chunk_size=options['chunk_size'], dry_run=options['dry_run'],
+                )
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(f'Cannot read {options["path"]}: {e}')
+
+        for row, message in report.errors:
+            self.stderr.write(f'  row {row}: {message}')
+        verb = 'Valid' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb}: {report.created} questions into "{quiz.title}", rejected: {len(report.errors)}'
+        ))
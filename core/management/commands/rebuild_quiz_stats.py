@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.quiz_stats import rebuild_quiz_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the QuizStats summary rows from the Result table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, action='append', dest='quiz_ids',
+                            help='Only rebuild this quiz (may be repeated)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        written = rebuild_quiz_stats(options['quiz_ids'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {written} quizzes'))
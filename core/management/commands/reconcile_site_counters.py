@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.stats import SITE_COUNTERS, reconcile_site_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount the SiteCounter rows shown on the home page and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*',
+                            help=f'Counters to reconcile (default: all of {", ".join(SITE_COUNTERS)})')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report the drift')
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(SITE_COUNTERS)
+        if unknown:
+            raise CommandError(f'Unknown counters: {", ".join(sorted(unknown))}')
+        report = reconcile_site_counters(options['names'] or None, dry_run=options['dry_run'])
+        for name, (stored, actual) in report.items():
+            if stored == actual:
+                self.stdout.write(f'{name}: {actual}')
+            else:
+                verb = 'would be fixed' if options['dry_run'] else 'fixed'
+                self.stdout.write(self.style.WARNING(f'{name}: {stored} -> {actual} ({verb})'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.quiz_counts import repair_counts
+
+
+class Command(BaseCommand):
+    help = 'Fix Quiz.question_count/total_points and Question.answer_count that drifted from the real rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report what is out of date')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Rows recomputed per UPDATE')
+
+    def handle(self, *args, **options):
+        quiz_ids, question_ids = repair_counts(dry_run=options['dry_run'], chunk_size=options['chunk_size'])
+        verb = 'Out of date' if options['dry_run'] else 'Repaired'
+        self.stdout.write(f'{verb}: {len(quiz_ids)} quizzes, {len(question_ids)} questions')
+        if quiz_ids and options['verbosity'] > 1:
+            self.stdout.write(f'  quizzes: {quiz_ids}')
+        if question_ids and options['verbosity'] > 1:
+            self.stdout.write(f'  questions: {question_ids}')
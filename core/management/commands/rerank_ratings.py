@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.leaderboard import rebuild_ratings, rerank
+
+
+class Command(BaseCommand):
+    help = 'Renumber leaderboard ranks in one pass (optionally rebuilding Rating rows from Result)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, action='append', dest='quiz_ids',
+                            help='Only this quiz (may be repeated)')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute best scores from Result before reranking')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            changed = rebuild_ratings(options['quiz_ids'])
+        else:
+            changed = rerank(options['quiz_ids'])
+        self.stdout.write(self.style.SUCCESS(f'{changed} ranks updated'))
@@ -0,0 +1,31 @@
+import logging
+import signal
+
+from django.core.management.base import BaseCommand
+
+from core.scheduler import QuizScheduler, apply_due_transitions
+
+
+class Command(BaseCommand):
+    help = 'Apply quiz start/end status transitions exactly when they are due'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Apply the transitions that are due now and exit')
+        parser.add_argument('--refresh-interval', type=int, default=60,
+                            help='Seconds between reloads of upcoming quizzes')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            changed = apply_due_transitions()
+            for status, ids in changed.items():
+                self.stdout.write(f'{status}: {len(ids)} quizzes')
+            return
+
+        logging.basicConfig(level=logging.INFO)
+        scheduler = QuizScheduler(refresh_interval=options['refresh_interval'])
+        signal.signal(signal.SIGTERM, lambda *args: scheduler.stop())
+        signal.signal(signal.SIGINT, lambda *args: scheduler.stop())
+        self.stdout.write('Quiz scheduler started')
+        scheduler.run_forever()
+        self.stdout.write('Quiz scheduler stopped')
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.replicas import REPLICA_DATABASE_ALIAS, replica_configured
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the default SQLite database into the stand-in replica file '
+        '(QUIZ_REPLICA_DB). With --interval, keep copying to emulate replication lag.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Seconds between copies; 0 copies once')
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError('No replica configured; set QUIZ_REPLICA_DB to a file path.')
+        source = connections[DEFAULT_DB_ALIAS]
+        target = connections[REPLICA_DATABASE_ALIAS]
+        if source.vendor != 'sqlite' or target.vendor != 'sqlite':
+            raise CommandError('sync_replica only copies SQLite files; use real replication elsewhere.')
+
+        while True:
+            started = time.perf_counter()
+            source.ensure_connection()
+            target.ensure_connection()
+            # Online backup: consistent snapshot, readers of the target are not torn.
+            source.connection.backup(target.connection)
+            self.stdout.write(
+                f'Copied {source.settings_dict["NAME"]} -> {target.settings_dict["NAME"]} '
+                f'in {(time.perf_counter() - started) * 1000:.0f} ms'
+            )
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
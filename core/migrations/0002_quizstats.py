@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 04:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('participants', models.IntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('score_sq_sum', models.FloatField(default=0)),
+                ('min_score', models.FloatField(blank=True, null=True)),
+                ('max_score', models.FloatField(blank=True, null=True)),
+                ('pass_count', models.IntegerField(default=0)),
+                ('histogram', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='core.quiz')),
+            ],
+            options={
+                'verbose_name': 'Омори викторина',
+                'verbose_name_plural': 'Омори викторинаҳо',
+            },
+        ),
+    ]
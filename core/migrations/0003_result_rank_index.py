@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_quizstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['quiz', '-score', 'completed_at'], name='result_quiz_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 04:25
+
+from django.db import migrations, models
+
+
+def fill_entity_key(apps, schema_editor):
+    Rating = apps.get_model('core', 'Rating')
+    for rating in Rating.objects.all().iterator():
+        entity_id = rating.user_id if rating.entity_type == 'user' else rating.group_id
+        rating.entity_key = f"{rating.entity_type}:{entity_id}"
+        rating.save(update_fields=['entity_key'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_result_rank_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rating',
+            name='entity_key',
+            field=models.CharField(default='', max_length=32),
+        ),
+        migrations.RunPython(fill_entity_key, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='rating',
+            unique_together={('quiz', 'entity_key')},
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['quiz', 'entity_type', 'rank'], name='rating_quiz_board_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_rating_entity_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-created_at'], name='auditlog_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['status', 'level_type', 'start_time', 'end_time', 'start_level', 'end_level'], name='quiz_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizsession',
+            index=models.Index(condition=models.Q(('finished_at__isnull', True)), fields=['quiz', 'user'], name='qsession_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizsession',
+            index=models.Index(fields=['user', 'finished_at'], name='qsession_user_finished_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['user', '-completed_at'], name='result_user_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 04:36
+
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    Quiz = apps.get_model('core', 'Quiz')
+    Group = apps.get_model('core', 'Group')
+    SiteCounter = apps.get_model('core', 'SiteCounter')
+    SiteCounter.objects.bulk_create([
+        SiteCounter(name='total_users', value=User.objects.count()),
+        SiteCounter(name='total_quizzes', value=Quiz.objects.count()),
+        SiteCounter(name='active_quizzes', value=Quiz.objects.filter(status='active').count()),
+        SiteCounter(name='total_groups', value=Group.objects.count()),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Ҳисобкунаки сайт',
+                'verbose_name_plural': 'Ҳисобкунакҳои сайт',
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
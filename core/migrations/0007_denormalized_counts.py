@@ -0,0 +1,49 @@
+# Generated by Django 6.0 on 2026-10-18 04:38
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counts(apps, schema_editor):
+    Quiz = apps.get_model('core', 'Quiz')
+    Question = apps.get_model('core', 'Question')
+    Answer = apps.get_model('core', 'Answer')
+
+    def per_parent(model, field, aggregate):
+        return Coalesce(Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(value=aggregate).values('value')
+        ), Value(0))
+
+    Question.objects.update(answer_count=per_parent(Answer, 'question', Count('id')))
+    Quiz.objects.update(
+        question_count=per_parent(Question, 'quiz', Count('id')),
+        total_points=per_parent(Question, 'quiz', Sum('points')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_sitecounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='answer_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Шумораи ҷавобҳо'),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Шумораи саволҳо'),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='total_points',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Ҳамагӣ ҳаққҳо'),
+        ),
+        migrations.RunPython(fill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_denormalized_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['-created_at', '-id'], name='quiz_catalogue_idx'),
+        ),
+    ]
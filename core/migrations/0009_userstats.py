@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-18 04:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_quiz_catalogue_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_sessions', models.IntegerField(default=0)),
+                ('completed_sessions', models.IntegerField(default=0)),
+                ('result_count', models.IntegerField(default=0)),
+                ('percentage_sum', models.FloatField(default=0)),
+                ('best_percentage', models.FloatField(blank=True, null=True)),
+                ('pass_count', models.IntegerField(default=0)),
+                ('last_result_id', models.IntegerField(default=0)),
+                ('last_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('subjects', models.JSONField(default=dict)),
+                ('stale', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='learning_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Омори корбар',
+                'verbose_name_plural': 'Омори корбарон',
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 04:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_userstats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='useranswer',
+            name='answered_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
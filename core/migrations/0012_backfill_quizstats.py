@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-18 05:01
+
+from django.db import migrations
+
+HISTOGRAM_BUCKETS = 10
+
+
+def backfill_quiz_stats(apps, schema_editor):
+    # 0002 created QuizStats empty and record_result started every row from
+    # zero, so rows miss the results that existed before. Recompute them all.
+    Result = apps.get_model('core', 'Result')
+    QuizStats = apps.get_model('core', 'QuizStats')
+    QuizStats.objects.all().delete()
+
+    rows = (
+        Result.objects.order_by('quiz_id')
+        .values_list('quiz_id', 'score', 'total_questions', 'quiz__pass_percentage')
+    )
+    batch = []
+    current = None
+    for quiz_id, score, total_questions, pass_percentage in rows.iterator(chunk_size=2000):
+        if current is None or current.quiz_id != quiz_id:
+            if len(batch) >= 500:
+                QuizStats.objects.bulk_create(batch)
+                batch = []
+            current = QuizStats(quiz_id=quiz_id, histogram=[0] * HISTOGRAM_BUCKETS)
+            batch.append(current)
+        percentage = (score / total_questions * 100) if total_questions > 0 else 0
+        current.participants += 1
+        current.score_sum += score
+        current.score_sq_sum += score * score
+        current.min_score = score if current.min_score is None else min(current.min_score, score)
+        current.max_score = score if current.max_score is None else max(current.max_score, score)
+        current.pass_count += int(percentage >= pass_percentage)
+        bucket = int(percentage // (100 / HISTOGRAM_BUCKETS))
+        current.histogram[min(max(bucket, 0), HISTOGRAM_BUCKETS - 1)] += 1
+    QuizStats.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_cache_table'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_quiz_stats, migrations.RunPython.noop),
+    ]
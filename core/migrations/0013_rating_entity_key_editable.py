@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_backfill_quizstats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rating',
+            name='entity_key',
+            field=models.CharField(editable=False, max_length=32),
+        ),
+    ]
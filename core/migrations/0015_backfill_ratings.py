@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-18 05:10
+
+from django.db import migrations
+from django.db.models import Max
+
+BATCH_SIZE = 1000
+
+
+def backfill_ratings(apps, schema_editor):
+    # The results page pages the user boards, so every quiz needs its Rating
+    # rows, including the results from before update_ratings existed.
+    # Recompute all boards: best score per entity, competition ranks ("1224").
+    Result = apps.get_model('core', 'Result')
+    Rating = apps.get_model('core', 'Rating')
+    Rating.objects.all().delete()
+
+    for entity_type, field in (('user', 'user_id'), ('group', 'group_id')):
+        best = (
+            Result.objects.filter(**{f'{field}__isnull': False})
+            .values('quiz_id', field)
+            .annotate(best=Max('score'))
+            .order_by('quiz_id', '-best', field)
+        )
+        batch = []
+        quiz_id = rank = previous = None
+        for position, row in enumerate(best.iterator(chunk_size=BATCH_SIZE)):
+            if row['quiz_id'] != quiz_id:
+                quiz_id, start = row['quiz_id'], position
+            if row['best'] != previous or position == start:
+                rank = position - start + 1
+            previous = row['best']
+            batch.append(Rating(
+                quiz_id=quiz_id,
+                entity_type=entity_type,
+                entity_key=f"{entity_type}:{row[field]}",
+                rank=rank,
+                score=row['best'],
+                **{field: row[field]},
+            ))
+            if len(batch) >= BATCH_SIZE:
+                Rating.objects.bulk_create(batch)
+                batch = []
+        Rating.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_auditlog_created_at_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
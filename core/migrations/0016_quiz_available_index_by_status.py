@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18 05:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_backfill_ratings'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='quiz',
+            name='quiz_available_idx',
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['status', 'level_type', 'start_level', 'end_level'], name='quiz_available_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 6.0 on 2026-10-18 05:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def link_results_to_sessions(apps, schema_editor):
+    # quiz_finish_view created the Result right before it marked the session
+    # finished, so a result belongs to the first finished session of its user
+    # on the quiz that finished at or after the result was completed. Each
+    # session gives at most one result.
+    Result = apps.get_model('core', 'Result')
+    QuizSession = apps.get_model('core', 'QuizSession')
+
+    quiz_ids = Result.objects.filter(user__isnull=False).values_list('quiz_id', flat=True).distinct()
+    for quiz_id in quiz_ids.iterator():
+        finished = {}
+        sessions = (
+            QuizSession.objects.filter(quiz_id=quiz_id, user__isnull=False, finished_at__isnull=False)
+            .order_by('user_id', 'finished_at', 'id')
+            .values_list('user_id', 'finished_at', 'id')
+        )
+        for user_id, finished_at, session_id in sessions.iterator(chunk_size=BATCH_SIZE):
+            finished.setdefault(user_id, []).append((finished_at, session_id))
+
+        batch = []
+        next_session = {}
+        results = (
+            Result.objects.filter(quiz_id=quiz_id, user__isnull=False)
+            .order_by('user_id', 'completed_at', 'id')
+            .only('id', 'user_id', 'completed_at')
+        )
+        for result in results.iterator(chunk_size=BATCH_SIZE):
+            candidates = finished.get(result.user_id, [])
+            position = next_session.get(result.user_id, 0)
+            while position < len(candidates) and candidates[position][0] < result.completed_at:
+                position += 1
+            if position == len(candidates):
+                continue
+            result.session_id = candidates[position][1]
+            next_session[result.user_id] = position + 1
+            batch.append(result)
+            if len(batch) >= BATCH_SIZE:
+                Result.objects.bulk_update(batch, ['session'])
+                batch = []
+        Result.objects.bulk_update(batch, ['session'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_quiz_available_index_by_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='result',
+            name='session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='results', to='core.quizsession'),
+        ),
+        migrations.RunPython(link_results_to_sessions, migrations.RunPython.noop),
+    ]
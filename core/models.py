@@ -151,6 +151,14 @@ class GroupMember(models.Model):
         return f"{self.user.username} in {self.group.name}"
 
 
+def _fields_except(instance, *excluded):
+    """Names of the instance's updatable fields without ``excluded``."""
+    return [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in excluded
+    ]
+
+
 # core/models.py - обновите класс Quiz
 class Quiz(models.Model):
     MODE_CHOICES = (
@@ -197,10 +205,23 @@ class Quiz(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_quizzes', verbose_name="Эҷодкунанда")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Санаи эҷод")
     
+    # Аз ҷониби сигналҳо нав карда мешаванд (core/quiz_counts.py)
+    question_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Шумораи саволҳо")
+    total_points = models.IntegerField(default=0, editable=False, verbose_name="Ҳамагӣ ҳаққҳо")
+    
     class Meta:
         verbose_name = 'Викторина'
         verbose_name_plural = 'Викторинаҳо'
         ordering = ['-created_at']
+        indexes = [
+            # Викторинаҳои фаъол барои сатҳи донишҷӯ
+            models.Index(
+                fields=['status', 'level_type', 'start_level', 'end_level'],
+                name='quiz_available_idx',
+            ),
+            # Каталоги викторинаҳо: пагинатсияи keyset аз рӯи (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='quiz_catalogue_idx'),
+        ]
     
     def __str__(self):
         subject_name = self.subject.name if self.subject else "Без предмета"
@@ -208,7 +229,18 @@ class Quiz(models.Model):
     
     def is_active(self):
         now = timezone.now()
-        return self.status == 'active' and self.start_time <= now <= self.end_time
+        return self.status == 'active' and self.start_time <= now < self.end_time
+    
+    def clone(self, **overrides):
+        """Deep copy with all questions and answers; see core/quiz_clone.py for ``overrides``."""
+        from .quiz_clone import clone_quiz
+        return clone_quiz(self, **overrides)
+    
+    def save(self, *args, **kwargs):
+        # Шумораҳоро танҳо core/quiz_counts.py менависад
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = _fields_except(self, 'question_count', 'total_points')
+        super().save(*args, **kwargs)
 
 
 # models.py - дар Question model
@@ -228,6 +260,8 @@ class Question(models.Model):
     hint = models.TextField(blank=True, null=True, verbose_name="Ишора")
     explanation = models.TextField(blank=True, null=True, verbose_name="Шарҳ")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Аз ҷониби сигналҳо нав карда мешавад (core/quiz_counts.py)
+    answer_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Шумораи ҷавобҳо")
     
     class Meta:
         verbose_name = 'Савол'
@@ -244,6 +278,8 @@ class Question(models.Model):
         if not self.order and self.quiz:
             last_question = Question.objects.filter(quiz=self.quiz).order_by('-order').first()
             self.order = (last_question.order + 1) if last_question else 1
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = _fields_except(self, 'answer_count')
         super().save(*args, **kwargs)
 
 
@@ -270,6 +306,16 @@ class QuizSession(models.Model):
     class Meta:
         verbose_name = 'Сеанси викторина'
         verbose_name_plural = 'Сеансҳои викторина'
+        indexes = [
+            # Сеанси кушодаи корбар дар викторина
+            models.Index(
+                fields=['quiz', 'user'],
+                condition=models.Q(finished_at__isnull=True),
+                name='qsession_open_idx',
+            ),
+            # Сеансҳои анҷомёфтаи корбар
+            models.Index(fields=['user', 'finished_at'], name='qsession_user_finished_idx'),
+        ]
     
     def __str__(self):
         entity = self.user.username if self.user else self.group.name
@@ -284,21 +330,16 @@ class QuizSession(models.Model):
         return timezone.now() - self.started_at
     
     def get_score(self):
-        user_answers = self.user_answers.all()
-        score = 0
-        
-        for user_answer in user_answers:
-            if user_answer.answer.is_correct:
-                score += user_answer.question.points
-        
-        return score
+        from .grading import grade_session
+        return grade_session(self).score
 
 
 class UserAnswer(models.Model):
     session = models.ForeignKey(QuizSession, on_delete=models.CASCADE, related_name='user_answers')
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     answer = models.ForeignKey(Answer, on_delete=models.CASCADE)
-    answered_at = models.DateTimeField(auto_now_add=True)
+    # Вақти ҷавоб; роҳи буферӣ вақти додани ҷавобро менависад (core/answer_buffer.py)
+    answered_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         verbose_name = 'Ҷавоби истифодабаранда'
@@ -313,6 +354,8 @@ class Result(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='results')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='results', null=True, blank=True)
     group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='results', null=True, blank=True)
+    # Сеансе, ки ин натиҷаро додааст (барои натиҷаҳои кӯҳна метавонад холӣ бошад)
+    session = models.ForeignKey(QuizSession, on_delete=models.SET_NULL, related_name='results', null=True, blank=True)
     score = models.FloatField()
     total_questions = models.IntegerField()
     correct_answers = models.IntegerField()
@@ -322,6 +365,10 @@ class Result(models.Model):
         verbose_name = 'Натиҷа'
         verbose_name_plural = 'Натиҷаҳо'
         ordering = ['-score', 'completed_at']
+        indexes = [
+            models.Index(fields=['quiz', '-score', 'completed_at'], name='result_quiz_rank_idx'),
+            models.Index(fields=['user', '-completed_at'], name='result_user_recent_idx'),
+        ]
     
     def __str__(self):
         entity = self.user.username if self.user else self.group.name
@@ -341,6 +388,8 @@ class Rating(models.Model):
     entity_type = models.CharField(max_length=10, choices=ENTITY_TYPE_CHOICES)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     group = models.ForeignKey(Group, on_delete=models.CASCADE, null=True, blank=True)
+    # "user:<id>" ё "group:<id>" - калиди ягона барои upsert; дар save() пур мешавад
+    entity_key = models.CharField(max_length=32, editable=False)
     rank = models.IntegerField()
     score = models.FloatField()
     
@@ -348,10 +397,118 @@ class Rating(models.Model):
         verbose_name = 'Рейтинг'
         verbose_name_plural = 'Рейтингҳо'
         ordering = ['quiz', 'rank']
+        unique_together = ['quiz', 'entity_key']
+        indexes = [
+            models.Index(fields=['quiz', 'entity_type', 'rank'], name='rating_quiz_board_idx'),
+        ]
     
     def __str__(self):
         entity = self.user.username if self.user else self.group.name
         return f"#{self.rank} - {entity} ({self.score})"
+    
+    def save(self, *args, **kwargs):
+        entity_id = self.user_id if self.entity_type == 'user' else self.group_id
+        self.entity_key = self.make_entity_key(self.entity_type, entity_id)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'entity_key'}
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def make_entity_key(entity_type, entity_id):
+        return f"{entity_type}:{entity_id}"
+
+
+class QuizStats(models.Model):
+    """
+    Running totals of a quiz's results, updated in the same transaction that
+    creates each Result (see core/quiz_stats.py).
+    """
+    HISTOGRAM_BUCKETS = 10
+    
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, related_name='stats')
+    participants = models.IntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_sq_sum = models.FloatField(default=0)
+    min_score = models.FloatField(null=True, blank=True)
+    max_score = models.FloatField(null=True, blank=True)
+    pass_count = models.IntegerField(default=0)
+    # Шумораи натиҷаҳо дар ҳар 10% фоиз: [0-10), [10-20), ..., [90-100]
+    histogram = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Омори викторина'
+        verbose_name_plural = 'Омори викторинаҳо'
+    
+    def __str__(self):
+        return f"{self.quiz_id}: {self.participants}"
+    
+    @property
+    def avg_score(self):
+        return self.score_sum / self.participants if self.participants else 0
+    
+    @property
+    def std_dev(self):
+        if not self.participants:
+            return 0
+        variance = self.score_sq_sum / self.participants - self.avg_score ** 2
+        return max(variance, 0) ** 0.5
+    
+    @property
+    def fail_count(self):
+        return self.participants - self.pass_count
+
+
+class UserStats(models.Model):
+    """
+    A user's session counts, result totals and per-subject rollup, updated
+    in the transaction that finishes each quiz session (see core/user_stats.py).
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='learning_stats')
+    total_sessions = models.IntegerField(default=0)
+    completed_sessions = models.IntegerField(default=0)
+    result_count = models.IntegerField(default=0)
+    percentage_sum = models.FloatField(default=0)
+    best_percentage = models.FloatField(null=True, blank=True)
+    pass_count = models.IntegerField(default=0)
+    last_result_id = models.IntegerField(default=0)
+    last_completed_at = models.DateTimeField(null=True, blank=True)
+    # {"<subject_id>": {"attempts", "quizzes", "percentage_sum", "best", "last", "passed"}},
+    # викторинаҳои бе фан бо калиди ""
+    subjects = models.JSONField(default=dict)
+    # Пас аз нест кардани натиҷа ё сеанс; ҳангоми хондани навбатӣ аз нав ҳисоб мешавад
+    stale = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Омори корбар'
+        verbose_name_plural = 'Омори корбарон'
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.result_count}"
+    
+    @property
+    def average_percentage(self):
+        return self.percentage_sum / self.result_count if self.result_count else 0
+
+
+class SiteCounter(models.Model):
+    """
+    A site-wide counter (e.g. total_users), adjusted by signals as rows are
+    created and deleted (see core/stats.py) and reconciled periodically by
+    ``manage.py reconcile_site_counters``.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Ҳисобкунаки сайт'
+        verbose_name_plural = 'Ҳисобкунакҳои сайт'
+    
+    def __str__(self):
+        return f"{self.name}: {self.value}"
 
 
 class Permission(models.Model):
@@ -384,12 +541,16 @@ class AuditLog(models.Model):
     details = models.JSONField(default=dict)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Вақти ҳодиса; record_audit онро ҳангоми навбат гузоштан муқаррар мекунад
+    created_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         verbose_name = 'Логи аудит'
         verbose_name_plural = 'Логҳои аудит'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='auditlog_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user} - {self.get_action_display()} - {self.model}"
\ No newline at end of file
@@ -0,0 +1,405 @@
+# core/question_import.py
+"""
+Bulk import of questions and answers into a quiz.
+
+Used by ``manage.py import_questions``, ``question_import_view`` and the
+nested question form of ``quiz_create_view``. A source is parsed as a
+stream of ``(row, raw_question)`` pairs, so a file is never loaded whole:
+
+* CSV: columns ``text``, ``question_type``, ``points``, ``hint``,
+  ``explanation``, ``answer_1`` ... ``answer_N`` and ``correct`` (the
+  1-based numbers of the correct answers, e.g. ``2`` or ``1;3``).
+* JSON: an array of objects, or one object per line (JSON Lines), each
+  ``{"text", "question_type", "points", "hint", "explanation",
+  "answers": [{"text", "is_correct"}, ...]}``.
+* GIFT (Moodle): multiple choice (``=right ~wrong``, ``~%50%`` weights),
+  true/false (``{T}``/``{F}``) and short answer (``{=a =b}``) questions.
+
+Each question is validated in memory; invalid ones are reported with their
+row and skipped. Valid questions get consecutive ``order`` values after the
+quiz's last question and are inserted with ``bulk_create``, one transaction
+per chunk of ``QUESTION_IMPORT_CHUNK_SIZE`` questions. ``bulk_create`` skips
+``Question.save()`` and the signals, so each chunk then refreshes the
+denormalized counts (core/quiz_counts.py) and drops the quiz's answer key.
+"""
+import csv
+import json
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from .answer_key import invalidate_answer_key
+from .models import Answer, Question
+from .quiz_counts import refresh_answer_counts, refresh_quiz_counts
+
+QUESTION_IMPORT_CHUNK_SIZE = getattr(settings, 'QUESTION_IMPORT_CHUNK_SIZE', 500)
+
+IMPORT_FORMATS = ['csv', 'json', 'gift']
+
+_EXTENSIONS = {
+    '.csv': 'csv',
+    '.json': 'json',
+    '.jsonl': 'json',
+    '.gift': 'gift',
+    '.txt': 'gift',
+}
+
+QUESTION_TYPES = dict(Question.QUESTION_TYPE_CHOICES)
+ANSWER_TEXT_MAX_LENGTH = Answer._meta.get_field('text').max_length
+
+
+class ParsedQuestion(NamedTuple):
+    row: int
+    text: str
+    question_type: str
+    points: int
+    hint: Optional[str]
+    explanation: Optional[str]
+    answers: List[Tuple[str, bool]]
+
+
+class ImportReport(NamedTuple):
+    created: int
+    errors: List[Tuple[int, str]]
+
+
+class RowError(ValueError):
+    """A question that cannot be imported; the message is shown to the user."""
+
+
+def detect_format(filename):
+    """Import format from a file name, or None."""
+    for extension, name in _EXTENSIONS.items():
+        if filename.lower().endswith(extension):
+            return name
+    return None
+
+
+# -- CSV -----------------------------------------------------------------------
+
+def parse_csv(stream):
+    reader = csv.DictReader(stream)
+    if reader.fieldnames is None:
+        return
+    reader.fieldnames = [(name or '').strip().lower() for name in reader.fieldnames]
+    for row in reader:
+        correct = {part.strip() for part in re.split(r'[;,\s]+', row.get('correct') or '') if part.strip()}
+        answers = []
+        number = 1
+        while f'answer_{number}' in row:
+            text = (row[f'answer_{number}'] or '').strip()
+            if text:
+                answers.append({'text': text, 'is_correct': str(number) in correct})
+            number += 1
+        yield reader.line_num, {
+            'text': row.get('text'),
+            'question_type': row.get('question_type'),
+            'points': row.get('points'),
+            'hint': row.get('hint'),
+            'explanation': row.get('explanation'),
+            'answers': answers,
+        }
+
+
+# -- JSON ----------------------------------------------------------------------
+
+def parse_json(stream, read_size=64 * 1024):
+    """
+    Yield ``(number, object)`` from a JSON array or JSON Lines without loading
+    the whole document: objects are decoded as soon as they are complete.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    opened = False
+    number = 0
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,')
+        if not opened and buffer.startswith('['):
+            opened = True
+            buffer = buffer[1:]
+            continue
+        if buffer.startswith(']'):
+            return
+        if buffer:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as e:
+                if eof:
+                    yield number + 1, RowError(f'JSON нодуруст: {e.msg}')
+                    return
+            else:
+                number += 1
+                buffer = buffer[end:]
+                yield number, item if isinstance(item, dict) else RowError('Савол бояд объекти JSON бошад.')
+                continue
+        elif eof:
+            return
+        chunk = stream.read(read_size)
+        if chunk:
+            buffer += chunk
+        else:
+            eof = True
+
+
+# -- GIFT ----------------------------------------------------------------------
+
+_GIFT_ESCAPES = re.compile(r'\\([:~=#{}n])')
+
+
+def _gift_unescape(text):
+    return _GIFT_ESCAPES.sub(lambda m: '\n' if m.group(1) == 'n' else m.group(1), text).strip()
+
+
+def _gift_split(text, separators):
+    """Split ``text`` before every unescaped character of ``separators``."""
+    parts = []
+    current = ''
+    escaped = False
+    for char in text:
+        if not escaped and char in separators:
+            parts.append(current)
+            current = ''
+        current += char
+        escaped = char == '\\' and not escaped
+    parts.append(current)
+    return parts
+
+
+def _gift_find(text, char):
+    """Index of the first unescaped ``char`` or -1."""
+    escaped = False
+    for index, current in enumerate(text):
+        if current == char and not escaped:
+            return index
+        escaped = current == '\\' and not escaped
+    return -1
+
+
+def _gift_question(source):
+    title = re.match(r'^\s*::(.*?)::', source, re.S)
+    if title:
+        source = source[title.end():]
+    start = _gift_find(source, '{')
+    end = _gift_find(source, '}')
+    if start < 0 or end < start:
+        raise RowError('Ҷавобҳо дар {…} ёфт нашуданд.')
+
+    text = source[:start].strip()
+    if source[end + 1:].strip():
+        text = f'{text} _____ {source[end + 1:].strip()}'
+    text = _gift_unescape(re.sub(r'^\[\w+\]', '', text))
+    body = source[start + 1:end].strip()
+
+    general = body.split('####', 1)
+    body = general[0].strip()
+    explanation = _gift_unescape(general[1]) if len(general) > 1 else None
+
+    truth = _gift_unescape(_gift_split(body, '#')[0]).upper()
+    if truth in ('T', 'TRUE', 'F', 'FALSE'):
+        is_true = truth in ('T', 'TRUE')
+        return {
+            'text': text,
+            'question_type': 'true_false',
+            'explanation': explanation,
+            'answers': [{'text': 'Дуруст', 'is_correct': is_true}, {'text': 'Нодуруст', 'is_correct': not is_true}],
+        }
+    if body.startswith('#') or '->' in body:
+        raise RowError('Саволҳои ададӣ ва мувофиқат дастгирӣ намешаванд.')
+
+    answers = []
+    for part in _gift_split(body, '=~'):
+        part = part.strip()
+        if not part:
+            continue
+        marker, part = part[0], part[1:]
+        weight = re.match(r'^%(-?\d+(?:\.\d+)?)%', part)
+        if weight:
+            part = part[weight.end():]
+        answer = _gift_unescape(_gift_split(part, '#')[0])
+        is_correct = marker == '=' or (weight is not None and float(weight.group(1)) > 0)
+        answers.append({'text': answer, 'is_correct': is_correct})
+
+    correct = sum(answer['is_correct'] for answer in answers)
+    if answers and correct == len(answers):
+        question_type = 'short_answer'
+    elif correct > 1:
+        question_type = 'multiple_choice'
+    else:
+        question_type = 'single_choice'
+    return {'text': text, 'question_type': question_type, 'explanation': explanation, 'answers': answers}
+
+
+def parse_gift(stream):
+    block = []
+    start = None
+    for number, line in enumerate(stream, 1):
+        stripped = line.strip()
+        if stripped.startswith('//') or stripped.startswith('$CATEGORY'):
+            continue
+        if stripped:
+            if not block:
+                start = number
+            block.append(line.rstrip('\r\n'))
+            continue
+        if block:
+            yield start, _gift_block(block)
+            block = []
+    if block:
+        yield start, _gift_block(block)
+
+
+def _gift_block(lines):
+    try:
+        return _gift_question('\n'.join(lines))
+    except RowError as e:
+        return e
+
+
+PARSERS = {
+    'csv': parse_csv,
+    'json': parse_json,
+    'gift': parse_gift,
+}
+
+
+# -- validation ----------------------------------------------------------------
+
+def _optional_text(value):
+    value = str(value).strip() if value is not None else ''
+    return value or None
+
+
+def validate_question(row, raw):
+    """A ``ParsedQuestion`` from one parsed item; raises ``RowError``."""
+    text = str(raw.get('text') or '').strip()
+    if not text:
+        raise RowError('Матни савол холӣ аст.')
+
+    question_type = str(raw.get('question_type') or raw.get('type') or 'single_choice').strip()
+    if question_type not in QUESTION_TYPES:
+        raise RowError(f'Навъи савол номаълум аст: {question_type}.')
+
+    points = raw.get('points')
+    try:
+        points = int(points) if points not in (None, '') else 1
+    except (TypeError, ValueError):
+        raise RowError(f'Ҳаққҳо бояд адад бошад: {points}.')
+    if points < 1:
+        raise RowError('Ҳаққҳо бояд на камтар аз 1 бошад.')
+
+    answers = []
+    for answer in raw.get('answers') or []:
+        if not isinstance(answer, dict):
+            raise RowError('Ҷавоб бояд {"text", "is_correct"} бошад.')
+        answer_text = str(answer.get('text') or '').strip()
+        if not answer_text:
+            raise RowError('Матни ҷавоб холӣ аст.')
+        if len(answer_text) > ANSWER_TEXT_MAX_LENGTH:
+            raise RowError(f'Ҷавоб аз {ANSWER_TEXT_MAX_LENGTH} аломат дароз аст.')
+        answers.append((answer_text, bool(answer.get('is_correct', answer.get('correct', False)))))
+
+    correct = sum(is_correct for _, is_correct in answers)
+    if not answers:
+        raise RowError('Савол ҷавоб надорад.')
+    if correct == 0:
+        raise RowError('Ҳадди ақал як ҷавоби дуруст лозим аст.')
+    if question_type in ('single_choice', 'true_false') and correct > 1:
+        raise RowError('Ин навъи савол танҳо як ҷавоби дуруст дорад.')
+    if question_type == 'true_false' and len(answers) != 2:
+        raise RowError('Саволи дуруст/нодуруст бояд ду ҷавоб дошта бошад.')
+
+    return ParsedQuestion(
+        row=row,
+        text=text,
+        question_type=question_type,
+        points=points,
+        hint=_optional_text(raw.get('hint')),
+        explanation=_optional_text(raw.get('explanation')),
+        answers=answers,
+    )
+
+
+# -- saving --------------------------------------------------------------------
+
+def _invalidate_answer_key(quiz_id):
+    # Now, and again after commit, like the Question/Answer signals do
+    invalidate_answer_key(quiz_id)
+    transaction.on_commit(lambda: invalidate_answer_key(quiz_id))
+
+
+def _insert_chunk(quiz, parsed, first_order):
+    with transaction.atomic():
+        questions = Question.objects.bulk_create([
+            Question(
+                quiz=quiz,
+                text=item.text,
+                question_type=item.question_type,
+                points=item.points,
+                order=first_order + offset,
+                hint=item.hint,
+                explanation=item.explanation,
+                answer_count=len(item.answers),
+            )
+            for offset, item in enumerate(parsed)
+        ])
+        Answer.objects.bulk_create([
+            Answer(question=question, text=text, is_correct=is_correct)
+            for question, item in zip(questions, parsed)
+            for text, is_correct in item.answers
+        ])
+        refresh_quiz_counts([quiz.pk])
+        _invalidate_answer_key(quiz.pk)
+
+
+def import_questions(quiz, items, chunk_size=QUESTION_IMPORT_CHUNK_SIZE, dry_run=False):
+    """
+    Validate and insert ``(row, raw_question)`` items into ``quiz``.
+
+    Returns an ``ImportReport`` with the number of questions created (or, with
+    ``dry_run``, that would be created) and the ``(row, message)`` of every
+    rejected one.
+    """
+    errors = []
+    created = 0
+    next_order = (quiz.questions.aggregate(last=Max('order'))['last'] or 0) + 1
+    chunk = []
+
+    def flush():
+        nonlocal created, next_order
+        if chunk and not dry_run:
+            _insert_chunk(quiz, chunk, next_order)
+        created += len(chunk)
+        next_order += len(chunk)
+        chunk.clear()
+
+    for row, raw in items:
+        try:
+            if isinstance(raw, RowError):
+                raise raw
+            chunk.append(validate_question(row, raw))
+        except RowError as e:
+            errors.append((row, str(e)))
+            continue
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+    return ImportReport(created, errors)
+
+
+def import_question_file(quiz, stream, import_format, **kwargs):
+    """Parse a text stream in ``import_format`` and import it (see ``import_questions``)."""
+    return import_questions(quiz, PARSERS[import_format](stream), **kwargs)
+
+
+def create_answers(question, answers):
+    """Insert ``(text, is_correct)`` answers of one question in a single query."""
+    Answer.objects.bulk_create([
+        Answer(question=question, text=text, is_correct=is_correct)
+        for text, is_correct in answers
+    ])
+    refresh_answer_counts([question.pk])
+    _invalidate_answer_key(question.quiz_id)
@@ -0,0 +1,99 @@
+# core/quiz_clone.py
+"""
+Deep copy of a quiz with its questions and answers (``Quiz.clone()``).
+
+Rerunning last term's olympiad used to mean rebuilding it question by
+question, where every ``Question.save()`` looks up the last ``order`` and
+every save fires the question/answer signals. ``clone_quiz`` reads the
+questions and the answers once each and writes them back with
+``bulk_create``. The new question ids are mapped from the old ones by
+position, so the answers can point at their copies. The query count depends
+only on the bulk-insert batch count, never on per-row work.
+
+The new quiz itself is saved normally, so the usual quiz signals still keep
+the site counters, the dashboards and the audit log up to date. Its
+``question_count``, ``total_points`` and each question's ``answer_count``
+are written with the rows; nothing needs to be refreshed afterwards.
+"""
+from django.db import transaction
+
+from .answer_key import invalidate_answer_key
+from .models import Answer, Question, Quiz
+
+_UNSET = object()
+
+QUESTION_FIELDS = ['id', 'text', 'question_type', 'points', 'order', 'hint', 'explanation']
+
+
+def clone_quiz(quiz, created_by=None, title=None, start_time=None, end_time=None,
+               level_type=None, start_level=None, end_level=None, subject=_UNSET):
+    """
+    Copy ``quiz`` with all its questions and answers and return the copy.
+
+    The copy is saved as a draft; the quiz signals then set its status from
+    the schedule, as for any new quiz. If only ``start_time`` is given,
+    ``end_time`` keeps the original duration. Pass ``subject=None`` to clear
+    the subject. Raises ``ValueError`` for an empty schedule or level range.
+    """
+    if start_time is not None and end_time is None:
+        end_time = start_time + (quiz.end_time - quiz.start_time)
+    start_time = start_time or quiz.start_time
+    end_time = end_time or quiz.end_time
+    start_level = quiz.start_level if start_level is None else start_level
+    end_level = quiz.end_level if end_level is None else end_level
+    if end_time <= start_time:
+        raise ValueError('Вақти анҷом бояд баъд аз вақти оғоз бошад.')
+    if start_level > end_level:
+        raise ValueError('Сатҳи оғоз аз сатҳи анҷом калон буда наметавонад.')
+
+    questions = list(quiz.questions.order_by('order', 'id').values(*QUESTION_FIELDS))
+    answers = list(
+        Answer.objects.filter(question__quiz=quiz)
+        .order_by('question_id', 'id')
+        .values_list('question_id', 'text', 'is_correct')
+    )
+    answer_counts = {}
+    for question_id, _, _ in answers:
+        answer_counts[question_id] = answer_counts.get(question_id, 0) + 1
+
+    with transaction.atomic():
+        copy = Quiz.objects.create(
+            title=title or f'{quiz.title} (нусха)',
+            description=quiz.description,
+            subject=quiz.subject if subject is _UNSET else subject,
+            quiz_mode=quiz.quiz_mode,
+            level_type=level_type or quiz.level_type,
+            start_level=start_level,
+            end_level=end_level,
+            start_time=start_time,
+            end_time=end_time,
+            is_online=quiz.is_online,
+            status='draft',
+            time_limit=quiz.time_limit,
+            max_attempts=quiz.max_attempts,
+            pass_percentage=quiz.pass_percentage,
+            created_by=created_by or quiz.created_by,
+            question_count=len(questions),
+            total_points=sum(question['points'] for question in questions),
+        )
+
+        created = Question.objects.bulk_create([
+            Question(
+                quiz=copy,
+                answer_count=answer_counts.get(question['id'], 0),
+                **{field: question[field] for field in QUESTION_FIELDS if field != 'id'},
+            )
+            for question in questions
+        ])
+        # Саволи кӯҳна -> нусхаи он
+        new_ids = {question['id']: copy_question.pk for question, copy_question in zip(questions, created)}
+
+        Answer.objects.bulk_create([
+            Answer(question_id=new_ids[question_id], text=text, is_correct=is_correct)
+            for question_id, text, is_correct in answers
+        ])
+
+        # Like the Question/Answer signals: now, and again after commit
+        invalidate_answer_key(copy.pk)
+        transaction.on_commit(lambda: invalidate_answer_key(copy.pk))
+    return copy
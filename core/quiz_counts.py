@@ -0,0 +1,78 @@
+# core/quiz_counts.py
+"""
+Denormalized counts: ``Quiz.question_count``, ``Quiz.total_points`` and
+``Question.answer_count``.
+
+The signals in ``core/signals.py`` recompute them for the affected quiz or
+question when a Question or Answer is saved or deleted. Each recompute is a
+single UPDATE with a correlated subquery, so concurrent edits cannot leave a
+lost increment behind. ``Quiz.save()`` and ``Question.save()`` never write
+these columns themselves, so saving a stale instance does not overwrite them.
+
+Bulk operations (``bulk_create``, ``QuerySet.update``) bypass signals. Code
+using them calls ``refresh_quiz_counts`` / ``refresh_answer_counts``, and
+``manage.py repair_quiz_counts`` fixes any drift left behind.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Answer, Question, Quiz
+
+
+def _per_parent(queryset, parent_field, aggregate):
+    return Subquery(
+        queryset.filter(**{parent_field: OuterRef('pk')})
+        .order_by()
+        .values(parent_field)
+        .annotate(value=aggregate)
+        .values('value')
+    )
+
+
+def refresh_quiz_counts(quiz_ids):
+    """Recompute question_count and total_points of the given quizzes."""
+    return Quiz.objects.filter(pk__in=quiz_ids).update(
+        question_count=Coalesce(_per_parent(Question.objects, 'quiz', Count('id')), Value(0)),
+        total_points=Coalesce(_per_parent(Question.objects, 'quiz', Sum('points')), Value(0)),
+    )
+
+
+def refresh_answer_counts(question_ids):
+    """Recompute answer_count of the given questions."""
+    return Question.objects.filter(pk__in=question_ids).update(
+        answer_count=Coalesce(_per_parent(Answer.objects, 'question', Count('id')), Value(0)),
+    )
+
+
+def deleted_with(origin, model):
+    """True if a post_delete comes from deleting ``model`` rows (a cascade)."""
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
+
+
+def drifted_ids():
+    """``(quiz_ids, question_ids)`` whose stored counts differ from the real ones."""
+    quiz_ids = list(
+        Quiz.objects.annotate(
+            real_count=Count('questions'),
+            real_points=Coalesce(Sum('questions__points'), Value(0)),
+        )
+        .exclude(question_count=F('real_count'), total_points=F('real_points'))
+        .values_list('id', flat=True)
+    )
+    question_ids = list(
+        Question.objects.annotate(real_count=Count('answers'))
+        .exclude(answer_count=F('real_count'))
+        .values_list('id', flat=True)
+    )
+    return quiz_ids, question_ids
+
+
+def repair_counts(dry_run=False, chunk_size=500):
+    """Fix every drifted count. Returns ``(quiz_ids, question_ids)`` that were off."""
+    quiz_ids, question_ids = drifted_ids()
+    if not dry_run:
+        for start in range(0, len(question_ids), chunk_size):
+            refresh_answer_counts(question_ids[start:start + chunk_size])
+        for start in range(0, len(quiz_ids), chunk_size):
+            refresh_quiz_counts(quiz_ids[start:start + chunk_size])
+    return quiz_ids, question_ids
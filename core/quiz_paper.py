@@ -0,0 +1,70 @@
+# core/quiz_paper.py
+"""
+Quiz paper snapshots for ``quiz_take_view``.
+
+A paper is the ordered list of a quiz's questions with their answer options,
+serialized to plain dicts (correctness is deliberately left out). It is built
+once per quiz version and shared through the cache. When a session starts, the
+paper is also pinned under the session id, so a student keeps the same paper
+for the whole attempt even if the quiz is edited meanwhile. Navigating between
+questions then reads no quiz content from the database.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from .answer_key import CACHE_TIMEOUT, answer_key_version
+from .models import Answer, Question
+
+# Extra time a session paper outlives the quiz time limit.
+SESSION_PAPER_GRACE = getattr(settings, 'QUIZ_PAPER_SESSION_GRACE', 10 * 60)
+
+
+def build_quiz_paper(quiz_id):
+    """Serialize a quiz's questions and answers (two queries)."""
+    questions = (
+        Question.objects.filter(quiz_id=quiz_id)
+        .order_by('order', 'id')
+        .prefetch_related(Prefetch('answers', queryset=Answer.objects.order_by('id')))
+    )
+    return [
+        {
+            'id': question.id,
+            'text': question.text,
+            'question_type': question.question_type,
+            'points': question.points,
+            'order': question.order,
+            'hint': question.hint,
+            'answers': [{'id': answer.id, 'text': answer.text} for answer in question.answers.all()],
+        }
+        for question in questions
+    ]
+
+
+def get_quiz_paper(quiz_id):
+    """Current paper of a quiz, shared by every session that starts now."""
+    key = f'quiz_paper:{quiz_id}:{answer_key_version(quiz_id)}'
+    paper = cache.get(key)
+    if paper is None:
+        paper = build_quiz_paper(quiz_id)
+        cache.set(key, paper, CACHE_TIMEOUT)
+    return paper
+
+
+def _session_key(session_id):
+    return f'quiz_paper:session:{session_id}'
+
+
+def pin_session_paper(session, time_limit):
+    """Snapshot the quiz paper for a session that just started."""
+    paper = get_quiz_paper(session.quiz_id)
+    cache.set(_session_key(session.pk), paper, time_limit * 60 + SESSION_PAPER_GRACE)
+    return paper
+
+
+def get_session_paper(session, time_limit):
+    """The paper pinned for ``session``; pinned now if it expired or was evicted."""
+    paper = cache.get(_session_key(session.pk))
+    if paper is None:
+        paper = pin_session_paper(session, time_limit)
+    return paper
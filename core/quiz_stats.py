@@ -0,0 +1,106 @@
+# core/quiz_stats.py
+"""
+Incremental maintenance of ``QuizStats``.
+
+``record_result`` folds one new Result into its quiz's running totals and must
+be called inside the transaction that creates the Result, so the summary row
+never disagrees with the results table. A quiz without a row (results from
+before QuizStats existed, or a deleted row) gets its row built from all its
+results instead. ``rebuild_quiz_stats`` recomputes the rows from scratch
+(used by the ``rebuild_quiz_stats`` management command).
+"""
+from django.db import transaction
+
+from .models import Quiz, QuizStats, Result
+
+
+def result_percentage(score, total_questions):
+    return (score / total_questions * 100) if total_questions > 0 else 0
+
+
+def histogram_bucket(percentage):
+    bucket = int(percentage // (100 / QuizStats.HISTOGRAM_BUCKETS))
+    return min(max(bucket, 0), QuizStats.HISTOGRAM_BUCKETS - 1)
+
+
+def _apply(stats, score, percentage, pass_percentage):
+    stats.participants += 1
+    stats.score_sum += score
+    stats.score_sq_sum += score * score
+    stats.min_score = score if stats.min_score is None else min(stats.min_score, score)
+    stats.max_score = score if stats.max_score is None else max(stats.max_score, score)
+    if percentage >= pass_percentage:
+        stats.pass_count += 1
+    histogram = list(stats.histogram) or [0] * QuizStats.HISTOGRAM_BUCKETS
+    histogram[histogram_bucket(percentage)] += 1
+    stats.histogram = histogram
+
+
+def _build(quiz_id):
+    """Fresh, unsaved row of one quiz computed from its results."""
+    stats = QuizStats(quiz_id=quiz_id)
+    rows = Result.objects.filter(quiz_id=quiz_id).values_list('score', 'total_questions', 'quiz__pass_percentage')
+    for score, total_questions, pass_percentage in rows.iterator():
+        _apply(stats, score, result_percentage(score, total_questions), pass_percentage)
+    return stats
+
+
+def record_result(result, pass_percentage):
+    """Add ``result`` to its quiz's stats row, locking the row for the update."""
+    with transaction.atomic():
+        stats = QuizStats.objects.select_for_update().filter(quiz_id=result.quiz_id).first()
+        if stats is None:
+            # Lock the quiz so concurrent first results build the row only once
+            list(Quiz.objects.select_for_update().filter(pk=result.quiz_id).values_list('pk'))
+            stats = QuizStats.objects.select_for_update().filter(quiz_id=result.quiz_id).first()
+        if stats is None:
+            # The rebuild already sees ``result``
+            stats = _build(result.quiz_id)
+            stats.save()
+            return stats
+        percentage = result_percentage(result.score, result.total_questions)
+        _apply(stats, result.score, percentage, pass_percentage)
+        stats.save()
+    return stats
+
+
+def get_quiz_stats(quiz):
+    """Stats row of a quiz; an empty unsaved row if nobody finished it yet."""
+    stats = QuizStats.objects.filter(quiz=quiz).first()
+    return stats if stats is not None else QuizStats(quiz=quiz)
+
+
+def rebuild_quiz_stats(quiz_ids=None, chunk_size=2000):
+    """
+    Recompute stats rows from the Result table.
+
+    Results are streamed in quiz order, so memory holds one quiz's totals at
+    a time. Returns the number of rows written.
+    """
+    results = Result.objects.order_by('quiz_id')
+    if quiz_ids is not None:
+        results = results.filter(quiz_id__in=quiz_ids)
+    rows = results.values_list('quiz_id', 'score', 'total_questions', 'quiz__pass_percentage')
+
+    written = 0
+    with transaction.atomic():
+        existing = QuizStats.objects.all()
+        if quiz_ids is not None:
+            existing = existing.filter(quiz_id__in=quiz_ids)
+        existing.delete()
+
+        batch = []
+        current = None
+        for quiz_id, score, total_questions, pass_percentage in rows.iterator(chunk_size=chunk_size):
+            if current is None or current.quiz_id != quiz_id:
+                current = QuizStats(quiz_id=quiz_id)
+                batch.append(current)
+            _apply(current, score, result_percentage(score, total_questions), pass_percentage)
+            if len(batch) >= chunk_size:
+                # Keep the row that is still accumulating for the next batch.
+                QuizStats.objects.bulk_create(batch[:-1])
+                written += len(batch) - 1
+                batch = batch[-1:]
+        QuizStats.objects.bulk_create(batch)
+        written += len(batch)
+    return written
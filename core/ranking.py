@@ -0,0 +1,39 @@
+# core/ranking.py
+"""
+Rank lookups over a quiz's results.
+
+Results are ranked the way ``Result.Meta.ordering`` sorts them: higher score
+first, earlier ``completed_at`` first on equal scores, and ``id`` as the final
+tie-breaker so every result has a distinct rank. Each lookup is a COUNT or
+LIMIT query served by the ``(quiz, -score, completed_at)`` index instead of
+reading every result of the quiz.
+"""
+from django.db.models import Q
+
+from .models import Result
+
+RANK_ORDERING = ('-score', 'completed_at', 'id')
+
+
+def _ahead_of(score, completed_at, result_id):
+    """Filter matching results ranked strictly before the given position."""
+    return (
+        Q(score__gt=score)
+        | Q(score=score, completed_at__lt=completed_at)
+        | Q(score=score, completed_at=completed_at, id__lt=result_id)
+    )
+
+
+def result_rank(result):
+    """1-based rank of ``result`` within its quiz."""
+    ahead = Result.objects.filter(quiz_id=result.quiz_id).filter(
+        _ahead_of(result.score, result.completed_at, result.pk)
+    )
+    return ahead.count() + 1
+
+
+def top_results(quiz, k=10):
+    """The ``k`` best results of a quiz, in rank order."""
+    return list(
+        Result.objects.filter(quiz=quiz).select_related('user', 'group').order_by(*RANK_ORDERING)[:k]
+    )
@@ -0,0 +1,121 @@
+# core/replicas.py
+"""
+Read-replica routing.
+
+Views decorated with ``@use_replica`` run their ORM reads on the
+``REPLICA_DATABASE_ALIAS`` database; every write still goes to ``default``.
+Outside such views, or when no replica is configured, everything uses
+``default``.
+
+Read-your-writes: after a request that changed data (any unsafe method,
+or a GET view that called ``stick_to_primary``) ``PrimaryStickinessMiddleware``
+sets a short-lived cookie. While it is present that user's reads stay on the
+primary, so a replica that is a few seconds behind never hides the user's own
+quiz result.
+
+Sessions are always read from ``default``: ``SESSION_SAVE_EVERY_REQUEST``
+writes them on every request. So is the database cache, whose version
+tokens must never be read from a lagging copy.
+
+Put ``@use_replica`` below ``@login_required``, so the user is loaded from
+the primary before reads are switched.
+
+Code that fills a shared cache inside such a view wraps the build in
+``read_from_primary()``: a lagging replica must not put stale data back into
+a cache entry that a signal has just dropped.
+"""
+import contextlib
+import contextvars
+import functools
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DATABASE_ALIAS = getattr(settings, 'REPLICA_DATABASE_ALIAS', 'replica')
+REPLICA_STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+REPLICA_STICKY_COOKIE = getattr(settings, 'REPLICA_STICKY_COOKIE', 'db_primary')
+
+PRIMARY_ONLY_APPS = {'sessions', 'django_cache'}
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def replica_configured():
+    return REPLICA_DATABASE_ALIAS in settings.DATABASES
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explicit, otherwise saving an object read from the replica would
+        # write back to the replica.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_DATABASE_ALIAS:
+            return False
+        return None
+
+
+def stick_to_primary(request):
+    """Keep this user's reads on the primary for a while, e.g. after a write in a GET view."""
+    request.stick_to_primary = True
+
+
+@contextlib.contextmanager
+def read_from_primary():
+    """Run the reads in the block on the primary, even inside ``@use_replica``."""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def use_replica(view):
+    """Run the view's reads on the replica unless the user just wrote something."""
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            not replica_configured()
+            or request.method not in ('GET', 'HEAD')
+            or REPLICA_STICKY_COOKIE in request.COOKIES
+        ):
+            return view(request, *args, **kwargs)
+        token = _read_alias.set(REPLICA_DATABASE_ALIAS)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    return wrapper
+
+
+class PrimaryStickinessMiddleware:
+    """Mark the user's next requests as primary-only after a write."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if replica_configured() and (
+            request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+            or getattr(request, 'stick_to_primary', False)
+        ):
+            response.set_cookie(
+                REPLICA_STICKY_COOKIE, '1',
+                max_age=REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
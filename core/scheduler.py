@@ -0,0 +1,137 @@
+# core/scheduler.py
+"""
+Scheduled quiz status transitions.
+
+``update_quiz_status`` (pre_save) only moves a quiz to 'active' or 'finished'
+when somebody saves it. ``QuizScheduler`` applies the same rules on time: it
+keeps a min-heap of upcoming ``start_time``/``end_time`` transitions. It
+sleeps until the earliest one is due and applies every due transition of a
+kind with one bulk UPDATE. Then it sends ``quiz_status_changed`` with the
+affected quiz ids.
+
+A quiz is active from ``start_time`` up to, but not including,
+``end_time``: at ``end_time`` it is finished. ``update_quiz_status`` and
+``Quiz.is_active`` use the same boundaries, so the quiz listings can filter on
+``status='active'`` alone.
+
+The heap is reloaded from the database every ``refresh_interval`` seconds, so
+quizzes created or rescheduled by other processes are picked up. A stale heap
+entry is harmless because each UPDATE re-checks the times in its WHERE clause.
+"""
+import datetime
+import heapq
+import logging
+import threading
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Quiz
+
+logger = logging.getLogger(__name__)
+
+# Sent with sender=Quiz, quiz_ids=[...], status='active' | 'finished'
+quiz_status_changed = Signal()
+
+START = 'start'
+END = 'end'
+
+
+def _due_querysets(now):
+    """The quizzes that should change state at ``now``, per target status."""
+    return {
+        'active': Quiz.objects.filter(
+            start_time__lte=now, end_time__gt=now, status__in=['draft', 'published'],
+        ),
+        'finished': Quiz.objects.filter(end_time__lte=now).exclude(status='finished'),
+    }
+
+
+def apply_due_transitions(now=None, quiz_ids=None):
+    """
+    Apply every transition that is due at ``now`` (optionally only for
+    ``quiz_ids``). Returns ``{status: [quiz_id, ...]}`` of what changed.
+    """
+    now = now or timezone.now()
+    changed = {}
+    with transaction.atomic():
+        for status, queryset in _due_querysets(now).items():
+            if quiz_ids is not None:
+                queryset = queryset.filter(id__in=quiz_ids)
+            ids = list(queryset.select_for_update().values_list('id', flat=True))
+            if ids:
+                Quiz.objects.filter(id__in=ids).update(status=status)
+                changed[status] = ids
+
+    for status, ids in changed.items():
+        transaction.on_commit(lambda s=status, i=ids: quiz_status_changed.send(sender=Quiz, quiz_ids=i, status=s))
+    return changed
+
+
+class QuizScheduler:
+    """Min-heap of upcoming quiz transitions, woken exactly when the next one is due."""
+
+    def __init__(self, refresh_interval=60):
+        self.refresh_interval = refresh_interval
+        self._heap = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def load(self, now=None):
+        """Rebuild the heap from quizzes that have not finished yet."""
+        now = now or timezone.now()
+        heap = []
+        upcoming = Quiz.objects.filter(end_time__gte=now).exclude(status='finished')
+        for quiz_id, start_time, end_time in upcoming.values_list('id', 'start_time', 'end_time'):
+            if start_time > now:
+                heap.append((start_time, START, quiz_id))
+            heap.append((end_time, END, quiz_id))
+        heapq.heapify(heap)
+        self._heap = heap
+
+    def next_due(self):
+        return self._heap[0][0] if self._heap else None
+
+    def run_pending(self, now=None):
+        """Pop every due entry and apply them together. Returns what changed."""
+        now = now or timezone.now()
+        due = set()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, quiz_id = heapq.heappop(self._heap)
+            due.add(quiz_id)
+        if not due:
+            return {}
+        changed = apply_due_transitions(now, quiz_ids=due)
+        for status, ids in changed.items():
+            logger.info('Quiz status -> %s: %s', status, ids)
+        return changed
+
+    def wake(self):
+        """Interrupt the current sleep, e.g. after a quiz was rescheduled."""
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+
+    def run_forever(self):
+        # Catch up on anything that became due while nobody was running.
+        apply_due_transitions()
+        self.load()
+        next_refresh = timezone.now() + datetime.timedelta(seconds=self.refresh_interval)
+
+        while not self._stopping.is_set():
+            now = timezone.now()
+            if now >= next_refresh:
+                self.load(now)
+                next_refresh = now + datetime.timedelta(seconds=self.refresh_interval)
+            self.run_pending(now)
+
+            wake_at = next_refresh
+            next_due = self.next_due()
+            if next_due is not None and next_due < wake_at:
+                wake_at = next_due
+            timeout = max((wake_at - timezone.now()).total_seconds(), 0)
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
@@ -1,8 +1,18 @@
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from .models import Profile, Quiz, AuditLog
+from .answer_key import invalidate_answer_key
+from .audit import record_audit
+from .dashboard import invalidate_quiz_sections, invalidate_role_sections, invalidate_user_sections
+from .leaderboard import rebuild_ratings
+from .models import Answer, Group, GroupMember, Profile, Question, Quiz, QuizSession, Result, Subject
+from .quiz_counts import deleted_with, refresh_answer_counts, refresh_quiz_counts
+from .quiz_stats import rebuild_quiz_stats
+from .scheduler import quiz_status_changed
+from .stats import adjust_counter, adjust_counters, reconcile_site_counters
+from .user_stats import count_started_session, mark_stale
 
 User = get_user_model()
 
@@ -15,7 +25,7 @@ def create_user_profile(sender, instance, created, **kwargs):
             level_type='school' if instance.role == 'student' else 'university',
             current_level=1
         )
-        AuditLog.objects.create(
+        record_audit(
             user=instance,
             action='create',
             model='User',
@@ -40,9 +50,10 @@ def update_quiz_status(sender, instance, **kwargs):
 
     now = timezone.now()
     
-    if instance.start_time <= now <= instance.end_time:
+    # Фосилаи [start_time, end_time), мисли core/scheduler.py
+    if instance.start_time <= now < instance.end_time:
         instance.status = 'active'
-    elif now > instance.end_time and instance.status != 'finished':
+    elif now >= instance.end_time and instance.status != 'finished':
         instance.status = 'finished'
     elif now < instance.start_time and instance.status == 'draft':
         instance.status = 'published'
@@ -51,7 +62,7 @@ def update_quiz_status(sender, instance, **kwargs):
 def log_quiz_changes(sender, instance, created, **kwargs):
 
     action = 'create' if created else 'update'
-    AuditLog.objects.create(
+    record_audit(
         user=instance.created_by,
         action=action,
         model='Quiz',
@@ -61,4 +72,258 @@ def log_quiz_changes(sender, instance, created, **kwargs):
             'status': instance.status,
             'quiz_mode': instance.quiz_mode
         }
-    )
\ No newline at end of file
+    )
+
+
+def _invalidate_answer_key(quiz_id):
+    # Drop it now for this request and again after commit, so no other process
+    # can cache a key compiled from rows that were not committed yet.
+    invalidate_answer_key(quiz_id)
+    transaction.on_commit(lambda: invalidate_answer_key(quiz_id))
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_answer_key(sender, instance, **kwargs):
+
+    _invalidate_answer_key(instance.quiz_id)
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def invalidate_answer_answer_key(sender, instance, **kwargs):
+
+    try:
+        quiz_id = instance.question.quiz_id
+    except Question.DoesNotExist:
+        return
+    _invalidate_answer_key(quiz_id)
+
+
+# -- dashboard cache (core/dashboard.py) ---------------------------------------
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_dashboard_for_user(sender, instance, update_fields=None, **kwargs):
+
+    # A login only touches last_login; no dashboard number depends on it.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_role_sections('admin', 'teacher')
+    invalidate_user_sections(instance.pk)
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def invalidate_dashboard_for_quiz(sender, instance, **kwargs):
+
+    invalidate_role_sections('admin')
+    invalidate_quiz_sections()
+
+
+@receiver(quiz_status_changed)
+def invalidate_dashboard_for_quiz_status(sender, quiz_ids, status, **kwargs):
+
+    invalidate_role_sections('admin')
+    invalidate_quiz_sections()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_dashboard_for_group(sender, instance, **kwargs):
+
+    invalidate_role_sections('admin')
+    invalidate_user_sections(instance.leader_id)
+
+
+@receiver(post_save, sender=GroupMember)
+@receiver(post_delete, sender=GroupMember)
+@receiver(post_save, sender=QuizSession)
+@receiver(post_delete, sender=QuizSession)
+@receiver(post_save, sender=Profile)
+def invalidate_dashboard_for_owner(sender, instance, **kwargs):
+
+    invalidate_user_sections(instance.user_id)
+
+
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+def invalidate_dashboard_for_result(sender, instance, **kwargs):
+
+    # The student's own results and the quiz author's recent results
+    created_by_id = Quiz.objects.filter(pk=instance.quiz_id).values_list('created_by_id', flat=True).first()
+    invalidate_user_sections(instance.user_id, created_by_id)
+
+
+# -- home page counters (SiteCounter, core/stats.py) ---------------------------
+
+@receiver(post_save, sender=User)
+def count_created_user(sender, instance, created, **kwargs):
+
+    if created:
+        adjust_counter('total_users', 1)
+
+
+@receiver(post_delete, sender=User)
+def count_deleted_user(sender, instance, **kwargs):
+
+    adjust_counter('total_users', -1)
+
+
+@receiver(post_save, sender=Group)
+def count_created_group(sender, instance, created, **kwargs):
+
+    if created:
+        adjust_counter('total_groups', 1)
+
+
+@receiver(post_delete, sender=Group)
+def count_deleted_group(sender, instance, **kwargs):
+
+    adjust_counter('total_groups', -1)
+
+
+@receiver(pre_save, sender=Quiz)
+def remember_stored_quiz_status(sender, instance, update_fields=None, **kwargs):
+
+    # Статуси пешинаро барои ҳисобкунаки active_quizzes нигоҳ медорем,
+    # фоизи гузарондан ва фанро барои UserStats
+    instance._stored_status = None
+    instance._stored_grading = None
+    if update_fields is not None and not {'status', 'pass_percentage', 'subject'} & set(update_fields):
+        # Ин майдонҳо навишта намешаванд, пас тағйир намеёбанд: SELECT лозим нест
+        instance._stored_status = instance.status
+        instance._stored_grading = (instance.pass_percentage, instance.subject_id)
+        return
+    if instance.pk is not None:
+        stored = Quiz.objects.filter(pk=instance.pk).values_list('status', 'pass_percentage', 'subject_id').first()
+        if stored is not None:
+            instance._stored_status = stored[0]
+            instance._stored_grading = stored[1:]
+
+
+@receiver(post_save, sender=Quiz)
+def count_saved_quiz(sender, instance, created, **kwargs):
+
+    was_active = getattr(instance, '_stored_status', None) == 'active'
+    is_active = instance.status == 'active'
+    adjust_counters({
+        'total_quizzes': int(created),
+        'active_quizzes': int(is_active) - int(was_active),
+    })
+
+
+@receiver(post_delete, sender=Quiz)
+def count_deleted_quiz(sender, instance, **kwargs):
+
+    adjust_counters({
+        'total_quizzes': -1,
+        'active_quizzes': -int(instance.status == 'active'),
+    })
+
+
+@receiver(quiz_status_changed)
+def recount_active_quizzes(sender, quiz_ids, status, **kwargs):
+
+    # Bulk UPDATE by the scheduler: the previous statuses are unknown, so recount.
+    reconcile_site_counters(['active_quizzes'])
+
+
+# -- denormalized counts (core/quiz_counts.py) ---------------------------------
+
+@receiver(post_save, sender=Question)
+def count_saved_question(sender, instance, **kwargs):
+
+    refresh_quiz_counts([instance.quiz_id])
+
+
+@receiver(post_delete, sender=Question)
+def count_deleted_question(sender, instance, origin=None, **kwargs):
+
+    # Викторина худаш нест карда мешавад
+    if deleted_with(origin, Quiz):
+        return
+    refresh_quiz_counts([instance.quiz_id])
+
+
+@receiver(post_save, sender=Answer)
+def count_saved_answer(sender, instance, created, **kwargs):
+
+    if created:
+        refresh_answer_counts([instance.question_id])
+
+
+@receiver(post_delete, sender=Answer)
+def count_deleted_answer(sender, instance, origin=None, **kwargs):
+
+    if deleted_with(origin, Question) or deleted_with(origin, Quiz):
+        return
+    refresh_answer_counts([instance.question_id])
+
+
+# -- per-user stats (UserStats, core/user_stats.py) ----------------------------
+
+@receiver(post_save, sender=QuizSession)
+def count_started_session_for_user(sender, instance, created, **kwargs):
+
+    if created and instance.user_id is not None:
+        count_started_session(instance.user_id)
+
+
+@receiver(post_delete, sender=QuizSession)
+@receiver(post_delete, sender=Result)
+def outdate_user_stats(sender, instance, origin=None, **kwargs):
+
+    # Корбар худаш нест карда мешавад
+    if instance.user_id is None or deleted_with(origin, User):
+        return
+    mark_stale([instance.user_id])
+
+
+@receiver(post_save, sender=Quiz)
+def outdate_user_stats_for_quiz(sender, instance, created, **kwargs):
+
+    stored = getattr(instance, '_stored_grading', None)
+    if stored is not None and stored != (instance.pass_percentage, instance.subject_id):
+        mark_stale(Result.objects.filter(quiz=instance).values('user_id'))
+
+
+@receiver(pre_delete, sender=Subject)
+def outdate_user_stats_for_subject(sender, instance, **kwargs):
+
+    # Викторинаҳо бе сигнал subject=NULL мегиранд (SET_NULL)
+    mark_stale(Result.objects.filter(quiz__subject=instance).values('user_id'))
+
+
+# -- quiz stats (QuizStats, core/quiz_stats.py) --------------------------------
+
+@receiver(post_delete, sender=Result)
+def rebuild_quiz_stats_after_deleted_result(sender, instance, origin=None, **kwargs):
+
+    # Омор бо викторина нест карда мешавад
+    if deleted_with(origin, Quiz):
+        return
+    quiz_id = instance.quiz_id
+    transaction.on_commit(lambda: rebuild_quiz_stats([quiz_id]))
+
+
+@receiver(post_save, sender=Quiz)
+def rebuild_quiz_stats_for_pass_percentage(sender, instance, created, **kwargs):
+
+    # pass_count ва гузаштан аз фоизи гузарондан вобастаанд
+    stored = getattr(instance, '_stored_grading', None)
+    if stored is not None and stored[0] != instance.pass_percentage:
+        quiz_id = instance.pk
+        transaction.on_commit(lambda: rebuild_quiz_stats([quiz_id]))
+
+
+# -- leaderboards (Rating, core/leaderboard.py) --------------------------------
+
+@receiver(post_delete, sender=Result)
+def rerank_after_deleted_result(sender, instance, origin=None, **kwargs):
+
+    # Рейтингҳо бо викторина нест карда мешаванд
+    if deleted_with(origin, Quiz):
+        return
+    quiz_id = instance.quiz_id
+    transaction.on_commit(lambda: rebuild_ratings([quiz_id]))
@@ -0,0 +1,25 @@
+# core/sqlite.py
+"""
+Per-connection SQLite tuning.
+
+``DATABASES[alias]['PRAGMAS']`` (see the sqlite-production profile in
+settings) is applied to every new SQLite connection of that alias.
+"""
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(connection, pragmas):
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if pragmas:
+        apply_pragmas(connection, pragmas)
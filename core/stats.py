@@ -0,0 +1,152 @@
+# core/stats.py
+"""
+Cached site-wide counters.
+
+These numbers change slowly compared to how often the pages showing them
+are rendered, so they are read from the Django cache and recomputed at most
+once per ``SITE_STATS_CACHE_TIMEOUT`` seconds.
+
+The public home page counters are ``SiteCounter`` rows instead of COUNT(*)
+queries. Signals in ``core/signals.py`` add or subtract one in the
+transaction that creates or deletes a row, so a rollback undoes the change
+too. Bulk operations bypass signals, so ``manage.py reconcile_site_counters``
+recounts everything periodically. The counters and the rendered anonymous
+home page are cached together with a version token. Any counter change bumps
+the token, so both are rebuilt on the next hit and a page rendered from
+older numbers is never served.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import Group, Question, Quiz, SiteCounter, User
+
+SITE_STATS_CACHE_KEY = 'site_stats:global'
+SITE_STATS_CACHE_TIMEOUT = getattr(settings, 'SITE_STATS_CACHE_TIMEOUT', 60)
+
+SITE_COUNTERS_VERSION_KEY = 'site_counters:version'
+SITE_COUNTERS_CACHE_KEY = 'site_counters:values'
+HOME_PAGE_CACHE_KEY = 'site_counters:home_page'
+HOME_PAGE_CACHE_TIMEOUT = getattr(settings, 'HOME_PAGE_CACHE_TIMEOUT', 5 * 60)
+
+SITE_COUNTERS = {
+    'total_users': lambda: User.objects.count(),
+    'total_quizzes': lambda: Quiz.objects.count(),
+    'active_quizzes': lambda: Quiz.objects.filter(status='active').count(),
+    'total_groups': lambda: Group.objects.count(),
+}
+
+
+def _compute_global_stats():
+    return {
+        'total_quizzes': Quiz.objects.count(),
+        'total_questions': Question.objects.count(),
+        'active_students': User.objects.filter(role='student', is_active=True).count(),
+    }
+
+
+def get_global_stats():
+    """Return the global counters, recomputing them when the cache entry expired."""
+    stats = cache.get(SITE_STATS_CACHE_KEY)
+    if stats is None:
+        stats = _compute_global_stats()
+        cache.set(SITE_STATS_CACHE_KEY, stats, SITE_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_global_stats():
+    cache.delete(SITE_STATS_CACHE_KEY)
+
+
+# -- SiteCounter rows ----------------------------------------------------------
+
+def site_counters_version():
+    """Token that changes whenever a counter changes."""
+    version = cache.get(SITE_COUNTERS_VERSION_KEY)
+    if version is None:
+        cache.add(SITE_COUNTERS_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(SITE_COUNTERS_VERSION_KEY)
+    return version
+
+
+def invalidate_site_counters():
+    # Bump now and again after commit, so nobody caches numbers read before
+    # the change was committed.
+    def bump():
+        cache.set(SITE_COUNTERS_VERSION_KEY, uuid.uuid4().hex, None)
+    bump()
+    transaction.on_commit(bump)
+
+
+def reconcile_site_counters(names=None, dry_run=False):
+    """
+    Recount counters from their tables and store the exact values.
+
+    Returns ``{name: (stored_value_or_None, actual_value)}``.
+    """
+    names = list(names or SITE_COUNTERS)
+    stored = dict(SiteCounter.objects.filter(name__in=names).values_list('name', 'value'))
+    report = {}
+    for name in names:
+        actual = SITE_COUNTERS[name]()
+        report[name] = (stored.get(name), actual)
+        if not dry_run and stored.get(name) != actual:
+            SiteCounter.objects.update_or_create(name=name, defaults={'value': actual})
+    if not dry_run and any(old != new for old, new in report.values()):
+        invalidate_site_counters()
+    return report
+
+
+def adjust_counters(deltas):
+    """Add ``{name: delta}`` to several counters with one UPDATE in the current transaction."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = SiteCounter.objects.filter(name__in=deltas).update(
+        value=F('value') + Case(
+            *(When(name=name, then=Value(delta)) for name, delta in deltas.items()),
+            output_field=IntegerField(),
+        ),
+        updated_at=timezone.now(),
+    )
+    if updated < len(deltas):
+        # First use on a database that was never seeded
+        stored = set(SiteCounter.objects.filter(name__in=deltas).values_list('name', flat=True))
+        reconcile_site_counters([name for name in deltas if name not in stored])
+    invalidate_site_counters()
+
+
+def adjust_counter(name, delta):
+    """Add ``delta`` to a counter in the current transaction."""
+    adjust_counters({name: delta})
+
+
+def get_site_counters():
+    """The home page counters: one cache read, or one query on a miss."""
+    version = site_counters_version()
+    entry = cache.get(SITE_COUNTERS_CACHE_KEY)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    counters = dict.fromkeys(SITE_COUNTERS, 0)
+    counters.update(SiteCounter.objects.filter(name__in=SITE_COUNTERS).values_list('name', 'value'))
+    cache.set(SITE_COUNTERS_CACHE_KEY, (version, counters), SITE_STATS_CACHE_TIMEOUT)
+    return counters
+
+
+# -- anonymous home page -------------------------------------------------------
+
+def get_cached_home_page():
+    """Rendered home page bytes if they match the current counters, else None."""
+    entries = cache.get_many([SITE_COUNTERS_VERSION_KEY, HOME_PAGE_CACHE_KEY])
+    page = entries.get(HOME_PAGE_CACHE_KEY)
+    if page is not None and page[0] == entries.get(SITE_COUNTERS_VERSION_KEY):
+        return page[1]
+    return None
+
+
+def cache_home_page(version, content):
+    cache.set(HOME_PAGE_CACHE_KEY, (version, content), HOME_PAGE_CACHE_TIMEOUT)
@@ -1,3 +1,830 @@
-from django.test import TestCase
+import fcntl
+import json
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, router
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import answer_buffer, audit
+from .answer_buffer import AnswerBuffer
+from .answer_key import invalidate_answer_key
+from .catalogue import visible_quizzes
+from .deltas import json_delta
+from .exports import result_rows
+from .grading import grade_session, grade_sessions
+from .leaderboard import rerank, update_ratings
+from .management.commands.explain_hot_queries import find_table_scans, hot_queries
+from .models import (
+    Answer, AuditLog, Group, GroupMember, Profile, Question, Quiz, QuizSession, Rating, Result, SiteCounter,
+    Subject, User, UserAnswer,
+)
+from .question_import import RowError, import_question_file, parse_csv, parse_gift, parse_json, validate_question
+from .replicas import (
+    REPLICA_DATABASE_ALIAS, REPLICA_STICKY_COOKIE, PrimaryStickinessMiddleware, read_from_primary,
+    stick_to_primary, use_replica,
+)
+from .scheduler import apply_due_transitions
+from .stats import reconcile_site_counters
+
+
+class SubjectListQueryCountTests(TestCase):
+    """subject_list_view must not run queries per subject."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', email='teacher@example.com', password='x', role='teacher')
+        cls.student = User.objects.create_user('student', email='student@example.com', password='x', role='student')
+        Profile.objects.get_or_create(user=cls.student, defaults={'level_type': 'school', 'current_level': 5})
+
+    def add_subject(self, number):
+        subject = Subject.objects.create(name=f'Фан {number}', code=f'S{number}', level_type='school')
+        now = timezone.now()
+        for quiz_number in range(2):
+            quiz = Quiz.objects.create(
+                title=f'Викторина {number}.{quiz_number}', subject=subject, level_type='school',
+                start_level=1, end_level=11, start_time=now - timedelta(days=1), end_time=now + timedelta(days=1),
+                created_by=self.teacher,
+            )
+            for question_number in range(3):
+                question = Question.objects.create(quiz=quiz, text=f'Савол {question_number}')
+                Answer.objects.create(question=question, text='Ҳа', is_correct=True)
+            QuizSession.objects.create(quiz=quiz, user=self.student, finished_at=now)
+
+    def count_queries(self, user):
+        self.client.force_login(user)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('subject_list'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_subjects(self):
+        for user in (self.student, self.teacher):
+            with self.subTest(role=user.role):
+                Subject.objects.all().delete()
+                self.add_subject(1)
+                expected = self.count_queries(user)
+
+                for number in range(2, 12):
+                    self.add_subject(number)
+                self.client.force_login(user)
+                cache.clear()
+                with self.assertNumQueries(expected):
+                    self.client.get(reverse('subject_list'))
+
+
+class HotQueryIndexTests(TestCase):
+    """The hot queries of core/views.py are served by an index, never by a table scan."""
+
+    def test_no_hot_query_scans_a_table(self):
+        for label, queryset, index_name in hot_queries():
+            with self.subTest(label):
+                plan = queryset.explain()
+                self.assertEqual(find_table_scans(connection.vendor, plan), [], plan)
+
+    def test_indexes_exist(self):
+        with connection.cursor() as cursor:
+            indexes = {
+                name
+                for table in connection.introspection.table_names(cursor)
+                for name in connection.introspection.get_constraints(cursor, table)
+            }
+        for _, _, index_name in hot_queries():
+            with self.subTest(index_name):
+                self.assertIn(index_name, indexes)
+
+    def test_command_passes(self):
+        call_command('explain_hot_queries', stdout=StringIO())
+
+    def test_table_scans_are_detected(self):
+        self.assertEqual(
+            find_table_scans('sqlite', 'SCAN core_result\nUSE TEMP B-TREE FOR ORDER BY'),
+            ['SCAN core_result'],
+        )
+        self.assertEqual(find_table_scans('sqlite', 'SCAN core_result USING INDEX result_quiz_rank_idx'), [])
+        self.assertEqual(find_table_scans('sqlite', 'SEARCH core_quiz USING INDEX quiz_available_idx'), [])
+        self.assertEqual(
+            find_table_scans('postgresql', 'Limit\n  ->  Seq Scan on core_result'),
+            ['  ->  Seq Scan on core_result'],
+        )
+        with self.assertRaises(CommandError):
+            find_table_scans('oracle', '')
+
+
+@use_replica
+def read_alias_view(request):
+    """Reports where the reads of a Quiz and of a session would go."""
+    return HttpResponse(f'{router.db_for_read(Quiz)},{router.db_for_read(Session)}')
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    """Reads of ``@use_replica`` views go to the replica unless the user just wrote."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        patcher = mock.patch('core.replicas.replica_configured', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def routed(self, request):
+        return read_alias_view(request).content.decode()
+
+    def test_get_reads_from_replica(self):
+        self.assertEqual(self.routed(self.factory.get('/')), f'{REPLICA_DATABASE_ALIAS},default')
+
+    def test_writes_always_go_to_primary(self):
+        self.assertEqual(router.db_for_write(Quiz), 'default')
+
+    def test_unsafe_method_reads_from_primary(self):
+        self.assertEqual(self.routed(self.factory.post('/')), 'default,default')
+
+    def test_sticky_cookie_reads_from_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[REPLICA_STICKY_COOKIE] = '1'
+        self.assertEqual(self.routed(request), 'default,default')
+
+    def test_no_replica_configured(self):
+        with mock.patch('core.replicas.replica_configured', return_value=False):
+            self.assertEqual(self.routed(self.factory.get('/')), 'default,default')
+
+    def test_routing_ends_with_the_view(self):
+        self.routed(self.factory.get('/'))
+        self.assertEqual(router.db_for_read(Quiz), 'default')
+
+    def test_read_from_primary_inside_replica_view(self):
+        @use_replica
+        def view(request):
+            with read_from_primary():
+                inner = router.db_for_read(Quiz)
+            return HttpResponse(f'{inner},{router.db_for_read(Quiz)}')
+
+        self.assertEqual(view(self.factory.get('/')).content.decode(), f'default,{REPLICA_DATABASE_ALIAS}')
+
+    def test_database_cache_reads_from_primary(self):
+        cache_model = DatabaseCache('quiz_cache', {}).cache_model_class
+
+        @use_replica
+        def view(request):
+            return HttpResponse(str(router.db_for_read(cache_model)))
+
+        self.assertEqual(view(self.factory.get('/')).content.decode(), 'default')
+
+    def test_middleware_sets_sticky_cookie_after_write(self):
+        middleware = PrimaryStickinessMiddleware(lambda request: HttpResponse())
+        self.assertIn(REPLICA_STICKY_COOKIE, middleware(self.factory.post('/')).cookies)
+        self.assertNotIn(REPLICA_STICKY_COOKIE, middleware(self.factory.get('/')).cookies)
+
+        request = self.factory.get('/')
+        stick_to_primary(request)
+        self.assertIn(REPLICA_STICKY_COOKIE, middleware(request).cookies)
+
+
+class AuditSinkWriteTests(TestCase):
+    """A failing audit flush retries, then isolates bad rows and spills them instead of losing the batch."""
+
+    def setUp(self):
+        self.spill_file = Path(tempfile.mkdtemp()) / 'audit_spill.jsonl'
+        self.sink = audit.AuditSink(spill_file=self.spill_file)
+        patcher = mock.patch.object(audit, 'AUDIT_RETRY_BACKOFF', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def entries(self, *object_ids):
+        return [
+            AuditLog(action='create', model='Test', object_id=str(object_id), created_at=timezone.now())
+            for object_id in object_ids
+        ]
+
+    def written(self):
+        return sorted(AuditLog.objects.filter(model='Test').values_list('object_id', flat=True))
+
+    def test_locked_database_is_retried(self):
+        bulk_create = QuerySet.bulk_create
+        failures = iter([OperationalError('database is locked')] * 2)
+
+        def flaky(queryset, objs, **kwargs):
+            error = next(failures, None)
+            if error is not None:
+                raise error
+            return bulk_create(queryset, objs, **kwargs)
+
+        with mock.patch.object(QuerySet, 'bulk_create', flaky):
+            self.sink._write(self.entries(1, 2))
+        self.assertEqual(self.written(), ['1', '2'])
+        self.assertFalse(self.spill_file.exists())
+
+    def test_bad_row_is_spilled_and_replayed(self):
+        save = AuditLog.save
+
+        def save_all_but_two(entry, *args, **kwargs):
+            if entry.object_id == '2':
+                raise ValueError('bad row')
+            return save(entry, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'bulk_create', side_effect=ValueError('bad batch')), \
+                mock.patch.object(AuditLog, 'save', save_all_but_two), \
+                self.assertLogs('core.audit', 'WARNING'):
+            self.sink._write(self.entries(1, 2, 3))
+        self.assertEqual(self.written(), ['1', '3'])
+        self.assertTrue(self.spill_file.exists())
+
+        self.sink.replay_spilled()
+        self.assertEqual(self.written(), ['1', '2', '3'])
+        self.assertFalse(self.spill_file.exists())
+
+
+class AnswerBufferRecoveryTests(TestCase):
+    """Journals of crashed processes are replayed into UserAnswer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buffer', email='buffer@example.com', password='x')
+        now = timezone.now()
+        quiz = Quiz.objects.create(
+            title='Буфер', start_level=1, end_level=11, start_time=now, end_time=now + timedelta(days=1),
+            created_by=cls.user,
+        )
+        cls.question = Question.objects.create(quiz=quiz, text='Савол')
+        cls.first = Answer.objects.create(question=cls.question, text='1', is_correct=True)
+        cls.second = Answer.objects.create(question=cls.question, text='2')
+        cls.session = QuizSession.objects.create(quiz=quiz, user=cls.user)
+
+    def setUp(self):
+        self.journal_dir = Path(tempfile.mkdtemp())
+
+    def write_journal(self, name, *entries):
+        path = self.journal_dir / name
+        path.write_text(''.join(json.dumps(entry) + '\n' for entry in entries))
+        return path
+
+    def stored_answer(self):
+        answers = UserAnswer.objects.filter(session=self.session, question=self.question)
+        return answers.values_list('answer_id', flat=True).first()
+
+    def test_dead_process_journal_is_replayed(self):
+        now = time.time_ns()
+        crashed = self.write_journal(
+            'answers-4242-dead.jsonl',
+            [self.session.pk, self.question.pk, self.first.pk, now],
+            [self.session.pk, self.question.pk, self.second.pk, now + 1],
+        )
+        buffer = AnswerBuffer(self.journal_dir)
+        buffer.open_journal()
+        buffer.replay_orphans()
+
+        self.assertEqual(self.stored_answer(), self.second.pk)
+        self.assertFalse(crashed.exists())
+        self.assertTrue(buffer.path.exists())
+
+    def test_replay_starts_after_the_checkpoint(self):
+        line = json.dumps([self.session.pk, self.question.pk, self.first.pk, time.time_ns()]) + '\n'
+        crashed = self.write_journal('answers-4242-dead.jsonl')
+        crashed.write_text(line)
+        Path(f'{crashed}.ckpt').write_text(str(len(line)))
+
+        AnswerBuffer(self.journal_dir).replay_orphans()
+        self.assertIsNone(self.stored_answer())
+        self.assertFalse(Path(f'{crashed}.ckpt').exists())
+
+    def test_live_process_journal_is_left_alone(self):
+        live = self.write_journal('answers-4243-live.jsonl', [self.session.pk, self.question.pk, self.first.pk, 1])
+        with open(live, 'ab') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            AnswerBuffer(self.journal_dir).replay_orphans()
+        self.assertIsNone(self.stored_answer())
+        self.assertTrue(live.exists())
+
+    def test_forked_child_forgets_the_parent_journal(self):
+        buffer = AnswerBuffer(self.journal_dir)
+        buffer.open_journal()
+        buffer._pending[(self.session.pk, self.question.pk)] = (self.first.pk, 1)
+        buffer._after_fork()
+        self.assertIsNone(buffer.path)
+        self.assertEqual(buffer._pending, {})
+
+
+class QuizStatusBoundaryTests(TestCase):
+    """Saving a quiz and the scheduler agree that a quiz is active in [start_time, end_time)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('boundary', email='boundary@example.com', password='x', role='teacher')
+        cls.student = User.objects.create_user('pupil', email='pupil@example.com', password='x', role='student')
+        Profile.objects.get_or_create(user=cls.student, defaults={'level_type': 'school', 'current_level': 5})
+
+    def quiz_at(self, now, start_time, end_time):
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            return Quiz.objects.create(
+                title='Сарҳад', level_type='school', start_level=1, end_level=11,
+                start_time=start_time, end_time=end_time, created_by=self.teacher,
+            )
+
+    def test_boundaries(self):
+        now = timezone.now()
+        cases = [
+            ('starts now', now, now + timedelta(hours=1), 'active'),
+            ('ends now', now - timedelta(hours=1), now, 'finished'),
+            ('ended', now - timedelta(hours=2), now - timedelta(hours=1), 'finished'),
+            ('upcoming', now + timedelta(hours=1), now + timedelta(hours=2), 'published'),
+        ]
+        for label, start_time, end_time, expected in cases:
+            with self.subTest(label):
+                saved = self.quiz_at(now, start_time, end_time)
+                self.assertEqual(saved.status, expected)
+
+                scheduled = self.quiz_at(now - timedelta(days=1), start_time, end_time)
+                apply_due_transitions(now=now, quiz_ids=[scheduled.pk])
+                scheduled.refresh_from_db()
+                self.assertEqual(scheduled.status, expected)
+
+                with mock.patch('django.utils.timezone.now', return_value=now):
+                    self.assertEqual(saved.is_active(), expected == 'active')
+
+    def test_listing_shows_active_quizzes_only(self):
+        now = timezone.now()
+        active = self.quiz_at(now, now - timedelta(hours=1), now + timedelta(hours=1))
+        self.quiz_at(now, now - timedelta(hours=1), now)
+        self.quiz_at(now, now + timedelta(hours=1), now + timedelta(hours=2))
+        self.assertEqual(list(visible_quizzes(self.student)), [active])
+
+
+class GradingTests(TestCase):
+    """Set-based grading: a fixed number of queries and the same scores as per-question grading."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('grader', email='grader@example.com', password='x')
+        now = timezone.now()
+        cls.quiz = Quiz.objects.create(
+            title='Баҳо', start_level=1, end_level=11, start_time=now, end_time=now + timedelta(days=1),
+            created_by=cls.user,
+        )
+        questions = [Question.objects.create(quiz=cls.quiz, text=f'Савол {i}', points=1 + i % 3) for i in range(6)]
+        answers = [
+            [Answer.objects.create(question=question, text=str(j), is_correct=j == 0) for j in range(3)]
+            for question in questions
+        ]
+        cls.sessions = []
+        for offset in range(4):
+            session = QuizSession.objects.create(quiz=cls.quiz, user=cls.user)
+            for i, question in enumerate(questions[offset:]):
+                UserAnswer.objects.create(session=session, question=question, answer=answers[i + offset][i % 2])
+            cls.sessions.append(session)
+
+    def setUp(self):
+        cache.clear()
+
+    def per_question_score(self, session):
+        # QuizSession.get_score() before the answer keys
+        score = 0
+        for user_answer in session.user_answers.all():
+            if user_answer.answer.is_correct:
+                score += user_answer.question.points
+        return score
+
+    def test_query_count(self):
+        invalidate_answer_key(self.quiz.pk)
+        with self.assertNumQueries(3):
+            grade_session(self.sessions[0])
+        with self.assertNumQueries(1):
+            grade_session(self.sessions[0])
+        with self.assertNumQueries(1):
+            grade_sessions(self.sessions)
+
+    def test_scores_match_per_question_grading(self):
+        grades = grade_sessions(self.sessions)
+        for session in self.sessions:
+            with self.subTest(session=session.pk):
+                self.assertEqual(session.get_score(), self.per_question_score(session))
+                self.assertEqual(grades[session.pk].score, self.per_question_score(session))
+                self.assertEqual(grades[session.pk].total_questions, 6)
+
+
+class QuizCounterTests(TestCase):
+    """Quiz saves keep the SiteCounter rows exact without extra queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('counter', email='counter@example.com', password='x', role='teacher')
+
+    def setUp(self):
+        reconcile_site_counters()
+
+    def create_quiz(self):
+        now = timezone.now()
+        return Quiz.objects.create(
+            title='Ҳисоб', start_level=1, end_level=11, start_time=now - timedelta(hours=1),
+            end_time=now + timedelta(hours=1), created_by=self.teacher,
+        )
+
+    def counters(self):
+        counters = SiteCounter.objects.filter(name__in=['total_quizzes', 'active_quizzes'])
+        return dict(counters.values_list('name', 'value'))
+
+    def counter_updates(self, queries):
+        return [query['sql'] for query in queries if query['sql'].startswith('UPDATE "core_sitecounter"')]
+
+    def test_new_quiz_updates_both_counters_at_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            quiz = self.create_quiz()
+        self.assertEqual(len(self.counter_updates(queries)), 1)
+        self.assertEqual(self.counters(), {'total_quizzes': 1, 'active_quizzes': 1})
+
+        with CaptureQueriesContext(connection) as queries:
+            quiz.clone(start_time=timezone.now() + timedelta(days=1))
+        self.assertEqual(len(self.counter_updates(queries)), 1)
+        self.assertEqual(self.counters(), {'total_quizzes': 2, 'active_quizzes': 1})
+
+        quiz.delete()
+        self.assertEqual(self.counters(), {'total_quizzes': 1, 'active_quizzes': 0})
+
+    def test_save_of_other_fields_skips_the_stored_status_lookup(self):
+        quiz = self.create_quiz()
+        quiz.title = 'Ном'
+        with CaptureQueriesContext(connection) as queries:
+            quiz.save(update_fields=['title'])
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT')])
+        self.assertEqual(self.counters(), {'total_quizzes': 1, 'active_quizzes': 1})
+
+        with CaptureQueriesContext(connection) as queries:
+            quiz.save(update_fields=['status'])
+        self.assertTrue([query for query in queries if query['sql'].startswith('SELECT')])
+
+
+class ResultExportTests(TestCase):
+    """The per-question columns of an export come from the session that produced the result."""
+
+    def test_columns_follow_the_result_session(self):
+        user = User.objects.create_user('exporter', email='exporter@example.com', password='x')
+        now = timezone.now()
+        quiz = Quiz.objects.create(
+            title='Содирот', start_level=1, end_level=11, start_time=now, end_time=now + timedelta(days=1),
+            created_by=user,
+        )
+        question = Question.objects.create(quiz=quiz, text='Савол')
+        right = Answer.objects.create(question=question, text='Ҳа', is_correct=True)
+        wrong = Answer.objects.create(question=question, text='Не')
+
+        sessions = []
+        for answer in (wrong, right):
+            session = QuizSession.objects.create(quiz=quiz, user=user, finished_at=now)
+            UserAnswer.objects.create(session=session, question=question, answer=answer)
+            sessions.append(session)
+        for session, score in zip(sessions, (0, 1)):
+            Result.objects.create(
+                quiz=quiz, user=user, session=session, score=score, total_questions=1, correct_answers=score,
+            )
+        Result.objects.create(quiz=quiz, user=user, score=0, total_questions=1, correct_answers=0)
+
+        rows = list(result_rows(quiz, Result.objects.filter(quiz=quiz), chunk_size=2))[1:]
+        self.assertEqual([row[-1] for row in rows], [0, 1, ''])
+
+
+class QuestionImportTests(TestCase):
+    """The CSV, JSON and GIFT parsers agree, and invalid rows are reported instead of imported."""
+
+    CSV = (
+        'text,question_type,points,answer_1,answer_2,answer_3,correct\n'
+        'Пойтахти Тоҷикистон?,single_choice,2,Душанбе,Хуҷанд,Бохтар,1\n'
+        'Ададҳои ҷуфт?,multiple_choice,1,2,3,4,1;3\n'
+    )
+    JSON = json.dumps([
+        {'text': 'Пойтахти Тоҷикистон?', 'question_type': 'single_choice', 'points': 2, 'answers': [
+            {'text': 'Душанбе', 'is_correct': True}, {'text': 'Хуҷанд'}, {'text': 'Бохтар'},
+        ]},
+        {'text': 'Ададҳои ҷуфт?', 'question_type': 'multiple_choice', 'answers': [
+            {'text': '2', 'is_correct': True}, {'text': '3'}, {'text': '4', 'is_correct': True},
+        ]},
+    ])
+    GIFT = (
+        '// бонки саволҳо\n'
+        '::q1:: Пойтахти Тоҷикистон? {=Душанбе ~Хуҷанд ~Бохтар}\n'
+        '\n'
+        'Ададҳои ҷуфт? {~%50%2 ~3 ~%50%4}\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('importer', email='importer@example.com', password='x', role='teacher')
+        now = timezone.now()
+        cls.quiz = Quiz.objects.create(
+            title='Воридот', start_level=1, end_level=11, start_time=now, end_time=now + timedelta(days=1),
+            created_by=cls.teacher,
+        )
+
+    def parsed(self, items):
+        return [
+            (question.text, question.question_type, question.answers)
+            for question in (validate_question(row, raw) for row, raw in items)
+        ]
+
+    def test_formats_round_trip_to_the_same_questions(self):
+        expected = self.parsed(parse_csv(StringIO(self.CSV)))
+        self.assertEqual(expected, [
+            ('Пойтахти Тоҷикистон?', 'single_choice', [('Душанбе', True), ('Хуҷанд', False), ('Бохтар', False)]),
+            ('Ададҳои ҷуфт?', 'multiple_choice', [('2', True), ('3', False), ('4', True)]),
+        ])
+        json_lines = '\n'.join(json.dumps(item) for item in json.loads(self.JSON))
+        for label, items in [
+            ('json array', parse_json(StringIO(self.JSON), read_size=16)),
+            ('json lines', parse_json(StringIO(json_lines), read_size=16)),
+            ('gift', parse_gift(StringIO(self.GIFT))),
+        ]:
+            with self.subTest(label):
+                self.assertEqual(self.parsed(items), expected)
+
+    def test_invalid_rows_are_rejected(self):
+        cases = {
+            'empty text': {'text': ' ', 'answers': [{'text': 'a', 'is_correct': True}]},
+            'unknown type': {'text': 'q', 'question_type': 'essay', 'answers': [{'text': 'a', 'is_correct': True}]},
+            'bad points': {'text': 'q', 'points': 'many', 'answers': [{'text': 'a', 'is_correct': True}]},
+            'no answers': {'text': 'q'},
+            'no correct answer': {'text': 'q', 'answers': [{'text': 'a'}]},
+            'two correct single choice': {'text': 'q', 'answers': [
+                {'text': 'a', 'is_correct': True}, {'text': 'b', 'is_correct': True},
+            ]},
+        }
+        for label, raw in cases.items():
+            with self.subTest(label), self.assertRaises(RowError):
+                validate_question(1, raw)
+
+    def test_import_skips_bad_rows_and_keeps_counts(self):
+        source = self.CSV + 'Бе ҷавоби дуруст,single_choice,1,a,b,\n' + self.CSV.split('\n', 1)[1]
+        report = import_question_file(self.quiz, StringIO(source), 'csv', chunk_size=2)
+
+        self.assertEqual(report.created, 4)
+        self.assertEqual([row for row, _ in report.errors], [4])
+        self.assertEqual(list(self.quiz.questions.order_by('order').values_list('order', flat=True)), [1, 2, 3, 4])
+        self.quiz.refresh_from_db()
+        self.assertEqual((self.quiz.question_count, self.quiz.total_points), (4, 6))
+        self.assertEqual(Answer.objects.filter(question__quiz=self.quiz).count(), 12)
+
+    def test_malformed_json_is_reported(self):
+        report = import_question_file(self.quiz, StringIO(self.JSON[:-10]), 'json', dry_run=True)
+        self.assertEqual(report.created, 1)
+        self.assertEqual([row for row, _ in report.errors], [2])
+
+
+class QuizCloneTests(TestCase):
+    """Quiz.clone() copies every question and answer with a query count independent of the quiz size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('cloner', email='cloner@example.com', password='x', role='teacher')
+        cls.subject = Subject.objects.create(name='Математика', code='MATH', level_type='school')
+
+    def create_quiz(self, size):
+        now = timezone.now()
+        quiz = Quiz.objects.create(
+            title=f'Олимпиада {size}', subject=self.subject, start_level=5, end_level=9,
+            start_time=now + timedelta(days=1), end_time=now + timedelta(days=1, hours=2),
+            pass_percentage=70, created_by=self.teacher,
+        )
+        for number in range(size):
+            question = Question.objects.create(
+                quiz=quiz, text=f'Савол {number}', points=1 + number % 3, hint=f'Маслиҳат {number}',
+            )
+            for answer in range(3):
+                Answer.objects.create(question=question, text=f'{number}.{answer}', is_correct=answer == number % 3)
+        quiz.refresh_from_db()
+        return quiz
+
+    def snapshot(self, quiz):
+        return [
+            (question.text, question.question_type, question.points, question.order, question.hint,
+             question.answer_count, [(answer.text, answer.is_correct) for answer in question.answers.order_by('id')])
+            for question in quiz.questions.order_by('order', 'id')
+        ]
+
+    def test_copy_is_faithful(self):
+        quiz = self.create_quiz(4)
+        start_time = quiz.start_time + timedelta(days=7)
+        copy = quiz.clone(start_time=start_time, title='Такрор')
+
+        self.assertNotEqual(copy.pk, quiz.pk)
+        self.assertEqual(self.snapshot(copy), self.snapshot(quiz))
+        self.assertEqual(copy.title, 'Такрор')
+        self.assertEqual(copy.end_time - copy.start_time, quiz.end_time - quiz.start_time)
+        self.assertEqual(
+            (copy.subject_id, copy.pass_percentage, copy.question_count, copy.total_points, copy.status),
+            (quiz.subject_id, quiz.pass_percentage, quiz.question_count, quiz.total_points, 'published'),
+        )
+        self.assertEqual(Answer.objects.filter(question__quiz=quiz).count(), 12)
+
+    def test_query_count_does_not_grow_with_questions(self):
+        small, large = self.create_quiz(2), self.create_quiz(30)
+        with CaptureQueriesContext(connection) as queries:
+            small.clone()
+        with self.assertNumQueries(len(queries)):
+            large.clone()
+
+    def test_invalid_overrides_are_rejected(self):
+        quiz = self.create_quiz(1)
+        with self.assertRaises(ValueError):
+            quiz.clone(start_time=quiz.end_time, end_time=quiz.start_time)
+        with self.assertRaises(ValueError):
+            quiz.clone(start_level=9, end_level=5)
+
+
+class LeaderboardTests(TestCase):
+    """Incremental rank updates match a full rerank: competition ranks, ties and overtakes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            name: User.objects.create_user(name, email=f'{name}@example.com', password='x')
+            for name in ('ali', 'bek', 'gul', 'dil', 'eraj')
+        }
+        now = timezone.now()
+        cls.quiz = Quiz.objects.create(
+            title='Рейтинг', start_level=1, end_level=11, start_time=now, end_time=now + timedelta(days=1),
+            created_by=cls.users['ali'],
+        )
+
+    def submit(self, name, score):
+        result = Result.objects.create(
+            quiz=self.quiz, user=self.users[name], score=score, total_questions=10, correct_answers=int(score),
+        )
+        update_ratings(result)
+        return result
+
+    def board(self):
+        ratings = Rating.objects.filter(quiz=self.quiz, entity_type='user').select_related('user')
+        return {rating.user.username: (rating.rank, rating.score) for rating in ratings}
+
+    def assert_board(self, expected):
+        self.assertEqual(self.board(), expected)
+        self.assertEqual(rerank([self.quiz.pk]), 0)
+
+    def test_ties_and_overtakes(self):
+        self.submit('ali', 10)
+        self.submit('bek', 8)
+        self.submit('gul', 8)
+        self.assert_board({'ali': (1, 10), 'bek': (2, 8), 'gul': (2, 8)})
+
+        self.submit('dil', 9)
+        self.assert_board({'ali': (1, 10), 'dil': (2, 9), 'bek': (3, 8), 'gul': (3, 8)})
+
+        # bek overtakes dil and ties with ali; gul is left behind alone
+        self.submit('bek', 10)
+        self.assert_board({'ali': (1, 10), 'bek': (1, 10), 'dil': (3, 9), 'gul': (4, 8)})
+
+        # A worse attempt keeps the best score
+        self.submit('dil', 2)
+        self.submit('eraj', 10)
+        self.assert_board({'ali': (1, 10), 'bek': (1, 10), 'eraj': (1, 10), 'dil': (4, 9), 'gul': (5, 8)})
+
+    def test_rerank_repairs_ranks(self):
+        for name, score in (('ali', 5), ('bek', 7), ('gul', 7)):
+            self.submit(name, score)
+        Rating.objects.filter(quiz=self.quiz).update(rank=9)
+        self.assertEqual(rerank([self.quiz.pk]), 3)
+        self.assertEqual(self.board(), {'bek': (1, 7), 'gul': (1, 7), 'ali': (3, 5)})
+
+    def test_deleted_result_reranks(self):
+        self.submit('ali', 10)
+        best = self.submit('bek', 9)
+        self.submit('bek', 4)
+        self.submit('gul', 6)
+        with self.captureOnCommitCallbacks(execute=True):
+            best.delete()
+        self.assertEqual(self.board(), {'ali': (1, 10), 'gul': (2, 6), 'bek': (3, 4)})
+
+
+class ManualAnswerBuffer(AnswerBuffer):
+    """An answer buffer without the flusher thread: the tests flush it."""
+
+    def start(self):
+        if self._file is None:
+            self.open_journal()
+
+
+class WriteBehindAnswerTests(TestCase):
+    """Buffered answers reach UserAnswer on flush, and always before a session is graded."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('burst', email='burst@example.com', password='x')
+        now = timezone.now()
+        cls.quiz = Quiz.objects.create(
+            title='Имтиҳон', start_level=1, end_level=11, start_time=now, end_time=now + timedelta(days=1),
+            created_by=cls.user,
+        )
+        cls.questions = []
+        cls.answers = {}
+        for number in range(2):
+            question = Question.objects.create(quiz=cls.quiz, text=f'Савол {number}', points=2)
+            cls.questions.append(question)
+            cls.answers[question.pk] = [
+                Answer.objects.create(question=question, text=str(j), is_correct=j == 0) for j in range(2)
+            ]
+
+    def setUp(self):
+        self.session = QuizSession.objects.create(quiz=self.quiz, user=self.user)
+        self.buffer = ManualAnswerBuffer(tempfile.mkdtemp())
+        for patcher in (
+            mock.patch.object(answer_buffer, 'ANSWER_WRITE_BEHIND', True),
+            mock.patch.object(answer_buffer, 'answer_buffer', self.buffer),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.buffer._after_fork)
+
+    def answer(self, question, correct):
+        return question.pk, self.answers[question.pk][0 if correct else 1].pk
+
+    def stored(self):
+        return dict(UserAnswer.objects.filter(session=self.session).values_list('question_id', 'answer_id'))
+
+    def test_answers_wait_in_the_buffer_until_flushed(self):
+        question = self.questions[0]
+        answer_buffer.store_answers(self.session.pk, [self.answer(question, False)])
+        answer_buffer.store_answers(self.session.pk, [self.answer(question, True)])
+        self.assertEqual(self.stored(), {})
+        self.assertEqual(answer_buffer.pending_answer(self.session.pk, question.pk), self.answer(question, True)[1])
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.stored(), dict([self.answer(question, True)]))
+        self.assertIsNone(answer_buffer.pending_answer(self.session.pk, question.pk))
+        self.assertEqual(self.buffer.path.stat().st_size, 0)
+
+    def test_finish_grades_buffered_answers_from_every_journal(self):
+        first, second = self.questions
+        answer_buffer.store_answers(self.session.pk, [self.answer(first, True)])
+        # Another worker's journal, not flushed yet
+        other = self.buffer.journal_dir / 'answers-4244-other.jsonl'
+        other.write_text(json.dumps([self.session.pk, *self.answer(second, True), time.time_ns()]) + '\n')
+
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('quiz_finish', args=[self.session.pk]))
+        self.assertEqual(response.status_code, 302)
+
+        result = Result.objects.get(session=self.session)
+        self.assertEqual((result.score, result.correct_answers), (4, 2))
+
+    def test_late_flush_does_not_rewrite_a_finished_session(self):
+        question = self.questions[0]
+        answer_buffer.store_answers(self.session.pk, [self.answer(question, True)])
+        QuizSession.objects.filter(pk=self.session.pk).update(finished_at=timezone.now())
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.stored(), {})
+
+
+class JsonDeltaTests(TestCase):
+    """Polling endpoints answer 304 while the client's validators still match."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_matching_etag_gets_304(self):
+        first = json_delta(self.factory.get('/'), {'count': 1})
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(json.loads(first.content), {'count': 1})
+
+        again = json_delta(self.factory.get('/', HTTP_IF_NONE_MATCH=first['ETag']), {'count': 1})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+
+        changed = json_delta(self.factory.get('/', HTTP_IF_NONE_MATCH=first['ETag']), {'count': 2})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_unchanged_last_modified_gets_304(self):
+        last_modified = timezone.now() - timedelta(hours=1)
+        first = json_delta(self.factory.get('/'), {'count': 1}, last_modified)
+        again = json_delta(
+            self.factory.get('/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified']), {'count': 1}, last_modified,
+        )
+        self.assertEqual(again.status_code, 304)
+
+    def test_groups_refresh_endpoint(self):
+        user = User.objects.create_user('leader', email='leader@example.com', password='x', role='student')
+        subject = Subject.objects.create(name='Физика', code='PHYS', level_type='school')
+        group = Group.objects.create(name='Гурӯҳ', subject=subject, leader=user)
+        GroupMember.objects.create(group=group, user=user)
+        self.client.force_login(user)
+
+        first = self.client.get(reverse('groups_refresh'))
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['groups'][0]['member_count'], 1)
+        self.assertEqual(self.client.get(reverse('groups_refresh'), HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        other = User.objects.create_user('member', email='member@example.com', password='x')
+        GroupMember.objects.create(group=group, user=other)
+        changed = self.client.get(reverse('groups_refresh'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['groups'][0]['member_count'], 2)
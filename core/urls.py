@@ -27,18 +27,26 @@ urlpatterns = [
     path('quizzes/create/', views.quiz_create_view, name='quiz_create'),
     path('quizzes/<int:pk>/', views.quiz_detail_view, name='quiz_detail'),
     path('quizzes/<int:pk>/edit/', views.quiz_edit_view, name='quiz_edit'),
+    path('quizzes/<int:pk>/clone/', views.quiz_clone_view, name='quiz_clone'),
     path('quizzes/<int:pk>/start/', views.quiz_start_view, name='quiz_start'),
     path('quizzes/<int:quiz_pk>/results/', views.quiz_results_view, name='quiz_results'),
+    path('quizzes/<int:quiz_pk>/results/export/', views.export_quiz_results_view, name='export_quiz_results'),
+    path('quizzes/<int:quiz_pk>/leaderboard/', views.quiz_leaderboard_view, name='quiz_leaderboard'),
     path('quizzes/create/', views.quiz_create_view, name='quiz_create'),
     path('quiz-sessions/<int:session_pk>/take/', views.quiz_take_view, name='quiz_take'),
     path('quiz-sessions/<int:session_pk>/finish/', views.quiz_finish_view, name='quiz_finish'),
     path('quiz-sessions/<int:session_pk>/result/', views.quiz_result_view, name='quiz_result'),
     
     path('quizzes/<int:quiz_pk>/questions/create/', views.question_create_view, name='question_create'),
+    path('quizzes/<int:quiz_pk>/questions/import/', views.question_import_view, name='question_import'),
     path('questions/<int:pk>/edit/', views.question_edit_view, name='question_edit'),
     
     path('my-results/', views.my_results_view, name='my_results'),
     
     path('ajax/quizzes/<int:pk>/check-time/', views.check_quiz_time_view, name='check_quiz_time'),
+    path('ajax/refresh/quizzes/', views.quiz_list_refresh_ajax_view, name='quiz_list_refresh'),
+    path('ajax/refresh/results/', views.my_results_refresh_ajax_view, name='my_results_refresh'),
+    path('ajax/refresh/groups/', views.groups_refresh_ajax_view, name='groups_refresh'),
     path('ajax/save-answer/', views.save_answer_ajax_view, name='save_answer_ajax'),
+    path('ajax/save-answers/', views.save_answers_batch_ajax_view, name='save_answers_ajax'),
 ]
\ No newline at end of file
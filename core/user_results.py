@@ -0,0 +1,28 @@
+# core/user_results.py
+"""
+Result listings behind ``my_results_view`` and its refresh endpoint. The
+totals and the per-subject rollup come from ``UserStats`` (core/user_stats.py).
+"""
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Round
+
+from .models import Result
+
+
+def result_percentage_expression():
+    """``score`` as a percentage of ``total_questions``, in SQL (0 for empty quizzes)."""
+    return Case(
+        When(total_questions__gt=0, then=F('score') * 100.0 / F('total_questions')),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def user_results(user):
+    """A user's results, newest first, with ``score_percentage``, ready for listing."""
+    return (
+        Result.objects.filter(user=user)
+        .select_related('quiz__subject')
+        .annotate(score_percentage=Round(result_percentage_expression(), 1))
+        .order_by('-completed_at', '-id')
+    )
@@ -0,0 +1,260 @@
+# core/user_stats.py
+"""
+Incremental maintenance of ``UserStats``.
+
+``profile_view``, the student dashboard and ``my_results_view`` read a user's
+session counts, result totals and per-subject rollup from this one row
+instead of aggregating QuizSession and Result on every request.
+
+* ``record_user_result`` folds a finished session and its Result into the
+  row. It is called in the ``quiz_finish_view`` transaction, so the row never
+  disagrees with the results table.
+* ``count_started_session`` adds a started session (from a post_save signal).
+* Deleting a result or a session, or changing a quiz's pass percentage or
+  subject, cannot be undone with delta math (the old best score is gone), so
+  the signals only mark the affected rows ``stale``. ``get_user_stats``
+  rebuilds a stale or missing row when it is read.
+
+``rebuild_user_stats`` recomputes rows from the tables in chunks of users
+(``manage.py backfill_user_stats``) and ``find_inconsistent_user_stats``
+compares the stored rows with a fresh rebuild (``manage.py check_user_stats``).
+"""
+from django.db import router, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import QuizSession, Result, Subject, User, UserStats
+from .quiz_stats import result_percentage
+
+NO_SUBJECT = ''
+
+STAT_FIELDS = [
+    'total_sessions', 'completed_sessions', 'result_count', 'percentage_sum', 'best_percentage',
+    'pass_count', 'last_result_id', 'last_completed_at', 'subjects', 'stale', 'updated_at',
+]
+
+
+def _subject_key(subject_id):
+    return NO_SUBJECT if subject_id is None else str(subject_id)
+
+
+def _apply(stats, result_id, subject_id, percentage, passed, completed_at, first_attempt):
+    """Add one result; results must be applied oldest first."""
+    stats.result_count += 1
+    stats.percentage_sum += percentage
+    stats.best_percentage = percentage if stats.best_percentage is None else max(stats.best_percentage, percentage)
+    stats.pass_count += int(passed)
+    stats.last_result_id = max(stats.last_result_id, result_id)
+    if stats.last_completed_at is None or completed_at >= stats.last_completed_at:
+        stats.last_completed_at = completed_at
+
+    subjects = dict(stats.subjects)
+    key = _subject_key(subject_id)
+    entry = dict(subjects.get(key) or {
+        'attempts': 0, 'quizzes': 0, 'percentage_sum': 0.0, 'best': None, 'last': None, 'passed': 0,
+    })
+    entry['attempts'] += 1
+    entry['quizzes'] += int(first_attempt)
+    entry['percentage_sum'] += percentage
+    entry['best'] = percentage if entry['best'] is None else max(entry['best'], percentage)
+    entry['last'] = percentage
+    entry['passed'] += int(passed)
+    subjects[key] = entry
+    stats.subjects = subjects
+
+
+def _build(user_ids, using):
+    """Fresh, unsaved rows for ``user_ids`` computed from the tables (two queries)."""
+    rows = {user_id: UserStats(user_id=user_id, updated_at=timezone.now()) for user_id in user_ids}
+
+    sessions = (
+        QuizSession.objects.using(using).filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(total=Count('id'), completed=Count('id', filter=Q(finished_at__isnull=False)))
+        .order_by()
+    )
+    for row in sessions:
+        rows[row['user_id']].total_sessions = row['total']
+        rows[row['user_id']].completed_sessions = row['completed']
+
+    results = (
+        Result.objects.using(using).filter(user_id__in=user_ids)
+        .order_by('user_id', 'completed_at', 'id')
+        .values_list('id', 'user_id', 'quiz_id', 'quiz__subject_id', 'quiz__pass_percentage',
+                     'score', 'total_questions', 'completed_at')
+    )
+    seen = set()
+    for result_id, user_id, quiz_id, subject_id, pass_percentage, score, total_questions, completed_at in results:
+        percentage = result_percentage(score, total_questions)
+        first_attempt = (user_id, quiz_id) not in seen
+        seen.add((user_id, quiz_id))
+        _apply(rows[user_id], result_id, subject_id, percentage, percentage >= pass_percentage,
+               completed_at, first_attempt)
+    return list(rows.values())
+
+
+def _save(rows, using):
+    UserStats.objects.using(using).bulk_create(
+        rows, update_conflicts=True, unique_fields=['user'], update_fields=STAT_FIELDS,
+    )
+
+
+def _user_id_chunks(user_ids, chunk_size, using):
+    users = User.objects.using(using).order_by('pk').values_list('pk', flat=True)
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    last = 0
+    while True:
+        chunk = list(users.filter(pk__gt=last)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def rebuild_user_stats(user_ids=None, chunk_size=500):
+    """
+    Recompute the rows of ``user_ids`` (all users by default) from the tables.
+
+    Users are processed ``chunk_size`` at a time, each chunk in its own short
+    transaction. Returns the number of rows written.
+    """
+    # Reads come from the database that is written, never from a lagging replica
+    using = router.db_for_write(UserStats)
+    written = 0
+    for chunk in _user_id_chunks(user_ids, chunk_size, using):
+        with transaction.atomic(using=using):
+            _save(_build(chunk, using), using)
+        written += len(chunk)
+    return written
+
+
+def record_user_result(result, pass_percentage):
+    """
+    Add a finished session and its ``result`` to the user's row.
+
+    Call it inside the transaction that creates the Result, after the session
+    was marked finished.
+    """
+    if result.user_id is None:
+        return None
+    using = router.db_for_write(UserStats)
+    with transaction.atomic(using=using):
+        stats = UserStats.objects.using(using).select_for_update().filter(user_id=result.user_id).first()
+        if stats is None or stats.stale:
+            # A rebuild already sees the new result and the finished session
+            stats = _build([result.user_id], using)[0]
+            _save([stats], using)
+            return stats
+
+        first_attempt = not (
+            Result.objects.using(using)
+            .filter(user_id=result.user_id, quiz_id=result.quiz_id)
+            .exclude(pk=result.pk)
+            .exists()
+        )
+        percentage = result_percentage(result.score, result.total_questions)
+        stats.completed_sessions += 1
+        _apply(stats, result.pk, result.quiz.subject_id, percentage, percentage >= pass_percentage,
+               result.completed_at, first_attempt)
+        stats.save()
+    return stats
+
+
+def count_started_session(user_id):
+    """Add one started session to the user's row."""
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        total_sessions=F('total_sessions') + 1, updated_at=timezone.now(),
+    )
+    if not updated:
+        rebuild_user_stats([user_id])
+
+
+def mark_stale(user_ids):
+    """Have the rows of ``user_ids`` (a list or a queryset of ids) rebuilt on their next read."""
+    UserStats.objects.filter(user_id__in=user_ids, stale=False).update(stale=True)
+
+
+def get_user_stats(user):
+    """The user's row, rebuilt first if it is stale or was never built."""
+    stats = UserStats.objects.filter(user=user).first()
+    if stats is None or stats.stale:
+        using = router.db_for_write(UserStats)
+        stats = _build([user.pk], using)[0]
+        _save([stats], using)
+    return stats
+
+
+def result_summary(stats):
+    """Totals in the shape the results pages use."""
+    return {
+        'total_attempts': stats.result_count,
+        'average_score': round(stats.average_percentage, 1),
+        'best_score': round(stats.best_percentage or 0, 1),
+        'passed': stats.pass_count,
+        'last_id': stats.last_result_id,
+        'last_completed': stats.last_completed_at,
+    }
+
+
+def subject_rollup(stats):
+    """
+    Per-subject attempts, quizzes, average/best/last percentage and pass
+    count, most attempted first. Costs one query for the subject names.
+    """
+    ids = [int(key) for key in stats.subjects if key != NO_SUBJECT]
+    names = dict(Subject.objects.filter(pk__in=ids).values_list('pk', 'name')) if ids else {}
+
+    subjects = []
+    for key, entry in stats.subjects.items():
+        subject_id = None if key == NO_SUBJECT else int(key)
+        average = round(entry['percentage_sum'] / entry['attempts'], 1)
+        last = round(entry['last'], 1)
+        improvement = round(last - average, 1)
+        subjects.append({
+            'id': subject_id,
+            'name': names.get(subject_id) or 'Без предмета',
+            'attempts': entry['attempts'],
+            'quiz_count': entry['quizzes'],
+            'average_score': average,
+            'best_score': round(entry['best'], 1),
+            'last_score': last,
+            'passed': entry['passed'],
+            'pass_rate': round(entry['passed'] * 100 / entry['attempts'], 1),
+            'improvement': improvement,
+            'trend': 'up' if improvement > 0 else 'down' if improvement < 0 else 'same',
+        })
+    subjects.sort(key=lambda subject: (-subject['attempts'], subject['name']))
+    return subjects
+
+
+# -- consistency check ---------------------------------------------------------
+
+def _comparable(value):
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, dict):
+        return {key: _comparable(item) for key, item in value.items()}
+    return value
+
+
+def find_inconsistent_user_stats(user_ids=None, chunk_size=500):
+    """
+    Yield ``(user_id, fields)`` for every stored row that differs from a fresh
+    rebuild; ``fields`` lists the differing fields, or ``['missing']``.
+    """
+    using = router.db_for_write(UserStats)
+    compared = [field for field in STAT_FIELDS if field != 'updated_at']
+    for chunk in _user_id_chunks(user_ids, chunk_size, using):
+        stored = UserStats.objects.using(using).in_bulk(chunk, field_name='user_id')
+        for fresh in _build(chunk, using):
+            row = stored.get(fresh.user_id)
+            if row is None:
+                yield fresh.user_id, ['missing']
+                continue
+            fields = [
+                field for field in compared
+                if _comparable(getattr(row, field)) != _comparable(getattr(fresh, field))
+            ]
+            if fields:
+                yield fresh.user_id, fields
@@ -2,36 +2,65 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django.http import JsonResponse
 from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 import traceback
 import datetime
-from django.db.models import Q, Avg, Max, Min, Count
+from django.db.models import Q, Avg, Max, Min, Count, F, FloatField, Exists, OuterRef, Subquery, Value, ExpressionWrapper
+from django.db.models.functions import Coalesce
+import csv
+import io
 import json
 from django import forms
 from django import template
-import Paginator
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
 register = template.Library()
 
 
 from .models import *
 from .forms import *
+from .answer_buffer import flush_session_answers, pending_answer, store_answers
+from .answer_key import get_answer_key
+from .catalogue import catalogue_page, filter_quizzes, visible_quizzes
+from .dashboard import get_dashboard_data
+from .deltas import groups_delta, json_delta, parse_ids, quiz_list_delta, results_delta
+from .exports import EXPORT_FORMATS, filter_results, result_rows
+from .grading import grade_session
+from .question_import import create_answers, detect_format, import_question_file, import_questions
+from .quiz_paper import get_session_paper, pin_session_paper
+from .quiz_stats import get_quiz_stats, record_result
+from .ranking import result_rank
+from .replicas import stick_to_primary, use_replica
+from .leaderboard import best_results, entity_rank, leaderboard_page, update_ratings
+from .stats import (
+    cache_home_page, get_cached_home_page, get_global_stats, get_site_counters, site_counters_version,
+)
+from .user_results import user_results
+from .user_stats import get_user_stats, record_user_result, result_summary, subject_rollup
+
+
+MAX_ANSWER_BATCH = 500
+MY_RESULTS_PER_PAGE = 20
 
 
 def home_view(request):
     if request.user.is_authenticated:
         return redirect('dashboard')
     
+    # Саҳифаи тайёр барои меҳмонон, агар паёми нишондоданашуда набошад
+    cacheable = not len(messages.get_messages(request))
+    if cacheable:
+        content = get_cached_home_page()
+        if content is not None:
+            return HttpResponse(content)
+    
+    version = site_counters_version()
     try:
-        context = {
-            'total_users': User.objects.count(),
-            'total_quizzes': Quiz.objects.count(),
-            'active_quizzes': Quiz.objects.filter(status='active').count(),
-            'total_groups': Group.objects.count(),
-        }
+        context = get_site_counters()
     except:
         context = {
             'total_users': 0,
@@ -39,8 +68,12 @@ def home_view(request):
             'active_quizzes': 0,
             'total_groups': 0,
         }
+        cacheable = False
     
-    return render(request, 'home.html', context)
+    response = render(request, 'home.html', context)
+    if cacheable:
+        cache_home_page(version, response.content)
+    return response
 
 
 def is_admin(user):
@@ -103,71 +136,13 @@ def logout_view(request):
 
 
 @login_required
+@use_replica
 def dashboard_view(request):
     context = {}
     
     try:
-        if request.user.role == 'admin':
-            context.update({
-                'total_users': User.objects.count(),
-                'total_quizzes': Quiz.objects.count(),
-                'total_groups': Group.objects.count(),
-                'active_quizzes': Quiz.objects.filter(status='active').count(),
-                'recent_logs': AuditLog.objects.all()[:10],
-            })
-        
-        elif request.user.role == 'teacher':
-            my_quizzes = Quiz.objects.filter(created_by=request.user)
-            context.update({
-                'my_quizzes_count': my_quizzes.count(),
-                'active_quizzes_count': my_quizzes.filter(status='active').count(),
-                'total_students': User.objects.filter(role='student').count(),
-                'recent_results': Result.objects.filter(
-                    quiz__created_by=request.user
-                ).order_by('-completed_at')[:10],
-            })
-        
-        elif request.user.role == 'student':
-            now = timezone.now()
-            
-            try:
-                profile = request.user.profile
-            except Profile.DoesNotExist:
-                profile = Profile.objects.create(user=request.user, level_type='school', current_level=1)
-            
-            active_quizzes = Quiz.objects.filter(
-                status='active',
-                start_time__lte=now,
-                end_time__gte=now
-            )
-            
-            available_quizzes = active_quizzes.filter(
-                level_type=profile.level_type,
-                start_level__lte=profile.current_level,
-                end_level__gte=profile.current_level
-            )
-            
-            completed_sessions = QuizSession.objects.filter(
-                user=request.user,
-                finished_at__isnull=False
-            )
-            
-            my_groups = Group.objects.filter(
-                Q(leader=request.user) | Q(members__user=request.user)
-            ).distinct()
-            
-            my_results = Result.objects.filter(user=request.user).order_by('-completed_at')[:5]
-            
-            context.update({
-                'profile': profile,
-                'available_quizzes': available_quizzes[:5],
-                'available_quizzes_count': available_quizzes.count(),
-                'completed_sessions': completed_sessions[:3],
-                'total_completed': completed_sessions.count(),
-                'my_groups': my_groups[:3],
-                'my_groups_count': my_groups.count(),
-                'my_results': my_results,
-            })
+        # Рақамҳои умумӣ барои нақш ва қисми шахсӣ аз кэш (core/dashboard.py)
+        context.update(get_dashboard_data(request.user))
     except Exception as e:
         messages.error(request, f'Хатогӣ дар дашборд: {str(e)}')
     
@@ -175,6 +150,7 @@ def dashboard_view(request):
 
 
 @user_passes_test(is_admin)
+@use_replica
 def user_list_view(request):
     users = User.objects.all()
     return render(request, 'users/list.html', {'users': users})
@@ -226,25 +202,21 @@ def profile_view(request):
     else:
         form = ProfileForm(instance=profile)
     
-    # Статистика
-    completed_quizzes = QuizSession.objects.filter(
-        user=request.user,
-        finished_at__isnull=False
-    ).count()
-    
-    total_quizzes = QuizSession.objects.filter(user=request.user).count()
+    # Статистика аз сатри UserStats
+    stats = get_user_stats(request.user)
     
     context = {
         'form': form,
         'profile': profile,
-        'completed_quizzes': completed_quizzes,
-        'total_quizzes': total_quizzes,
+        'completed_quizzes': stats.completed_sessions,
+        'total_quizzes': stats.total_sessions,
     }
     
     return render(request, 'profile/view.html', context)
 
 
 @login_required
+@use_replica
 def subject_list_view(request):
     try:
         # Все предметы без сортировки по created_at
@@ -264,13 +236,25 @@ def subject_list_view(request):
         if level_type:
             subjects = subjects.filter(level_type=level_type)
         
-        # Статистика
-        stats = {
-            'total_subjects': subjects.count(),
-            'total_quizzes': Quiz.objects.count(),
-            'total_questions': Question.objects.count(),
-            'active_students': User.objects.filter(role='student', is_active=True).count(),
-        }
+        # Количество викторин и вопросов считаются в том же запросе
+        subjects = subjects.annotate(
+            quiz_count=Count('quizzes', distinct=True),
+            question_count=Count('quizzes__questions', distinct=True),
+        )
+        
+        # Процент завершения для студентов: число завершённых викторин фана
+        is_student_user = request.user.is_authenticated and request.user.role == 'student'
+        if is_student_user:
+            completed = QuizSession.objects.filter(
+                user=request.user,
+                quiz__subject=OuterRef('pk'),
+                finished_at__isnull=False
+            ).order_by().values('quiz__subject').annotate(
+                total=Count('quiz', distinct=True)
+            ).values('total')
+            subjects = subjects.annotate(
+                completed_quizzes=Coalesce(Subquery(completed), 0)
+            )
         
         # Подготовка данных для шаблона
         subject_data = []
@@ -290,38 +274,19 @@ def subject_list_view(request):
                 'prerequisites': subject.prerequisites,
                 'level_type': subject.level_type,
                 'level_type_display': subject.get_level_type_display(),
+                'quiz_count': subject.quiz_count,
+                'question_count': subject.question_count,
+                'completion_rate': 0,
             }
             
-            # Количество викторин
-            try:
-                quiz_count = Quiz.objects.filter(subject=subject).count()
-                subject_info['quiz_count'] = quiz_count
-            except Exception as e:
-                subject_info['quiz_count'] = 0
-            
-            # Количество вопросов
-            try:
-                question_count = Question.objects.filter(quiz__subject=subject).count()
-                subject_info['question_count'] = question_count
-            except Exception as e:
-                subject_info['question_count'] = 0
-            
-            # Процент завершения для студентов
-            if request.user.is_authenticated and request.user.role == 'student':
-                try:
-                    completed_quizzes = QuizSession.objects.filter(
-                        user=request.user,
-                        quiz__subject=subject,
-                        finished_at__isnull=False
-                    ).count()
-                    subject_info['completion_rate'] = int((completed_quizzes / subject_info['quiz_count']) * 100) if subject_info['quiz_count'] > 0 else 0
-                except Exception as e:
-                    subject_info['completion_rate'] = 0
-            else:
-                subject_info['completion_rate'] = 0
+            if is_student_user and subject.quiz_count > 0:
+                subject_info['completion_rate'] = int((subject.completed_quizzes / subject.quiz_count) * 100)
             
             subject_data.append(subject_info)
         
+        # Статистика
+        stats = dict(get_global_stats(), total_subjects=len(subject_data))
+        
         # Популярные предметы
         popular_subjects = sorted(
             subject_data, 
@@ -359,7 +324,11 @@ def subject_create_view(request):
 
 
 @login_required
+@use_replica
 def group_list_view(request):
+    if request.GET.get('refresh'):
+        return groups_refresh_ajax_view(request)
+    
     if request.user.role in ['admin', 'teacher']:
         groups = Group.objects.all()
     else:
@@ -367,6 +336,12 @@ def group_list_view(request):
             Q(leader=request.user) | Q(members__user=request.user)
         ).distinct()
     
+    groups = groups.annotate(
+        member_count=Count('members', distinct=True),
+        quiz_count=Count('quiz_sessions__quiz', distinct=True),
+        is_member=Exists(GroupMember.objects.filter(group=OuterRef('pk'), user=request.user)),
+    )
+    
     return render(request, 'groups/list.html', {'groups': groups})
 
 
@@ -419,127 +394,39 @@ def group_join_view(request, pk):
 
 
 @login_required
+@use_replica
 def quiz_list_view(request):
-    """Упрощенная версия для отладки"""
+    if request.GET.get('refresh'):
+        return quiz_list_refresh_ajax_view(request)
+    
     try:
-        print("=== НАЧАЛО quiz_list_view ===")
-        
-        # 1. Получаем базовый QuerySet
-        if request.user.role in ['admin', 'teacher']:
-            quizzes = Quiz.objects.all()
-            print(f"Админ/учитель: {quizzes.count()} викторин")
-        else:
-            # Для студентов - только активные
-            now = timezone.now()
-            print(f"Текущее время: {now}")
-            
-            # Получаем профиль безопасно
-            try:
-                profile = Profile.objects.get(user=request.user)
-                print(f"Найден профиль: {profile}")
-            except Profile.DoesNotExist:
-                profile = Profile.objects.create(
-                    user=request.user,
-                    level_type='school',
-                    current_level=1
-                )
-                print(f"Создан новый профиль: {profile}")
-            
-            quizzes = Quiz.objects.filter(
-                status='active',
-                start_time__lte=now,
-                end_time__gte=now,
-                level_type=profile.level_type,
-                start_level__lte=profile.current_level,
-                end_level__gte=profile.current_level
-            )
-            print(f"Студент: {quizzes.count()} доступных викторин")
+        filter_form = QuizFilterForm(request.GET or None)
+        filters = filter_form.cleaned_data if filter_form.is_valid() else {}
         
-        # 2. Применяем простые фильтры
-        search_query = request.GET.get('search', '')
-        subject_id = request.GET.get('subject')
+        quizzes = filter_quizzes(visible_quizzes(request.user), **filters)
+        page = catalogue_page(quizzes, cursor=request.GET.get('after'))
         
-        if search_query:
-            quizzes = quizzes.filter(title__icontains=search_query)
-            print(f"После поиска '{search_query}': {quizzes.count()}")
-        
-        if subject_id:
-            quizzes = quizzes.filter(subject_id=subject_id)
-            print(f"После фильтра по предмету {subject_id}: {quizzes.count()}")
-        
-        # 3. Берем только первые 10 для отладки
-        quizzes = quizzes[:10]
-        
-        # 4. Минимальная обработка
-        processed_quizzes = []
-        for quiz in quizzes:
-            quiz_data = {
-                'id': quiz.id,
-                'title': quiz.title,
-                'description': quiz.description[:100] if quiz.description else '',
-                'subject_name': quiz.subject.name if quiz.subject else 'Без предмета',
-                'question_count': quiz.questions.count(),
-                'time_limit': quiz.time_limit,
-                'max_attempts': quiz.max_attempts,
-                'pass_percentage': quiz.pass_percentage,
-                'start_level': quiz.start_level,
-                'end_level': quiz.end_level,
-                'status': quiz.status,
-                'quiz_mode': quiz.quiz_mode,
-                'level_type': quiz.level_type,
-                'start_time': quiz.start_time,
-                'end_time': quiz.end_time,
-                'created_at': quiz.created_at,
-            }
-            processed_quizzes.append(quiz_data)
+        # Рақамҳо аз кэш, бе COUNT дар ҳар саҳифа (ҳамон рақамҳое, ки ?refresh=1 медиҳад)
+        stats = quiz_list_delta(request.user)[0]['counts']
         
-        # 5. Собираем простой контекст
-        subjects = Subject.objects.all()[:5] if request.user.role in ['admin', 'teacher'] else []
+        # Параметрҳои филтр барои пайванди саҳифаи навбатӣ
+        query = request.GET.copy()
+        query.pop('after', None)
         
         context = {
-            'quizzes': processed_quizzes,  # Используем список словарей вместо QuerySet
-            'subjects': subjects,
-            'search_query': search_query,
-            'stats': {
-                'available_quizzes': len(processed_quizzes),
-                'active_quizzes_count': len(processed_quizzes),
-                'completed_quizzes_count': 0,
-                'total_participants': 0,
-            }
+            'quizzes': page.quizzes,
+            'next_cursor': page.next_cursor,
+            'is_first_page': 'after' not in request.GET,
+            'filter_query': query.urlencode(),
+            'filter_form': filter_form if filter_form.is_bound else QuizFilterForm(),
+            'stats': stats,
         }
         
-        print("=== УСПЕШНО ЗАВЕРШЕНО ===")
         return render(request, 'quizzes/list_simple.html', context)
         
     except Exception as e:
-        print(f"=== ОШИБКА: {str(e)} ===")
-        print(traceback.format_exc())
-        
-        # Создаем минимальную страницу с ошибкой
-        error_html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Ошибка</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; padding: 20px; }}
-                .error {{ background: #ffe6e6; border: 1px solid #ff9999; padding: 20px; border-radius: 5px; }}
-                pre {{ background: #f5f5f5; padding: 10px; overflow: auto; }}
-            </style>
-        </head>
-        <body>
-            <h1>Ошибка в отображении викторин</h1>
-            <div class="error">
-                <h3>Тип ошибки: {type(e).__name__}</h3>
-                <p><strong>Сообщение:</strong> {str(e)}</p>
-                <h4>Traceback:</h4>
-                <pre>{traceback.format_exc()}</pre>
-            </div>
-            <p><a href="/">Вернуться на главную</a></p>
-        </body>
-        </html>
-        """
-        return HttpResponse(error_html)
+        messages.error(request, f'Хатогӣ дар намоиши викторинаҳо: {str(e)}')
+        return redirect('dashboard')
 
 
 @register.filter
@@ -708,7 +595,7 @@ def quiz_create_view(request):
 def process_questions_from_form(request, quiz):
     """Process questions from the complex form format"""
     try:
-        question_count = 0
+        items = []
         i = 0
         
         while True:
@@ -725,16 +612,8 @@ def process_questions_from_form(request, quiz):
             if not question_points:
                 question_points = request.POST.get(f'question_points_{i}', '10')
             
-            # Create question
-            question = Question.objects.create(
-                quiz=quiz,
-                text=question_text,
-                question_type='single_choice',  # Default
-                points=int(question_points),
-                order=i+1
-            )
-            
             # Process answers for this question
+            answers = []
             j = 0
             while True:
                 # Try different answer formats
@@ -756,22 +635,25 @@ def process_questions_from_form(request, quiz):
                     if correct_key in request.POST:
                         is_correct = request.POST.get(correct_key) == 'on'
                 
-                Answer.objects.create(
-                    question=question,
-                    text=answer_text,
-                    is_correct=is_correct,
-                    order=j+1
-                )
+                answers.append({'text': answer_text, 'is_correct': is_correct})
                 j += 1
             
-            question_count += 1
+            items.append((i + 1, {
+                'text': question_text,
+                'question_type': 'single_choice',  # Default
+                'points': question_points,
+                'answers': answers,
+            }))
             i += 1
         
-        print(f"=== DEBUG: Processed {question_count} questions ===")
-        return question_count
+        # Ҳамаи саволҳо ва ҷавобҳо бо bulk_create дар як транзаксия
+        report = import_questions(quiz, items)
+        for row, error in report.errors:
+            messages.warning(request, f'Саволи {row} илова нашуд: {error}')
+        return report.created
         
     except Exception as e:
-        print(f"=== DEBUG: Error processing questions: {str(e)} ===")
+        messages.error(request, f'Хатогӣ дар илова кардани саволҳо: {str(e)}')
         return 0
     
 
@@ -813,12 +695,9 @@ def quiz_detail_view(request, pk):
             attempts_remaining = max(0, quiz.max_attempts - attempts_made)
         
         # Статистика викторины
-        total_participants = QuizSession.objects.filter(
-            quiz=quiz,
-            finished_at__isnull=False
-        ).count()
-        
-        avg_score = Result.objects.filter(quiz=quiz).aggregate(avg=Avg('score'))['avg'] or 0
+        quiz_stats = get_quiz_stats(quiz)
+        total_participants = quiz_stats.participants
+        avg_score = quiz_stats.avg_score
         
         context = {
             'quiz': quiz,
@@ -863,6 +742,40 @@ def quiz_edit_view(request, pk):
         return redirect('quiz_list')
 
 
+@user_passes_test(is_teacher)
+def quiz_clone_view(request, pk):
+    try:
+        quiz = get_object_or_404(Quiz.objects.select_related('subject'), pk=pk)
+        
+        if request.user != quiz.created_by and request.user.role != 'admin':
+            messages.error(request, 'Шумо иҷозати нусха бардоштани ин викторинаро надоред.')
+            return redirect('quiz_detail', pk=pk)
+        
+        if request.method == 'POST':
+            form = QuizCloneForm(request.POST)
+            if form.is_valid():
+                # Саволҳо ва ҷавобҳо бо bulk_create нусха бардошта мешаванд
+                copy = quiz.clone(created_by=request.user, **form.cleaned_data)
+                messages.success(request, f'Нусхаи викторина бо {copy.question_count} савол эҷод шуд.')
+                return redirect('quiz_detail', pk=copy.pk)
+        else:
+            form = QuizCloneForm(initial={
+                'title': f'{quiz.title} (нусха)',
+                'subject': quiz.subject_id,
+                'level_type': quiz.level_type,
+                'start_level': quiz.start_level,
+                'end_level': quiz.end_level,
+                'start_time': quiz.start_time,
+                'end_time': quiz.end_time,
+            })
+        
+        return render(request, 'quizzes/clone.html', {'form': form, 'quiz': quiz})
+        
+    except Exception as e:
+        messages.error(request, f'Хатогӣ дар нусха бардоштани викторина: {str(e)}')
+        return redirect('quiz_detail', pk=pk)
+
+
 @login_required
 def quiz_start_view(request, pk):
     try:
@@ -911,6 +824,8 @@ def quiz_start_view(request, pk):
             user=request.user,
             started_at=timezone.now()
         )
+        pin_session_paper(session, quiz.time_limit)
+        stick_to_primary(request)
         
         messages.info(request, f'Викторина оғоз шуд. Шумо {quiz.time_limit} дақиқа вақт доред.')
         return redirect('quiz_take', session_pk=session.pk)
@@ -923,7 +838,9 @@ def quiz_start_view(request, pk):
 @login_required
 def quiz_take_view(request, session_pk):
     try:
-        session = get_object_or_404(QuizSession, pk=session_pk, user=request.user)
+        session = get_object_or_404(
+            QuizSession.objects.select_related('quiz'), pk=session_pk, user=request.user
+        )
         
         if session.finished_at:
             messages.info(request, 'Шумо ин викторинаро аллакай анҷом додаед.')
@@ -939,59 +856,63 @@ def quiz_take_view(request, session_pk):
             messages.error(request, 'Вақти викторина ба охир расид.')
             return redirect('quiz_finish', session_pk=session.pk)
         
-        questions = quiz.questions.all().order_by('order')
+        # Саволҳо аз нусхаи кэшшудаи викторина барои ин сеанс
+        questions = get_session_paper(session, quiz.time_limit)
+        total_questions = len(questions)
         
-        current_question_index = int(request.GET.get('question', 0))
+        try:
+            current_question_index = max(0, int(request.GET.get('question', 0)))
+        except ValueError:
+            current_question_index = 0
         
-        if current_question_index >= len(questions):
+        if current_question_index >= total_questions:
             return redirect('quiz_finish', session_pk=session.pk)
         
         current_question = questions[current_question_index]
-        
-        previous_answer = UserAnswer.objects.filter(
-            session=session,
-            question=current_question
-        ).first()
+        status = 200
         
         if request.method == 'POST':
-            answer_id = request.POST.get('answer')
+            try:
+                answer_id = int(request.POST.get('answer') or 0)
+            except ValueError:
+                answer_id = 0
             
             if answer_id:
-                try:
-                    answer = Answer.objects.get(pk=answer_id, question=current_question)
-                    
-                    if previous_answer:
-                        previous_answer.answer = answer
-                        previous_answer.save()
-                    else:
-                        UserAnswer.objects.create(
-                            session=session,
-                            question=current_question,
-                            answer=answer
-                        )
+                if any(answer['id'] == answer_id for answer in current_question['answers']):
+                    store_answers(session.pk, [(current_question['id'], answer_id)])
                     
                     next_question = current_question_index + 1
-                    if next_question < len(questions):
+                    if next_question < total_questions:
                         return redirect(f'{request.path}?question={next_question}')
                     else:
                         return redirect('quiz_finish', session_pk=session.pk)
-                
-                except Answer.DoesNotExist:
-                    messages.error(request, 'Ҷавоби интихобшуда нодуруст аст.')
+            
+            if request.POST.get('answer'):
+                messages.error(request, 'Ҷавоби интихобшуда нодуруст аст.')
+                status = 400
+        
+        buffered_answer_id = pending_answer(session.pk, current_question['id'])
+        if buffered_answer_id is not None:
+            previous_answer = UserAnswer(session=session, question_id=current_question['id'], answer_id=buffered_answer_id)
+        else:
+            previous_answer = UserAnswer.objects.filter(
+                session=session,
+                question_id=current_question['id']
+            ).first()
         
         context = {
             'session': session,
             'quiz': quiz,
             'question': current_question,
             'question_index': current_question_index,
-            'total_questions': len(questions),
+            'total_questions': total_questions,
             'previous_answer': previous_answer,
             'time_remaining': int(time_remaining),
             'time_limit': quiz.time_limit,
-            'progress': int((current_question_index / len(questions)) * 100) if len(questions) > 0 else 0,
+            'progress': int((current_question_index / total_questions) * 100) if total_questions > 0 else 0,
         }
         
-        return render(request, 'quizzes/take.html', context)
+        return render(request, 'quizzes/take.html', context, status=status)
         
     except Exception as e:
         messages.error(request, f'Хатогӣ дар иҷрои викторина: {str(e)}')
@@ -1007,30 +928,41 @@ def quiz_finish_view(request, session_pk):
             messages.info(request, 'Ин викторина аллакай анҷом ёфтааст.')
             return redirect('quiz_result', session_pk=session.pk)
         
-        user_answers = session.user_answers.all()
-        total_questions = session.quiz.questions.count()
-        correct_answers = 0
-        score = 0
-        
-        for user_answer in user_answers:
-            if user_answer.answer.is_correct:
-                correct_answers += 1
-                score += user_answer.question.points
+        # Answers still in the write-behind buffer must be graded too
+        flush_session_answers(session.pk)
         
-        # Создание результата
-        result = Result.objects.create(
-            quiz=session.quiz,
-            user=session.user,
-            score=score,
-            total_questions=total_questions,
-            correct_answers=correct_answers,
-            completed_at=timezone.now()
-        )
-        
-        # Завершение сессии
-        session.finished_at = timezone.now()
-        session.save()
+        with transaction.atomic():
+            # Сеансро қулф мекунем: ду пешниҳоди ҳамзамон танҳо як натиҷа месозанд
+            session = QuizSession.objects.select_for_update().select_related('quiz').get(pk=session.pk)
+            if session.finished_at:
+                messages.info(request, 'Ин викторина аллакай анҷом ёфтааст.')
+                return redirect('quiz_result', session_pk=session.pk)
+            
+            grade = grade_session(session)
+            total_questions = grade.total_questions
+            correct_answers = grade.correct_answers
+            score = grade.score
+            
+            # Создание результата
+            result = Result.objects.create(
+                quiz=session.quiz,
+                user=session.user,
+                session=session,
+                score=score,
+                total_questions=total_questions,
+                correct_answers=correct_answers,
+                completed_at=timezone.now()
+            )
+            record_result(result, session.quiz.pass_percentage)
+            update_ratings(result)
+            
+            # Завершение сессии
+            session.finished_at = timezone.now()
+            session.save()
+            record_user_result(result, session.quiz.pass_percentage)
         
+        # Натиҷаро то расидани он ба replica аз базаи асосӣ нишон диҳем
+        stick_to_primary(request)
         messages.success(request, f'Викторина бомуваффақият анҷом ёфт! Натиҷа: {score}/{total_questions}')
         return redirect('quiz_result', session_pk=session.pk)
         
@@ -1066,18 +998,10 @@ def quiz_result_view(request, session_pk):
         user_answers = session.user_answers.select_related('question', 'answer').all()
         
         # Дополнительная информация
-        total_participants = QuizSession.objects.filter(
-            quiz=session.quiz,
-            finished_at__isnull=False
-        ).count()
+        total_participants = get_quiz_stats(session.quiz).participants
         
-        user_rank = None
-        if total_participants > 0:
-            user_results = Result.objects.filter(quiz=session.quiz).order_by('-score')
-            for i, res in enumerate(user_results, 1):
-                if res.id == result.id:
-                    user_rank = i
-                    break
+        user_rank = result_rank(result) if total_participants > 0 else None
+        leaderboard_rank = entity_rank(session.quiz, 'user', request.user.id)
         
         context = {
             'session': session,
@@ -1087,6 +1011,7 @@ def quiz_result_view(request, session_pk):
             'is_passed': is_passed,
             'total_participants': total_participants,
             'user_rank': user_rank,
+            'leaderboard_rank': leaderboard_rank,
         }
         
         return render(request, 'quizzes/result.html', context)
@@ -1097,63 +1022,69 @@ def quiz_result_view(request, session_pk):
 
 
 @login_required
-def my_results_view(request):
+@use_replica
+def quiz_leaderboard_view(request, quiz_pk):
     try:
-        results = Result.objects.filter(user=request.user).order_by('-completed_at')
+        quiz = get_object_or_404(Quiz, pk=quiz_pk)
         
-        # Статистика
-        total_quizzes = results.count()
-        total_score = sum([r.score for r in results])
-        avg_score = total_score / total_quizzes if total_quizzes > 0 else 0
+        entity_type = request.GET.get('entity_type', 'user')
+        if entity_type not in dict(Rating.ENTITY_TYPE_CHOICES):
+            entity_type = 'user'
         
-        passed_quizzes = 0
-        total_percentage = 0
+        ratings = leaderboard_page(quiz, entity_type, request.GET.get('page', 1))
         
-        for result in results:
-            result_percentage = (result.score / result.total_questions) * 100 if result.total_questions > 0 else 0
-            total_percentage += result_percentage
-            
-            quiz_pass_percentage = result.quiz.pass_percentage if hasattr(result.quiz, 'pass_percentage') else 60
-            if result_percentage >= quiz_pass_percentage:
-                passed_quizzes += 1
-        
-        avg_percentage = total_percentage / total_quizzes if total_quizzes > 0 else 0
-        best_result = max(results, key=lambda x: x.score) if results else None
-        
-        # Группировка по предметам
-        by_subject = {}
-        for result in results:
-            if hasattr(result.quiz, 'subject') and result.quiz.subject:
-                subject_name = result.quiz.subject.name
-                if subject_name not in by_subject:
-                    by_subject[subject_name] = {
-                        'count': 0,
-                        'total_score': 0,
-                        'passed': 0
-                    }
-                by_subject[subject_name]['count'] += 1
-                by_subject[subject_name]['total_score'] += result.score
-                
-                result_percentage = (result.score / result.total_questions) * 100 if result.total_questions > 0 else 0
-                quiz_pass_percentage = result.quiz.pass_percentage if hasattr(result.quiz, 'pass_percentage') else 60
-                
-                if result_percentage >= quiz_pass_percentage:
-                    by_subject[subject_name]['passed'] += 1
+        context = {
+            'quiz': quiz,
+            'ratings': ratings,
+            'entity_type': entity_type,
+            'my_rank': entity_rank(quiz, 'user', request.user.id),
+        }
+        
+        return render(request, 'ratings/leaderboard.html', context)
+        
+    except Exception as e:
+        messages.error(request, f'Хатогӣ дар намоиши рейтинг: {str(e)}')
+        return redirect('quiz_detail', pk=quiz_pk)
+
+
+@login_required
+@use_replica
+def my_results_view(request):
+    if request.GET.get('refresh'):
+        return my_results_refresh_ajax_view(request)
+    
+    try:
+        # Ҳамаи рақамҳо аз як сатри UserStats
+        stats = get_user_stats(request.user)
+        summary = result_summary(stats)
+        subjects = subject_rollup(stats)
+        
+        paginator = Paginator(user_results(request.user), MY_RESULTS_PER_PAGE)
+        paginator.count = summary['total_attempts']  # аллакай ҳисоб шудааст, COUNT лозим нест
+        page_obj = paginator.get_page(request.GET.get('page'))
         
-        # Расчет средних значений
-        for subject_name, data in by_subject.items():
-            if data['count'] > 0:
-                data['avg_score'] = data['total_score'] / data['count']
-                data['pass_rate'] = (data['passed'] / data['count']) * 100 if data['count'] > 0 else 0
+        for result in page_obj:
+            result.is_best = summary['total_attempts'] > 0 and result.score_percentage >= summary['best_score']
+        
+        # Диаграммаи натиҷаҳо аз рӯи саҳифаи ҷорӣ, аз кӯҳна ба нав
+        chronological = list(reversed(page_obj.object_list))
         
         context = {
-            'results': results,
-            'total_quizzes': total_quizzes,
-            'avg_score': avg_score,
-            'avg_percentage': avg_percentage,
-            'passed_quizzes': passed_quizzes,
-            'best_result': best_result,
-            'by_subject': by_subject,
+            'results': page_obj,
+            'page_obj': page_obj,
+            'is_paginated': page_obj.has_other_pages(),
+            'results_cursor': summary['last_id'],
+            'stats': {
+                'total_attempts': summary['total_attempts'],
+                'average_score': summary['average_score'],
+                'best_score': summary['best_score'],
+                'passed': summary['passed'],
+            },
+            'subject_performance': subjects,
+            'performance_labels': json.dumps([r.completed_at.strftime('%d.%m') for r in chronological]),
+            'performance_data': json.dumps([r.score_percentage for r in chronological]),
+            'subject_names': json.dumps([subject['name'] for subject in subjects], ensure_ascii=False),
+            'subject_scores': json.dumps([subject['average_score'] for subject in subjects]),
         }
         
         return render(request, 'results/my_results.html', context)
@@ -1164,6 +1095,7 @@ def my_results_view(request):
 
 
 @user_passes_test(lambda u: u.role in ['teacher', 'admin'])
+@use_replica
 def quiz_results_view(request, quiz_pk):
     """View for displaying quiz results"""
     try:
@@ -1174,60 +1106,42 @@ def quiz_results_view(request, quiz_pk):
             messages.error(request, 'Шумо иҷозати дидани натиҷаҳои ин викторинаро надоред.')
             return redirect('quiz_list')
         
-        # Get all results for this quiz
-        results = Result.objects.filter(quiz=quiz).select_related('user').order_by('-score')
+        total_questions = quiz.question_count
+        
+        # The table lists every participant's best result in the order of the
+        # precomputed user board (Rating), so it pages over one indexed scan.
+        board = Rating.objects.filter(quiz=quiz, entity_type='user').order_by('rank', 'id')
         
-        # Calculate statistics
-        total_participants = results.count()
+        # Statistics come from the incrementally maintained QuizStats row
+        quiz_stats = get_quiz_stats(quiz)
+        total_participants = quiz_stats.participants
         
         if total_participants > 0:
-            # Calculate average score
-            total_questions = quiz.questions.count()
-            
-            # Method 1: Calculate using aggregated data
-            try:
-                avg_score = results.aggregate(avg=Avg('score'))['avg'] or 0
-                max_score = results.aggregate(max=Max('score'))['max'] or 0
-                min_score = results.aggregate(min=Min('score'))['min'] or 0
-            except:
-                avg_score = max_score = min_score = 0
+            avg_score = quiz_stats.avg_score
+            max_score = quiz_stats.max_score or 0
+            min_score = quiz_stats.min_score or 0
             
             # Calculate average score percentage
             avg_percentage = (avg_score / total_questions * 100) if total_questions > 0 else 0
             
-            # Calculate passed/failed counts
-            passed_count = 0
-            failed_count = 0
-            
-            for result in results:
-                result_percentage = (result.score / total_questions * 100) if total_questions > 0 else 0
-                if result_percentage >= quiz.pass_percentage:
-                    passed_count += 1
-                else:
-                    failed_count += 1
+            passed_count = quiz_stats.pass_count
+            failed_count = quiz_stats.fail_count
             
             # Get top results (limit to 5)
-            top_results = results[:5]
+            top_results = best_results(quiz, board[:5])
             
             # Get recent results
-            recent_results = results.order_by('-completed_at')[:5]
-            
-            # Calculate average time (if available)
-            try:
-                avg_time = results.aggregate(avg=Avg('time_taken'))['avg'] or 0
-            except:
-                avg_time = 0
-                
-            # Calculate average attempts
-            try:
-                avg_attempts = results.aggregate(avg=Avg('attempt_number'))['avg'] or 1
-            except:
-                avg_attempts = 1
+            if total_questions > 0:
+                score_percentage = ExpressionWrapper(F('score') * 100.0 / total_questions, output_field=FloatField())
+            else:
+                score_percentage = Value(0.0, output_field=FloatField())
+            recent_results = Result.objects.filter(quiz=quiz).select_related('user').annotate(
+                score_percentage=score_percentage
+            ).order_by('-completed_at')[:5]
             
-            # Add percentage to each result for template
-            for result in results:
-                result.score_percentage = (result.score / total_questions * 100) if total_questions > 0 else 0
-                result.is_passed = result.score_percentage >= quiz.pass_percentage
+            # Result has no time_taken / attempt_number columns yet
+            avg_time = 0
+            avg_attempts = 1
         else:
             # Default values if no results
             avg_score = max_score = min_score = 0
@@ -1238,27 +1152,15 @@ def quiz_results_view(request, quiz_pk):
             avg_time = 0
             avg_attempts = 1
         
-        # Apply search filter if provided
+        # Apply search and status filters if provided (Rating has the same
+        # user and score fields as Result)
         search_query = request.GET.get('search', '')
-        if search_query:
-            results = results.filter(
-                Q(user__username__icontains=search_query) |
-                Q(user__first_name__icontains=search_query) |
-                Q(user__last_name__icontains=search_query) |
-                Q(user__email__icontains=search_query)
-            )
-        
-        # Apply status filter if provided
         status_filter = request.GET.get('status', '')
-        if status_filter:
-            if status_filter == 'passed':
-                results = results.filter(score__gte=(quiz.pass_percentage * total_questions / 100))
-            elif status_filter == 'failed':
-                results = results.filter(score__lt=(quiz.pass_percentage * total_questions / 100))
+        board = filter_results(board, quiz, search_query, status_filter)
         
         # Pagination
         page = request.GET.get('page', 1)
-        paginator = Paginator(results, 10)  # 10 results per page
+        paginator = Paginator(board, 10)  # 10 results per page
         
         try:
             results_page = paginator.page(page)
@@ -1266,6 +1168,7 @@ def quiz_results_view(request, quiz_pk):
             results_page = paginator.page(1)
         except EmptyPage:
             results_page = paginator.page(paginator.num_pages)
+        results_page.object_list = best_results(quiz, results_page.object_list)
         
         context = {
             'quiz': quiz,
@@ -1293,8 +1196,37 @@ def quiz_results_view(request, quiz_pk):
         print(traceback.format_exc())
         messages.error(request, f'Хатогӣ дар намоиши натиҷаҳои викторина: {str(e)}')
         return redirect('quiz_list')
-    
-    
+
+
+@user_passes_test(lambda u: u.role in ['teacher', 'admin'])
+def export_quiz_results_view(request, quiz_pk):
+    """Stream all (filtered) results of a quiz as CSV or XLSX"""
+    try:
+        quiz = get_object_or_404(Quiz, pk=quiz_pk)
+        
+        if request.user != quiz.created_by and request.user.role != 'admin':
+            messages.error(request, 'Шумо иҷозати дидани натиҷаҳои ин викторинаро надоред.')
+            return redirect('quiz_list')
+        
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            messages.error(request, 'Ин формати содирот дастгирӣ намешавад.')
+            return redirect('quiz_results', quiz_pk=quiz.pk)
+        stream, content_type, extension = EXPORT_FORMATS[export_format]
+        
+        results = filter_results(
+            Result.objects.filter(quiz=quiz), quiz,
+            request.GET.get('search', ''), request.GET.get('status', ''),
+        )
+        response = StreamingHttpResponse(stream(result_rows(quiz, results)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="quiz_{quiz.pk}_results.{extension}"'
+        return response
+        
+    except Exception as e:
+        messages.error(request, f'Хатогӣ дар содироти натиҷаҳо: {str(e)}')
+        return redirect('quiz_results', quiz_pk=quiz_pk)
+
+
 @login_required
 def check_quiz_time_view(request, pk):
     try:
@@ -1323,6 +1255,31 @@ def check_quiz_time_view(request, pk):
         })
 
 
+@login_required
+@use_replica
+def quiz_list_refresh_ajax_view(request):
+    """Catalogue counters and statuses of ``?ids=1,2,3`` (see core/deltas.py)."""
+    payload, last_modified = quiz_list_delta(request.user, parse_ids(request.GET.get('ids')))
+    return json_delta(request, payload, last_modified)
+
+
+@login_required
+@use_replica
+def my_results_refresh_ajax_view(request):
+    """Result summary and results newer than ``?since=<result id>``."""
+    since = request.GET.get('since', '')
+    payload, last_modified = results_delta(request.user, int(since) if since.isdigit() else 0)
+    return json_delta(request, payload, last_modified)
+
+
+@login_required
+@use_replica
+def groups_refresh_ajax_view(request):
+    """The user's groups with member counts."""
+    payload, last_modified = groups_delta(request.user)
+    return json_delta(request, payload, last_modified)
+
+
 @login_required
 def save_answer_ajax_view(request):
     if request.method == 'POST':
@@ -1332,15 +1289,17 @@ def save_answer_ajax_view(request):
             question_id = data.get('question_id')
             answer_id = data.get('answer_id')
             
-            session = QuizSession.objects.get(pk=session_id, user=request.user)
-            question = Question.objects.get(pk=question_id, quiz=session.quiz)
-            answer = Answer.objects.get(pk=answer_id, question=question)
+            session = QuizSession.objects.only('id', 'quiz_id').get(pk=session_id, user=request.user)
+            answer_key = get_answer_key(session.quiz_id)
+            question_id = int(question_id)
+            answer_id = int(answer_id)
             
-            user_answer, created = UserAnswer.objects.update_or_create(
-                session=session,
-                question=question,
-                defaults={'answer': answer}
-            )
+            if not answer_key.has_question(question_id):
+                raise Question.DoesNotExist('Савол ёфт нашуд.')
+            if not answer_key.is_valid(question_id, answer_id):
+                raise Answer.DoesNotExist('Ҷавоби интихобшуда нодуруст аст.')
+            
+            store_answers(session.pk, [(question_id, answer_id)])
             
             return JsonResponse({
                 'success': True,
@@ -1356,6 +1315,74 @@ def save_answer_ajax_view(request):
     return JsonResponse({'success': False, 'message': 'Методи нодуруст.'})
 
 
+@login_required
+def save_answers_batch_ajax_view(request):
+    """
+    Save many answers of one session in a single upsert (or one journal
+    append in write-behind mode, see core/answer_buffer.py).
+
+    Body: {"session_id": 1, "answers": [{"question_id": 2, "answer_id": 3}, ...]}
+    Every item is checked against the quiz's answer key in memory and gets
+    its own status: saved, invalid (malformed item), invalid_question,
+    invalid_answer or duplicate (superseded by a later item for the same
+    question).
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Методи нодуруст.'})
+    
+    try:
+        data = json.loads(request.body)
+        items = data.get('answers') or []
+        if not isinstance(items, list) or len(items) > MAX_ANSWER_BATCH:
+            return JsonResponse({'success': False, 'message': 'Рӯйхати ҷавобҳо нодуруст аст.'})
+        
+        session = QuizSession.objects.only('id', 'quiz_id', 'finished_at').get(
+            pk=data.get('session_id'), user=request.user
+        )
+        if session.finished_at:
+            return JsonResponse({'success': False, 'message': 'Ин викторина аллакай анҷом ёфтааст.'})
+        
+        answer_key = get_answer_key(session.quiz_id)
+        statuses = []
+        latest = {}
+        for position, item in enumerate(items):
+            try:
+                question_id = int(item.get('question_id'))
+                answer_id = int(item.get('answer_id'))
+            except (AttributeError, TypeError, ValueError):
+                statuses.append({'question_id': None, 'answer_id': None, 'status': 'invalid'})
+                continue
+            
+            if not answer_key.has_question(question_id):
+                status = 'invalid_question'
+            elif not answer_key.is_valid(question_id, answer_id):
+                status = 'invalid_answer'
+            else:
+                status = 'saved'
+                if question_id in latest:
+                    statuses[latest[question_id]]['status'] = 'duplicate'
+                latest[question_id] = position
+            statuses.append({'question_id': question_id, 'answer_id': answer_id, 'status': status})
+        
+        to_save = [(statuses[pos]['question_id'], statuses[pos]['answer_id']) for pos in latest.values()]
+        if to_save:
+            store_answers(session.pk, to_save)
+        
+        return JsonResponse({
+            'success': True,
+            'saved': len(to_save),
+            'results': statuses,
+        })
+    
+    except QuizSession.DoesNotExist:
+        return JsonResponse({'success': False, 'message': 'Сеанс ёфт нашуд.'})
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e),
+        })
+
+
 @user_passes_test(is_teacher)
 def question_create_view(request, quiz_pk):
     """View for creating a question - SIMPLE WORKING VERSION"""
@@ -1431,17 +1458,9 @@ def question_create_view(request, quiz_pk):
                         if 'answer' in key.lower() and key != 'answers':
                             print(f"Found alternative answer key: {key} = {value}")
                 
-                # Create answers
-                correct_count = 0
-                for answer_data in answers_data:
-                    Answer.objects.create(
-                        question=question,
-                        text=answer_data['text'],
-                        is_correct=answer_data['is_correct'],
-                        order=answer_data['order']
-                    )
-                    if answer_data['is_correct']:
-                        correct_count += 1
+                # Create answers (one INSERT)
+                create_answers(question, [(a['text'], a['is_correct']) for a in answers_data])
+                correct_count = sum(1 for a in answers_data if a['is_correct'])
                 
                 # Validate at least one correct answer
                 if correct_count == 0:
@@ -1492,6 +1511,51 @@ def question_create_view(request, quiz_pk):
         messages.error(request, f'Хатогӣ дар эҷоди савол: {str(e)}')
         return redirect('quiz_detail', pk=quiz_pk)
 
+@user_passes_test(is_teacher)
+def question_import_view(request, quiz_pk):
+    """Import a question bank (CSV / JSON / GIFT file) into a quiz"""
+    quiz = get_object_or_404(Quiz, pk=quiz_pk)
+    
+    if request.user != quiz.created_by and request.user.role != 'admin':
+        messages.error(request, 'Шумо иҷозати илова кардани саволро надоред.')
+        return redirect('quiz_detail', pk=quiz_pk)
+    
+    report = None
+    dry_run = False
+    if request.method == 'POST':
+        form = QuestionImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            import_format = form.cleaned_data['format'] or detect_format(upload.name)
+            dry_run = form.cleaned_data['dry_run']
+            if import_format is None:
+                form.add_error('format', 'Форматро аз номи файл муайян кардан нашуд, онро интихоб кунед.')
+            else:
+                try:
+                    # Файл сатр ба сатр хонда мешавад, на якбора
+                    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+                    report = import_question_file(quiz, stream, import_format, dry_run=dry_run)
+                except (UnicodeDecodeError, csv.Error) as e:
+                    messages.error(request, f'Файлро хондан нашуд: {str(e)}')
+                else:
+                    if dry_run:
+                        messages.info(request, f'{report.created} савол дуруст аст, {len(report.errors)} савол хатогӣ дорад.')
+                    elif report.created:
+                        messages.success(request, f'{report.created} савол бомуваффақият илова шуд!')
+                    if report.errors:
+                        messages.warning(request, f'{len(report.errors)} савол рад шуд.')
+                    quiz.refresh_from_db(fields=['question_count', 'total_points'])
+    else:
+        form = QuestionImportForm()
+    
+    return render(request, 'questions/import.html', {
+        'quiz': quiz,
+        'form': form,
+        'report': report,
+        'dry_run': dry_run,
+    })
+
+
 @user_passes_test(is_teacher)
 def question_edit_view(request, pk):
     try:
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.replicas.PrimaryStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -80,6 +82,88 @@ DATABASES = {
     }
 }
 
+# QUIZ_DB_PROFILE=sqlite-production tunes SQLite for many concurrent
+# test-takers: WAL lets readers run alongside the writer, IMMEDIATE
+# transactions take the write lock up front instead of failing on upgrade,
+# and the busy timeout makes writers queue instead of erroring.
+# PRAGMAS are applied to every new connection by core/sqlite.py.
+DATABASE_PROFILE = os.environ.get('QUIZ_DB_PROFILE', 'default')
+
+SQLITE_PRODUCTION_OPTIONS = {
+    'timeout': 20,
+    'transaction_mode': 'IMMEDIATE',
+}
+
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+if DATABASE_PROFILE == 'sqlite-production':
+    DATABASES['default']['OPTIONS'] = dict(SQLITE_PRODUCTION_OPTIONS)
+    DATABASES['default']['PRAGMAS'] = dict(SQLITE_PRODUCTION_PRAGMAS)
+
+# Optional read replica for the read-heavy views (see core/replicas.py).
+# Locally QUIZ_REPLICA_DB can name a second SQLite file as a stand-in
+# replica; `manage.py sync_replica` copies the primary into it.
+REPLICA_DATABASE_ALIAS = 'replica'
+REPLICA_STICKY_SECONDS = 15
+
+REPLICA_DATABASE = os.environ.get('QUIZ_REPLICA_DB')
+if REPLICA_DATABASE:
+    DATABASES[REPLICA_DATABASE_ALIAS] = {
+        **DATABASES['default'],
+        'NAME': REPLICA_DATABASE,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+#
+# Answer keys, quiz papers, dashboards and the home page are cached and
+# invalidated from signals, so all worker processes must see the same cache;
+# a per-process LocMemCache would keep serving what another worker already
+# invalidated. The default is a file-based cache under var/cache: shared by
+# the workers of one host, and it never touches the database, so cache reads
+# and invalidations do not compete with the exam writers for the SQLite
+# write lock.
+#
+# QUIZ_CACHE_BACKEND=redis (with QUIZ_REDIS_URL, needs the redis package)
+# shares the cache between hosts. QUIZ_CACHE_BACKEND=db keeps it in the
+# database; run `manage.py createcachetable` once when deploying it.
+QUIZ_CACHE_BACKEND = os.environ.get('QUIZ_CACHE_BACKEND', 'file')
+
+if QUIZ_CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('QUIZ_REDIS_URL', 'redis://127.0.0.1:6379'),
+        }
+    }
+elif QUIZ_CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'quiz_cache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'var' / 'cache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators